@@ -9,8 +9,8 @@ from typing import Optional, Literal
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from pydantic_ai.models.gemini import GeminiModel
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 
 
 class JobSearchIntent(BaseModel):
@@ -61,6 +61,20 @@ DEFAULT TO search_jobs WHEN IN DOUBT!"""
 )
 
 
+# Module-level pool survives between warm invocations, so only a cold start
+# pays for the TCP+TLS+auth handshake to Neon
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+_db_pool: Optional[ThreadedConnectionPool] = None
+
+
+def get_db_pool() -> ThreadedConnectionPool:
+    global _db_pool
+    if _db_pool is None or _db_pool.closed:
+        _db_pool = ThreadedConnectionPool(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, os.environ.get('DATABASE_URL'))
+    return _db_pool
+
+
 # Map executive titles to role categories for better search
 def map_role_to_category(role_type: Optional[str]) -> str:
     if not role_type:
@@ -86,8 +100,11 @@ def map_role_to_category(role_type: Optional[str]) -> str:
 
 def query_jobs(role_type: Optional[str], location: Optional[str]) -> list[dict]:
     """Query Neon database for jobs"""
+    conn = None
+    broken = False
     try:
-        conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+        pool = get_db_pool()
+        conn = pool.getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         role_pattern = map_role_to_category(role_type)
@@ -121,14 +138,21 @@ def query_jobs(role_type: Optional[str], location: Optional[str]) -> list[dict]:
 
         jobs = cursor.fetchall()
         cursor.close()
-        conn.close()
+        # Read-only query: end the transaction so the connection goes back idle
+        conn.rollback()
 
         return [dict(job) for job in jobs]
 
     except Exception as e:
         print(f'[Pydantic AI] DB error: {e}')
+        broken = True
         return []
 
+    finally:
+        if conn is not None:
+            # Drop connections that errored (e.g. Neon closed an idle socket)
+            _db_pool.putconn(conn, close=broken or bool(conn.closed))
+
 
 def handler(request):
     """Vercel serverless function handler - simplified for compatibility"""
@@ -11,6 +11,16 @@ import {
 
 const sql = neon(process.env.DATABASE_URL!)
 
+// sync-many limits: callers batch to SYNC_MANY_MAX_IDS, and the work stops
+// starting new jobs after the budget so the response beats the client's 60s
+// timeout (a timed-out batch would be re-posted and written to Zep twice)
+const SYNC_MANY_MAX_IDS = 20
+const SYNC_MANY_CONCURRENCY = 4
+const SYNC_MANY_BUDGET_MS = 40_000
+
+// jobs.id is a UUID; other IDs can't match a row and are reported as missing
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i
+
 // GET /api/graph/jobs - Get jobs knowledge graph
 export async function GET(request: NextRequest) {
   const roleFilter = request.nextUrl.searchParams.get('role')
@@ -194,7 +204,7 @@ export async function GET(request: NextRequest) {
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json()
-    const { action = 'sync-all', jobId, limit = 100 } = body
+    const { action = 'sync-all', jobId, jobIds, limit = 100 } = body
 
     // Authenticate (use a simple secret for now)
     const authHeader = request.headers.get('authorization')
@@ -244,6 +254,64 @@ export async function POST(request: NextRequest) {
       })
     }
 
+    if (action === 'sync-many') {
+      // Sync a batch of jobs by ID (used by the classification pipeline)
+      if (!Array.isArray(jobIds)) {
+        return NextResponse.json({ error: 'sync-many requires a jobIds array' }, { status: 400 })
+      }
+      if (jobIds.length > SYNC_MANY_MAX_IDS) {
+        return NextResponse.json(
+          { error: `At most ${SYNC_MANY_MAX_IDS} jobIds per sync-many request`, requested: jobIds.length },
+          { status: 400 }
+        )
+      }
+      const ids = jobIds.map(String)
+      const uuids = ids.filter(id => UUID_PATTERN.test(id))
+      const jobs = await sql`
+        SELECT
+          id,
+          title,
+          company_name,
+          location,
+          skills_required,
+          description,
+          day_rate_min,
+          day_rate_max,
+          role_category
+        FROM jobs
+        WHERE id = ANY(${uuids}::uuid[])
+      `
+
+      const results = await syncJobsToZep(
+        jobs.map(job => ({
+          id: String(job.id),
+          title: job.title,
+          company: job.company_name || 'Unknown',
+          location: job.location || 'UK',
+          skills: parseSkills(job.skills_required),
+          description: job.description,
+          dayRate: { min: job.day_rate_min, max: job.day_rate_max },
+          roleCategory: job.role_category,
+        })),
+        { concurrency: SYNC_MANY_CONCURRENCY, deadlineMs: SYNC_MANY_BUDGET_MS }
+      )
+
+      // Per-ID outcome so the outbox retries only the jobs that failed
+      const found = new Set(jobs.map(job => String(job.id)))
+      const missingIds = ids.filter(id => !found.has(id))
+
+      return NextResponse.json({
+        success: results.failed === 0,
+        requested: ids.length,
+        missing: missingIds.length,
+        missingIds,
+        synced: results.success,
+        failed: results.failed,
+        failedIds: results.failedIds,
+        message: `Synced ${results.success}/${ids.length} jobs to Zep`,
+      })
+    }
+
     // Sync all jobs
     const jobs = await sql`
       SELECT
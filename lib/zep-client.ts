@@ -380,30 +380,48 @@ export async function syncJobToZep(job: {
 
 /**
  * Bulk sync jobs to Zep
+ *
+ * Runs up to `concurrency` syncs at a time. With `deadlineMs`, jobs not yet
+ * started when the budget runs out are skipped and reported in failedIds, so
+ * the caller can retry them instead of the whole request timing out.
  */
-export async function syncJobsToZep(jobs: Array<{
-  id: string
-  title: string
-  company: string
-  location: string
-  skills: string[]
-  description?: string
-  dayRate?: { min?: number; max?: number }
-  roleCategory?: string
-}>): Promise<{ success: number; failed: number }> {
+export async function syncJobsToZep(
+  jobs: Array<{
+    id: string
+    title: string
+    company: string
+    location: string
+    skills: string[]
+    description?: string
+    dayRate?: { min?: number; max?: number }
+    roleCategory?: string
+  }>,
+  options?: { concurrency?: number; deadlineMs?: number }
+): Promise<{ success: number; failed: number; failedIds: string[] }> {
+  const concurrency = Math.max(1, options?.concurrency || 1)
+  const deadline = options?.deadlineMs ? Date.now() + options.deadlineMs : Infinity
+  const failedIds: string[] = []
   let success = 0
-  let failed = 0
-
-  for (const job of jobs) {
-    const result = await syncJobToZep(job)
-    if (result) {
-      success++
-    } else {
-      failed++
+  let next = 0
+
+  async function worker() {
+    while (next < jobs.length) {
+      const job = jobs[next++]
+      if (Date.now() >= deadline) {
+        failedIds.push(job.id)
+        continue
+      }
+      if (await syncJobToZep(job)) {
+        success++
+      } else {
+        failedIds.push(job.id)
+      }
     }
   }
 
-  return { success, failed }
+  await Promise.all(Array.from({ length: Math.min(concurrency, jobs.length) }, worker))
+
+  return { success, failed: failedIds.length, failedIds }
 }
 
 /**
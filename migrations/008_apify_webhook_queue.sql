@@ -0,0 +1,32 @@
+-- Migration: Durable work queue for Apify webhook processing
+-- Replaces in-process BackgroundTasks in services/apify-sync so a deploy or
+-- crash mid-dataset no longer loses the run
+
+CREATE TABLE IF NOT EXISTS apify_webhook_queue (
+  id BIGSERIAL PRIMARY KEY,
+  actor_name TEXT NOT NULL,
+  dataset_id TEXT NOT NULL,
+  run_id TEXT,
+  status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, dead
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 5,
+  items_processed INTEGER NOT NULL DEFAULT 0,  -- resume checkpoint (dataset offset)
+  worker_id TEXT,
+  lease_expires_at TIMESTAMP WITH TIME ZONE,
+  available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  last_error TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  completed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Claim scans only touch live rows
+CREATE INDEX IF NOT EXISTS idx_apify_webhook_queue_claimable
+  ON apify_webhook_queue(available_at, id)
+  WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_apify_webhook_queue_status ON apify_webhook_queue(status);
+
+COMMENT ON TABLE apify_webhook_queue IS 'Leased work items for Apify dataset ingestion';
+COMMENT ON COLUMN apify_webhook_queue.lease_expires_at IS 'Visibility timeout: running rows past this are reclaimed by another worker';
+COMMENT ON COLUMN apify_webhook_queue.items_processed IS 'Dataset offset already saved and classified; retries resume here';
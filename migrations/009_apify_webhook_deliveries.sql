@@ -0,0 +1,17 @@
+-- Migration: Idempotency ledger for Apify webhook deliveries
+-- Apify retries webhooks and actors get re-triggered by hand; a dataset that
+-- is already recorded here is acknowledged without being processed again
+
+CREATE TABLE IF NOT EXISTS apify_webhook_deliveries (
+  dataset_id TEXT PRIMARY KEY,
+  run_id TEXT,
+  actor_name TEXT NOT NULL,
+  queue_job_id BIGINT,
+  received_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_apify_webhook_deliveries_run_id
+  ON apify_webhook_deliveries(run_id)
+  WHERE run_id IS NOT NULL;
+
+COMMENT ON TABLE apify_webhook_deliveries IS 'First delivery of each Apify run/dataset; duplicates are acknowledged and dropped';
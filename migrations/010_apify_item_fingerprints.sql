@@ -0,0 +1,14 @@
+-- Migration: Content fingerprints for Apify delta ingestion
+-- Scheduled actors mostly re-scrape unchanged postings; items whose hash
+-- matches the stored one skip save_jobs_to_neon and classification
+
+CREATE TABLE IF NOT EXISTS apify_item_fingerprints (
+  source TEXT NOT NULL,  -- actor name, e.g. linkedin, ashby
+  source_id TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  first_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (source, source_id)
+);
+
+COMMENT ON COLUMN apify_item_fingerprints.content_hash IS 'sha256 of the normalized item, excluding volatile fields such as applicant counts';
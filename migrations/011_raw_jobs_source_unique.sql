@@ -0,0 +1,21 @@
+-- Migration: Conflict target for bulk Apify ingestion
+-- save_jobs_to_neon merges a COPY staging table into raw_jobs with
+-- ON CONFLICT (source, source_id), which needs a unique index
+
+-- The earlier ingesters appended a raw_jobs row per re-scrape; keep only the
+-- newest copy of each posting so the unique index can be built
+DELETE FROM raw_jobs r
+USING (
+  SELECT ctid,
+         row_number() OVER (
+           PARTITION BY source, source_id
+           ORDER BY received_at DESC NULLS LAST, id DESC
+         ) AS copy_rank
+  FROM raw_jobs
+  WHERE source_id IS NOT NULL
+) d
+WHERE r.ctid = d.ctid
+  AND d.copy_rank > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_raw_jobs_source_source_id
+  ON raw_jobs(source, source_id);
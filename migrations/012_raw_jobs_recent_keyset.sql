@@ -0,0 +1,5 @@
+-- Migration: Keyset index for /jobs/recent pagination in services/apify-sync
+-- Matches ORDER BY received_at DESC, id::text DESC so each page is an index seek
+
+CREATE INDEX IF NOT EXISTS idx_raw_jobs_received_keyset
+  ON raw_jobs(received_at DESC, (id::text) DESC);
@@ -0,0 +1,34 @@
+-- Migration: Lease-based claiming of raw_jobs for scripts/classify_jobs.py
+-- Workers claim pending rows with FOR UPDATE SKIP LOCKED and mark them
+-- 'processing' under a lease, so several classifiers never take the same job
+
+ALTER TABLE raw_jobs ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE raw_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+
+-- processing_status may be an enum; make sure the new state exists
+DO $$
+DECLARE
+  status_type regtype;
+BEGIN
+  SELECT atttypid::regtype INTO status_type
+  FROM pg_attribute
+  WHERE attrelid = 'raw_jobs'::regclass AND attname = 'processing_status';
+
+  IF EXISTS (SELECT 1 FROM pg_type WHERE oid = status_type AND typtype = 'e') THEN
+    EXECUTE format('ALTER TYPE %s ADD VALUE IF NOT EXISTS %L', status_type, 'processing');
+  END IF;
+END;
+$$;
+
+-- Claim scans read only pending rows, newest first
+CREATE INDEX IF NOT EXISTS idx_raw_jobs_pending
+  ON raw_jobs(received_at DESC)
+  WHERE processing_status = 'pending';
+
+-- Stale lease sweep
+CREATE INDEX IF NOT EXISTS idx_raw_jobs_processing_lease
+  ON raw_jobs(lease_expires_at)
+  WHERE processing_status = 'processing';
+
+COMMENT ON COLUMN raw_jobs.claimed_by IS 'Classifier worker holding the lease (host-pid)';
+COMMENT ON COLUMN raw_jobs.lease_expires_at IS 'Processing rows past this are returned to pending';
@@ -0,0 +1,16 @@
+-- Migration: Content-addressed cache of job classification results
+-- scripts/classify_jobs.py reuses a stored StructuredJob when the same
+-- normalized prompt was classified before with the same model and prompt version
+
+CREATE TABLE IF NOT EXISTS classification_cache (
+  cache_key TEXT PRIMARY KEY,  -- sha256(model, prompt version, normalized prompt)
+  model TEXT NOT NULL,
+  prompt_version TEXT NOT NULL,
+  result JSONB NOT NULL,
+  hits INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  last_hit_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Eviction drops the least recently used entries beyond the size cap
+CREATE INDEX IF NOT EXISTS idx_classification_cache_last_hit ON classification_cache(last_hit_at);
@@ -0,0 +1,20 @@
+-- Migration: Persistent MinHash LSH index for near-duplicate postings
+-- scripts/classify_jobs.py classifies one representative per cluster of
+-- near-identical descriptions and copies its result to the others
+
+CREATE TABLE IF NOT EXISTS posting_signatures (
+  raw_id TEXT PRIMARY KEY,
+  signature BIGINT[] NOT NULL,  -- MinHash values, one per permutation
+  prompt_version TEXT NOT NULL,
+  result JSONB NOT NULL,  -- StructuredJob of the representative
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS posting_lsh_buckets (
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL,
+  raw_id TEXT NOT NULL REFERENCES posting_signatures(raw_id) ON DELETE CASCADE,
+  PRIMARY KEY (band, bucket, raw_id)
+);
+
+COMMENT ON TABLE posting_lsh_buckets IS 'LSH band hashes: postings sharing any (band, bucket) are near-duplicate candidates';
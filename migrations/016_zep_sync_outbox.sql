@@ -0,0 +1,32 @@
+-- Migration: Transactional outbox for ZEP graph sync
+-- scripts/classify_jobs.py inserts a row in the same transaction as the job
+-- update; scripts/zep_outbox.py drains it, so a slow or down graph API never
+-- holds up classification
+
+CREATE TABLE IF NOT EXISTS zep_sync_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  job_id TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',  -- pending, sending, done, dead
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 8,
+  available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  claimed_by TEXT,
+  lease_expires_at TIMESTAMP WITH TIME ZONE,
+  last_error TEXT,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Drainer claims scan only live rows
+CREATE INDEX IF NOT EXISTS idx_zep_sync_outbox_claimable
+  ON zep_sync_outbox(available_at, id)
+  WHERE status IN ('pending', 'sending');
+
+-- Retention delete of delivered rows (OutboxDrainer.purge_done, ZEP_OUTBOX_RETENTION_DAYS)
+CREATE INDEX IF NOT EXISTS idx_zep_sync_outbox_sent
+  ON zep_sync_outbox(sent_at)
+  WHERE status = 'done';
+
+COMMENT ON TABLE zep_sync_outbox IS 'Jobs awaiting sync to the ZEP knowledge graph, written with the classification';
+COMMENT ON COLUMN zep_sync_outbox.available_at IS 'Retry backoff: rows are not claimed before this';
+COMMENT ON COLUMN zep_sync_outbox.lease_expires_at IS 'Sending rows past this are reclaimed by another drainer';
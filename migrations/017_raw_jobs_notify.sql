@@ -0,0 +1,21 @@
+-- Migration: Wake the classification daemon when raw_jobs are written
+-- scripts/classify_jobs.py --daemon LISTENs on raw_jobs_pending instead of
+-- polling. Statement-level, so a bulk COPY + merge sends one notification;
+-- Postgres delivers it on commit and folds duplicates within a transaction
+
+CREATE OR REPLACE FUNCTION notify_raw_jobs_pending() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('raw_jobs_pending', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- INSERT only: the classifier's own claim/mark UPDATEs must not wake it.
+-- INSERT ... ON CONFLICT DO UPDATE still fires the INSERT statement trigger
+DROP TRIGGER IF EXISTS raw_jobs_notify_pending ON raw_jobs;
+CREATE TRIGGER raw_jobs_notify_pending
+  AFTER INSERT ON raw_jobs
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_raw_jobs_pending();
+
+COMMENT ON FUNCTION notify_raw_jobs_pending() IS 'NOTIFY raw_jobs_pending after inserts/upserts into raw_jobs';
@@ -0,0 +1,44 @@
+-- Migration: Prompt/source fingerprints for incremental re-classification
+-- scripts/classify_jobs.py records, with each classification, the prompt
+-- fingerprint it ran under and a hash of the source posting. --reclassify-stale
+-- re-runs only processed rows where either differs, walking them in id order
+-- behind a saved cursor so a long re-run can stop and resume
+
+-- Hash of the source fields the prompt is built from; title, company and
+-- description only, so churn in applicant counts etc. does not count as a change.
+-- Each field takes the first non-empty key variant in the order the Apify sync
+-- service's to_staging_record reads them (LinkedIn, then Ashby/Greenhouse
+-- style), i.e. the same value it writes to jobs.title, jobs.company_name and
+-- jobs.full_description, which the prompt prefers over raw_data
+CREATE OR REPLACE FUNCTION raw_job_source_hash(raw_data JSONB) RETURNS TEXT AS $$
+  SELECT md5(
+    coalesce(nullif(raw_data->>'job_title', ''), nullif(raw_data->>'title', ''),
+             raw_data->>'position', '') || E'\n' ||
+    coalesce(nullif(raw_data->>'company_name', ''), nullif(raw_data->>'organization', ''),
+             raw_data->>'company', '') || E'\n' ||
+    coalesce(nullif(raw_data->>'job_description', ''), nullif(raw_data->>'description_text', ''),
+             raw_data->>'description', '')
+  )
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE raw_jobs ADD COLUMN IF NOT EXISTS classified_prompt_version TEXT;
+ALTER TABLE raw_jobs ADD COLUMN IF NOT EXISTS classified_source_hash TEXT;
+
+-- Stale scans walk processed rows in primary-key order
+CREATE INDEX IF NOT EXISTS idx_raw_jobs_processed_id
+  ON raw_jobs(id)
+  WHERE processing_status = 'processed';
+
+CREATE TABLE IF NOT EXISTS classification_cursors (
+  name TEXT PRIMARY KEY,            -- e.g. 'reclassify-stale' or 'reclassify-stale:linkedin'
+  prompt_version TEXT NOT NULL,     -- fingerprint the pass is re-classifying towards
+  last_raw_id TEXT,                 -- last raw_jobs.id fully flushed; NULL = from the start
+  processed INTEGER NOT NULL DEFAULT 0,
+  started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  completed_at TIMESTAMP WITH TIME ZONE
+);
+
+COMMENT ON COLUMN raw_jobs.classified_prompt_version IS 'classify_jobs.PROMPT_VERSION of the last successful classification';
+COMMENT ON COLUMN raw_jobs.classified_source_hash IS 'raw_job_source_hash(raw_data) when last classified';
+COMMENT ON TABLE classification_cursors IS 'Resume points for classify_jobs.py --reclassify-stale passes';
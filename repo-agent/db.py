@@ -0,0 +1,65 @@
+"""
+Pooled Neon access for the repo agent
+
+One asyncpg pool per process, opened in the app lifespan and reused by every
+request, so handlers no longer pay a TCP+TLS+auth handshake to Neon each time.
+"""
+import asyncio
+import os
+from typing import Any, Optional
+
+import asyncpg
+
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "5"))
+# Set to 0 when connecting through a transaction-mode pooler
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+_connections_opened = 0
+
+
+async def _on_connect(conn: asyncpg.Connection):
+    global _connections_opened
+    _connections_opened += 1
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Return the process pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                database_url = os.environ.get("DATABASE_URL")
+                if not database_url:
+                    raise RuntimeError("DATABASE_URL not set")
+                _pool = await asyncpg.create_pool(
+                    database_url,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                    init=_on_connect,
+                )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def pool_metrics() -> dict[str, Any]:
+    if _pool is None:
+        return {"initialised": False}
+    return {
+        "initialised": True,
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "connections_opened": _connections_opened,
+    }
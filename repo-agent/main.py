@@ -8,6 +8,7 @@ Deploy on Railway:
 """
 import os
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -16,6 +17,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic_ai import Agent
 from dotenv import load_dotenv
 
+from db import close_pool, get_pool, pool_metrics
 from models import (
     ExtractedPreference,
     ExtractionRequest,
@@ -28,10 +30,24 @@ from models import (
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the Neon pool up front so the first request doesn't pay for it"""
+    if os.environ.get("DATABASE_URL"):
+        try:
+            await get_pool()
+        except Exception as e:
+            print(f"[Repo Agent] Pool init failed, will retry on demand: {e}")
+    yield
+    await close_pool()
+
+
 app = FastAPI(
     title="Repo Agent",
     description="Pydantic AI agent for career preference extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -143,55 +159,51 @@ async def extract_preferences(request: ExtractionRequest):
 @app.post("/validate")
 async def validate_preference(request: SavePreferenceRequest):
     """Save validated preference to Neon"""
-    import asyncpg
-
-    database_url = os.environ.get("DATABASE_URL")
-    if not database_url:
+    if not os.environ.get("DATABASE_URL"):
         raise HTTPException(status_code=500, detail="Database not configured")
 
     try:
-        conn = await asyncpg.connect(database_url)
+        pool = await get_pool()
 
-        user_row = await conn.fetchrow(
-            "SELECT id FROM users WHERE neon_auth_id = $1 LIMIT 1",
-            request.user_id
-        )
-
-        if not user_row:
-            await conn.close()
-            raise HTTPException(status_code=404, detail="User not found")
-
-        internal_user_id = user_row["id"]
-
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS user_repo_preferences (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                preference_type VARCHAR(50) NOT NULL,
-                preference_value TEXT NOT NULL,
-                validation_type VARCHAR(20) DEFAULT 'soft',
-                raw_text TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, preference_type, preference_value)
+        async with pool.acquire() as conn:
+            user_row = await conn.fetchrow(
+                "SELECT id FROM users WHERE neon_auth_id = $1 LIMIT 1",
+                request.user_id
             )
-        """)
-
-        saved = []
-        for value in request.values:
-            result = await conn.fetchrow("""
-                INSERT INTO user_repo_preferences
-                (user_id, preference_type, preference_value, validation_type, raw_text)
-                VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT (user_id, preference_type, preference_value)
-                DO UPDATE SET validation_type = EXCLUDED.validation_type
-                RETURNING id, preference_value, validation_type
-            """, internal_user_id, request.preference_type.value, value,
-                request.validation_type.value, request.raw_text)
-
-            if result:
-                saved.append(dict(result))
-
-        await conn.close()
+
+            if not user_row:
+                raise HTTPException(status_code=404, detail="User not found")
+
+            internal_user_id = user_row["id"]
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_repo_preferences (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                    preference_type VARCHAR(50) NOT NULL,
+                    preference_value TEXT NOT NULL,
+                    validation_type VARCHAR(20) DEFAULT 'soft',
+                    raw_text TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, preference_type, preference_value)
+                )
+            """)
+
+            saved = []
+            for value in request.values:
+                result = await conn.fetchrow("""
+                    INSERT INTO user_repo_preferences
+                    (user_id, preference_type, preference_value, validation_type, raw_text)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (user_id, preference_type, preference_value)
+                    DO UPDATE SET validation_type = EXCLUDED.validation_type
+                    RETURNING id, preference_value, validation_type
+                """, internal_user_id, request.preference_type.value, value,
+                    request.validation_type.value, request.raw_text)
+
+                if result:
+                    saved.append(dict(result))
+
         return {"success": True, "saved": saved}
 
     except HTTPException:
@@ -203,7 +215,7 @@ async def validate_preference(request: SavePreferenceRequest):
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "agent": "repo", "model": "gemini-2.0-flash"}
+    return {"status": "ok", "agent": "repo", "model": "gemini-2.0-flash", "db_pool": pool_metrics()}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+"""
+Rule extractor benchmark: accuracy and latency against labelled postings
+
+Labels are the structured fields the model already wrote for classified jobs
+(read-only query), or a JSONL file with one posting per line:
+
+    {"title": ..., "description": ..., "location": ..., "employment_type": ...,
+     "compensation": ..., "labels": {"employment_type": ..., "is_fractional": ..., ...}}
+
+For each field it reports coverage (share of postings at or above the
+confidence threshold), accuracy on the covered postings, and accuracy if the
+rules were trusted everywhere; then how many postings would skip the full
+classification and the per-posting extraction latency.
+
+Usage:
+    python bench_fast_extract.py --limit 2000
+    python bench_fast_extract.py --sample labelled.jsonl --min-confidence 0.85
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from fast_extract import RULE_FIELDS, extract, low_confidence
+
+# Model-written columns on jobs that correspond to rule fields (salary_type is not stored)
+LABEL_COLUMNS = {
+    'employment_type': 'employment_type',
+    'is_fractional': 'is_fractional',
+    'days_per_week': 'hours_per_week',
+    'is_remote': 'is_remote',
+    'seniority_level': 'seniority_level',
+    'role_category': 'role_category',
+    'salary_min': 'salary_min',
+    'salary_max': 'salary_max',
+    'salary_currency': 'salary_currency',
+}
+
+
+def load_from_database(limit: int) -> list[dict]:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    # jobs.full_description holds the rewritten prose after classification,
+    # so the original posting text comes from raw_data
+    select_labels = ", ".join(f"j.{column}::text AS {field}" for field, column in LABEL_COLUMNS.items())
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"""
+                SELECT r.raw_data->>'job_title' AS title,
+                       r.raw_data->>'job_description' AS description,
+                       r.raw_data->>'location' AS location,
+                       r.raw_data->>'employment_type' AS employment_hint,
+                       r.raw_data->>'salary_range' AS compensation,
+                       {select_labels}
+                FROM raw_jobs r
+                JOIN jobs j ON j.id = r.job_id
+                WHERE r.processing_status = 'processed'
+                AND j.classification_reasoning LIKE 'Pydantic AI%%'
+                ORDER BY r.processed_at DESC
+                LIMIT %s
+            """, (limit,))
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    return [
+        {
+            'title': row['title'],
+            'description': row['description'],
+            'location': row['location'],
+            'employment_type': row['employment_hint'],
+            'compensation': row['compensation'],
+            'labels': {field: row[field] for field in LABEL_COLUMNS},
+        }
+        for row in rows
+    ]
+
+
+def load_from_file(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize(value) -> str:
+    """Compare database text, JSON and Python values on equal terms"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    text = str(value).strip().lower()
+    return {'t': 'true', 'f': 'false'}.get(text, text)
+
+
+def run(sample: list[dict], min_confidence: float):
+    covered = {field: 0 for field in RULE_FIELDS}
+    correct_covered = {field: 0 for field in RULE_FIELDS}
+    correct_all = {field: 0 for field in RULE_FIELDS}
+    labelled = {field: 0 for field in RULE_FIELDS}
+    fully_covered = 0
+    timings = []
+
+    for posting in sample:
+        started = time.perf_counter()
+        fields = extract(
+            posting.get('title') or '',
+            posting.get('description') or '',
+            posting.get('location') or '',
+            posting.get('employment_type') or '',
+            posting.get('compensation') or '',
+        )
+        timings.append(time.perf_counter() - started)
+
+        if not low_confidence(fields, min_confidence):
+            fully_covered += 1
+
+        for field, expected in posting['labels'].items():
+            if field not in fields:
+                continue
+            guess = fields[field]
+            hit = normalize(guess.value) == normalize(expected)
+            labelled[field] += 1
+            correct_all[field] += hit
+            if guess.confidence >= min_confidence:
+                covered[field] += 1
+                correct_covered[field] += hit
+
+    print(f"{len(sample)} labelled postings, confidence threshold {min_confidence}\n")
+    print(f"{'field':>16} | {'coverage':>8} | {'acc (covered)':>13} | {'acc (all)':>9}")
+    for field in RULE_FIELDS:
+        if not labelled[field]:
+            continue
+        coverage = covered[field] / labelled[field]
+        acc_covered = correct_covered[field] / covered[field] if covered[field] else 0.0
+        acc_all = correct_all[field] / labelled[field]
+        print(f"{field:>16} | {coverage:>8.0%} | {acc_covered:>13.1%} | {acc_all:>9.1%}")
+
+    timings_us = sorted(t * 1_000_000 for t in timings)
+    p95 = timings_us[int(len(timings_us) * 0.95) - 1] if len(timings_us) >= 20 else timings_us[-1]
+    print(f"\nEditorial-only (all fields confident): {fully_covered}/{len(sample)} ({fully_covered / len(sample):.0%})")
+    print(f"Extraction latency: p50 {statistics.median(timings_us):.0f}µs, p95 {p95:.0f}µs per posting")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rule-based field extraction")
+    parser.add_argument("--sample", help="Labelled JSONL file; defaults to classified jobs in DATABASE_URL")
+    parser.add_argument("--limit", type=int, default=1000, help="Postings to read from the database")
+    parser.add_argument("--min-confidence", type=float, default=float(os.environ.get('CLASSIFY_RULES_MIN_CONFIDENCE', '0.8')))
+    args = parser.parse_args()
+
+    sample = load_from_file(args.sample) if args.sample else load_from_database(args.limit)
+    if not sample:
+        raise SystemExit("No labelled postings found")
+    run(sample, args.min_confidence)
@@ -0,0 +1,101 @@
+"""
+Per-call token cost of the static classification prompt
+
+Reads the system prompt (the SYSTEM_PROMPT constant, or the Agent's
+system_prompt= argument in older trees) and the StructuredJob field
+descriptions (which go out as the output schema) straight from
+classify_jobs.py, at the working tree and at a git revision, and reports the estimated input tokens each one adds to every
+agent.run. Output savings are the link markup the model no longer generates
+now that link_injector adds it.
+
+Token counts are estimated at ~4 characters per token, which is close for
+English prose with Gemini's tokenizer; pass --gemini to count with the API.
+
+Usage:
+    python bench_prompt_tokens.py --baseline-ref HEAD~1
+"""
+import argparse
+import ast
+import os
+import subprocess
+from typing import Optional
+
+from link_injector import CLUSTERS, MAX_LINKS, MIN_LINKS
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classify_jobs.py')
+
+
+def literal_text(node: ast.expr) -> tuple[Optional[str], Optional[str]]:
+    """(text, None) for a string literal, else (None, why it cannot be measured)"""
+    if isinstance(node, ast.JoinedStr):
+        return None, 'f-string'
+    try:
+        value = ast.literal_eval(node)
+    except ValueError:
+        return None, 'not a literal'
+    return (value, None) if isinstance(value, str) else (None, 'not a string')
+
+
+def static_prompt_text(source: str) -> tuple[tuple[Optional[str], Optional[str]], str]:
+    """((system prompt or None, why missing), schema descriptions) as written in a version of classify_jobs.py"""
+    tree = ast.parse(source)
+    system_prompt, descriptions = (None, 'missing'), []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'SYSTEM_PROMPT' for t in node.targets):
+            system_prompt = literal_text(node.value)
+        if isinstance(node, ast.ClassDef) and node.name == 'StructuredJob':
+            for call in ast.walk(node):
+                if isinstance(call, ast.Call):
+                    for keyword in call.keywords:
+                        if keyword.arg == 'description' and isinstance(keyword.value, ast.Constant):
+                            descriptions.append(keyword.value.value)
+    if system_prompt[1] == 'missing':
+        # Before SYSTEM_PROMPT existed the prompt was passed inline to Agent(...)
+        for call in ast.walk(tree):
+            if isinstance(call, ast.Call):
+                for keyword in call.keywords:
+                    if keyword.arg == 'system_prompt':
+                        system_prompt = literal_text(keyword.value)
+    return system_prompt, "\n".join(descriptions)
+
+
+def count_tokens(text: str, use_gemini: bool) -> int:
+    if use_gemini:
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY'))
+        return genai.GenerativeModel('gemini-2.0-flash').count_tokens(text).total_tokens
+    return round(len(text) / 4)
+
+
+def main(baseline_ref: str, use_gemini: bool):
+    with open(SCRIPT) as f:
+        current = static_prompt_text(f.read())
+    baseline_source = subprocess.run(
+        ['git', 'show', f'{baseline_ref}:scripts/classify_jobs.py'],
+        cwd=os.path.dirname(SCRIPT), capture_output=True, text=True, check=True,
+    ).stdout
+    baseline = static_prompt_text(baseline_source)
+
+    print(f"{'input per call':>18} | {baseline_ref:>10} | {'current':>8} | saved")
+    for label, before, after in (('system prompt', baseline[0], current[0]),
+                                 ('schema text', (baseline[1], None), (current[1], None))):
+        if before[0] is None or after[0] is None:
+            cells = [f"({side[1]})" if side[0] is None else count_tokens(side[0], use_gemini)
+                     for side in (before, after)]
+            print(f"{label:>18} | {cells[0]:>10} | {cells[1]:>8} | n/a")
+            continue
+        b, a = count_tokens(before[0], use_gemini), count_tokens(after[0], use_gemini)
+        saved = f"{b - a} ({(b - a) / b:.0%})" if b else "n/a"
+        print(f"{label:>18} | {b:>10} | {a:>8} | {saved}")
+
+    markup = sorted(count_tokens(f"[]({cluster.url})", use_gemini) for cluster in CLUSTERS)
+    print(f"\nOutput per call: ~{sum(markup[:MIN_LINKS])}-{sum(markup[-MAX_LINKS:])} tokens of link markup "
+          f"({MIN_LINKS}-{MAX_LINKS} links) now added by link_injector instead of generated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate static prompt tokens per classification call")
+    parser.add_argument("--baseline-ref", default="HEAD", help="git revision to compare against")
+    parser.add_argument("--gemini", action="store_true", help="Count tokens with the Gemini API")
+    args = parser.parse_args()
+    main(args.baseline_ref, args.gemini)
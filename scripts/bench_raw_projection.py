@@ -0,0 +1,117 @@
+"""
+raw_data projection benchmark: bytes transferred and parse time per 1k jobs
+
+Compares what the classifier used to fetch (the whole raw_data document,
+parsed with json.loads) with the server-side ->> projection into a RawPosting.
+Reads recent raw_jobs (read-only query), or a JSONL file with one raw_data
+payload per line:
+
+    {"job_title": ..., "job_description": ..., "company_name": ..., ...}
+
+Bytes are the payload text received for the raw_data columns (protocol
+overhead excluded). Fetch time is the query round trip; parse time is the
+Python work to get from received text to the values the prompt uses.
+
+Usage:
+    python bench_raw_projection.py --limit 5000
+    python bench_raw_projection.py --sample payloads.jsonl
+"""
+import argparse
+import json
+import os
+import time
+
+from raw_posting import RAW_POSTING_PROJECTION, RawPosting
+
+
+def project(payload: dict) -> list:
+    """What Postgres returns for raw_data->>'key': text for strings, JSON text for the rest, NULL if absent"""
+    values = []
+    for key in RawPosting._fields:
+        value = payload.get(key)
+        values.append(value if value is None or isinstance(value, str) else json.dumps(value))
+    return values
+
+
+def parse_full(documents: list[str]) -> float:
+    started = time.perf_counter()
+    for text in documents:
+        raw_data = json.loads(text)
+        tuple(raw_data.get(key) for key in RawPosting._fields)
+    return time.perf_counter() - started
+
+
+def parse_projected(rows: list) -> float:
+    started = time.perf_counter()
+    for values in rows:
+        RawPosting(*values)
+    return time.perf_counter() - started
+
+
+def text_bytes(values) -> int:
+    return sum(len(value.encode('utf-8')) for value in values if value is not None)
+
+
+def load_from_database(limit: int) -> dict:
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        with conn.cursor() as cur:
+            # ::text keeps psycopg2 from parsing during the fetch, so parsing is timed separately
+            started = time.perf_counter()
+            cur.execute("SELECT raw_data::text FROM raw_jobs ORDER BY received_at DESC LIMIT %s", (limit,))
+            documents = [row[0] for row in cur.fetchall()]
+            full_fetch = time.perf_counter() - started
+
+            started = time.perf_counter()
+            cur.execute(f"SELECT {RAW_POSTING_PROJECTION} FROM raw_jobs ORDER BY received_at DESC LIMIT %s",
+                        (limit,))
+            projected = cur.fetchall()
+            projected_fetch = time.perf_counter() - started
+    finally:
+        conn.close()
+
+    return {'documents': documents, 'projected': projected, 'full_fetch': full_fetch,
+            'projected_fetch': projected_fetch}
+
+
+def load_from_file(path: str) -> dict:
+    with open(path) as f:
+        documents = [line.strip() for line in f if line.strip()]
+    return {'documents': documents, 'projected': [project(json.loads(text)) for text in documents],
+            'full_fetch': None, 'projected_fetch': None}
+
+
+def run(sample: dict):
+    documents, projected = sample['documents'], sample['projected']
+    per_1k = 1000 / len(documents)
+
+    full_bytes = sum(len(text.encode('utf-8')) for text in documents) * per_1k
+    projected_bytes = sum(text_bytes(values) for values in projected) * per_1k
+    full_parse = parse_full(documents) * per_1k
+    projected_parse = parse_projected(projected) * per_1k
+
+    print(f"{len(documents)} postings, figures per 1k jobs\n")
+    print(f"{'':>12} | {'full raw_data':>13} | {'->> projection':>14} | saved")
+    print(f"{'bytes':>12} | {full_bytes / 1024:>10.0f} KB | {projected_bytes / 1024:>11.0f} KB | "
+          f"{1 - projected_bytes / full_bytes:.0%}")
+    print(f"{'parse':>12} | {full_parse * 1000:>10.1f} ms | {projected_parse * 1000:>11.1f} ms | "
+          f"{1 - projected_parse / full_parse:.0%}")
+    if sample['full_fetch'] is not None:
+        full_fetch = sample['full_fetch'] * per_1k
+        projected_fetch = sample['projected_fetch'] * per_1k
+        print(f"{'fetch':>12} | {full_fetch * 1000:>10.1f} ms | {projected_fetch * 1000:>11.1f} ms | "
+              f"{1 - projected_fetch / full_fetch:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the raw_data ->> projection")
+    parser.add_argument("--sample", help="JSONL of raw_data payloads; defaults to recent raw_jobs in DATABASE_URL")
+    parser.add_argument("--limit", type=int, default=1000, help="Rows to read from the database")
+    args = parser.parse_args()
+
+    sample = load_from_file(args.sample) if args.sample else load_from_database(args.limit)
+    if not sample['documents']:
+        raise SystemExit("No raw_jobs found")
+    run(sample)
@@ -0,0 +1,146 @@
+"""
+Exercise GeminiContextCache against a local stub of the Gemini API
+
+The stub implements cachedContents.create and generateContent, and records
+which handle every generate request carried. The check fails unless:
+  - concurrent calls register the prefix exactly once and all reuse that handle
+  - generate requests never resend the system instruction
+  - an expired handle is replaced once and the new one is reused
+  - a provider rejection falls back cleanly (CacheUnavailable)
+
+Usage:
+    python check_context_cache.py
+"""
+import asyncio
+import json
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pydantic import BaseModel
+
+from context_cache import CacheUnavailable, GeminiContextCache
+
+
+class Reply(BaseModel):
+    summary: str
+    is_remote: bool
+
+
+class StubGemini:
+    def __init__(self):
+        self.created: list[str] = []
+        self.used_handles: list[str] = []
+        self.expired: set[str] = set()
+        self.resent_system_instruction = 0
+        self.reject_creates = False
+
+
+def make_handler(stub: StubGemini):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+            if self.path == '/v1beta/cachedContents':
+                if stub.reject_creates:
+                    return self.reply(400, {'error': {'message': 'Cached content is too small'}})
+                name = f"cachedContents/stub-{len(stub.created) + 1}"
+                stub.created.append(name)
+                text = body['systemInstruction']['parts'][0]['text']
+                expires = datetime.now(timezone.utc) + timedelta(seconds=int(body['ttl'].rstrip('s')))
+                return self.reply(200, {
+                    'name': name,
+                    'expireTime': expires.isoformat().replace('+00:00', 'Z'),
+                    'usageMetadata': {'totalTokenCount': len(text) // 4},
+                })
+
+            if self.path.endswith(':generateContent'):
+                handle = body.get('cachedContent')
+                stub.used_handles.append(handle)
+                if 'systemInstruction' in body:
+                    stub.resent_system_instruction += 1
+                if handle in stub.expired or handle not in stub.created:
+                    return self.reply(404, {'error': {'message': 'CachedContent not found'}})
+                prefix = 600
+                return self.reply(200, {
+                    'candidates': [{'content': {'parts': [{'text': json.dumps({'summary': 'ok', 'is_remote': True})}]}}],
+                    'usageMetadata': {'promptTokenCount': prefix + 150, 'cachedContentTokenCount': prefix,
+                                      'candidatesTokenCount': 40},
+                })
+
+            self.reply(404, {})
+
+    return Handler
+
+
+def check(condition: bool, message: str, failures: list[str]):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+async def main() -> int:
+    stub = StubGemini()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    failures: list[str] = []
+
+    cache = GeminiContextCache('stub-key', 'gemini-2.0-flash-001', 'You are a test prompt. ' * 200, 600, base_url)
+    try:
+        results = await asyncio.gather(*(cache.generate(f"posting {i}", Reply) for i in range(20)))
+        check(all(reply.summary == 'ok' for reply, _ in results), "replies parsed into the output model", failures)
+        check(all(usage['cached_tokens'] == 600 for _, usage in results), "usage reported with each reply", failures)
+        check(len(stub.created) == 1, f"20 concurrent calls created {len(stub.created)} cache(s)", failures)
+        check(set(stub.used_handles) == {stub.created[0]}, "every call referenced the same handle", failures)
+        check(stub.resent_system_instruction == 0, "no call resent the system instruction", failures)
+
+        stub.expired.add(stub.created[0])
+        stub.used_handles.clear()
+        await asyncio.gather(*(cache.generate(f"posting {i}", Reply) for i in range(5)))
+        check(len(stub.created) == 2, f"expired handle replaced ({len(stub.created) - 1} re-registration)", failures)
+        check(stub.used_handles[-1] == stub.created[1], "calls moved to the new handle", failures)
+
+        stats = cache.stats()
+        print(f"  prefix {stats['prefix_tokens']} tokens; {stats['cached_tokens']} of {stats['prompt_tokens']} "
+              f"prompt tokens cached; prefix cost {stats['prefix_cost_cached']:.0f} vs "
+              f"{stats['prefix_cost_uncached']} uncached ({stats['saved_ratio']:.0%} saved)")
+    finally:
+        await cache.close()
+
+    stub.reject_creates = True
+    rejected = GeminiContextCache('stub-key', 'gemini-2.0-flash-001', 'short', 600, base_url)
+    try:
+        try:
+            await rejected.generate("posting", Reply)
+            check(False, "provider rejection raises CacheUnavailable", failures)
+        except CacheUnavailable:
+            check(True, "provider rejection raises CacheUnavailable", failures)
+        created_before = len(stub.created)
+        try:
+            await rejected.generate("posting", Reply)
+        except CacheUnavailable:
+            pass
+        check(len(stub.created) == created_before, "rejected prefix is not retried on every call", failures)
+    finally:
+        await rejected.close()
+        server.shutdown()
+
+    print(f"\n{'FAILED' if failures else 'OK'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,123 @@
+"""
+Exercise the fast_extract rules against postings they used to get wrong
+
+Each case runs extract() on a posting and states what a field must come back
+as: a value at or above the classifier's confidence threshold (the rules
+decide and the model is told not to contradict it), or "unsure" (below the
+threshold, so the model decides). The check fails if any case disagrees.
+
+Usage:
+    python check_fast_extract.py
+"""
+import sys
+
+from fast_extract import extract
+
+# Same default as classify_jobs.CLASSIFY_RULES_MIN_CONFIDENCE
+MIN_CONFIDENCE = 0.8
+UNSURE = object()
+
+# (what it covers, title, description, other extract() arguments, {field: expected value or UNSURE})
+CASES = [
+    ("day rate without a currency symbol is kept",
+     "Part-time Finance Director", "Day rate: 650 - 750", {},
+     {'salary_min': 650, 'salary_max': 750, 'salary_type': 'daily', 'salary_currency': UNSURE}),
+    ("no pay figure leaves salary to the model",
+     "Finance Director", "Competitive salary. Full-time, office based.", {},
+     {'salary_min': UNSURE, 'salary_max': UNSURE, 'salary_currency': UNSURE, 'salary_type': UNSURE}),
+    ("funding round is not pay",
+     "Fractional CFO", "We raised $20m Series B last year and are scaling fast.", {},
+     {'salary_min': UNSURE, 'salary_currency': UNSURE, 'salary_type': UNSURE}),
+    ("number near unrelated wording is not pay",
+     "Operations Manager", "We have 30 days a year holiday and 250 staff.", {},
+     {'salary_min': UNSURE, 'salary_type': UNSURE}),
+    ("quoted rate with a unit is confident",
+     "Interim CFO", "£900 per day, 2-3 days per week, outside IR35.", {},
+     {'salary_min': 900, 'salary_currency': 'GBP', 'salary_type': 'daily', 'days_per_week': '2-3 days'}),
+    ("compensation field figure is used",
+     "Head of Marketing", "Lead our brand team.", {'compensation': "$120,000 - $140,000 per year"},
+     {'salary_min': 120000, 'salary_max': 140000, 'salary_currency': 'USD', 'salary_type': 'annual'}),
+    ("salary wording makes the figure annual",
+     "Head of Marketing", "Salary £80-100k", {},
+     {'salary_min': 80000, 'salary_max': 100000, 'salary_type': 'annual', 'salary_currency': 'GBP'}),
+    ("currency follows a low-confidence amount",
+     "Head of Marketing", "Package: £80-100k plus equity", {},
+     {'salary_min': UNSURE, 'salary_type': UNSURE, 'salary_currency': UNSURE}),
+    ("days written as a word with 'weekly'",
+     "Fractional CFO", "Three days weekly, hybrid in London.", {},
+     {'days_per_week': '3 days'}),
+    ("no days mentioned leaves days to the model",
+     "Finance Director", "A permanent role leading the finance team.", {},
+     {'days_per_week': UNSURE}),
+    ("CPO as Chief Product Officer is Product",
+     "Fractional CPO — Chief Product Officer", "", {},
+     {'role_category': 'Product', 'seniority_level': 'Executive'}),
+    ("CPO for People is not confidently Product",
+     "Fractional CPO (People)", "", {},
+     {'role_category': UNSURE}),
+    ("HR Business Partner is not Executive",
+     "HR Business Partner", "", {},
+     {'role_category': 'HR', 'seniority_level': UNSURE}),
+    ("managing partner is Executive",
+     "Managing Partner", "", {},
+     {'seniority_level': 'Executive'}),
+    ("'it' in a title is not IT",
+     "Make It Happen: Interim Finance Lead", "", {},
+     {'role_category': 'Finance'}),
+    ("IT acronym is Engineering",
+     "Interim IT Director", "", {},
+     {'role_category': 'Engineering'}),
+    ("PR acronym is Marketing",
+     "Head of PR", "", {},
+     {'role_category': 'Marketing'}),
+    ("hybrid office days on a full-time role are not fractional",
+     "Senior Accountant", "Permanent, full-time. Hybrid working: 3 days per week in the office.",
+     {'employment_hint': 'Full-time'},
+     {'employment_type': 'full-time', 'is_fractional': False, 'days_per_week': UNSURE}),
+    ("a five-day office week is not fractional",
+     "Finance Manager", "5 days a week in the office, central London.", {},
+     {'is_fractional': UNSURE, 'days_per_week': UNSURE}),
+    ("a short week alone is left to the model",
+     "Finance Director", "Two days per week, flexible.", {},
+     {'days_per_week': '2 days', 'is_fractional': UNSURE}),
+    ("no remote wording leaves is_remote to the model",
+     "Finance Director", "Leading the finance team.", {},
+     {'is_remote': UNSURE}),
+    ("Founder Associate is not Executive",
+     "Founder Associate", "", {},
+     {'seniority_level': 'Junior'}),
+    ("Co-founder title is Executive",
+     "Co-Founder & CTO", "", {},
+     {'seniority_level': 'Executive'}),
+    ("a rejected small number does not hide the next figure",
+     "Interim FD", "3 month contract, £600 per day", {},
+     {'salary_min': 600, 'salary_type': 'daily', 'salary_currency': 'GBP'}),
+]
+
+
+def check(condition: bool, message: str, failures: list[str]):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def main() -> int:
+    failures: list[str] = []
+    for name, title, description, arguments, expected in CASES:
+        fields = extract(title, description, **arguments)
+        wrong = []
+        for field, want in expected.items():
+            got = fields[field]
+            if want is UNSURE:
+                if got.confidence >= MIN_CONFIDENCE:
+                    wrong.append(f"{field}={got.value!r} at {got.confidence} should be unsure")
+            elif got.value != want or got.confidence < MIN_CONFIDENCE:
+                wrong.append(f"{field}={got.value!r} at {got.confidence}, expected {want!r}")
+        check(not wrong, name + (f": {'; '.join(wrong)}" if wrong else ""), failures)
+
+    print(f"\n{'FAILED' if failures else 'OK'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
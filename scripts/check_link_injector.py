@@ -0,0 +1,63 @@
+"""
+Exercise inject_links across every role category
+
+Runs each category (same list as classify_jobs.ALLOWED_VALUES['role_category'],
+most of which have no cluster page of their own) against prose with no
+anchors, a few anchors, anchors for every cluster, and links the model wrote
+itself. The check fails unless every result has MIN_LINKS-MAX_LINKS unique
+internal links, all to known cluster pages, with the job's own cluster linked
+when it has one and the model did not already supply enough links.
+
+Usage:
+    python check_link_injector.py
+"""
+import re
+import sys
+
+from link_injector import CLUSTERS, MAX_LINKS, MIN_LINKS, inject_links
+
+ROLE_CATEGORIES = ('Engineering', 'Marketing', 'Finance', 'Operations', 'Sales', 'HR', 'Product', 'Design',
+                   'Data', 'Legal', 'Customer Success', 'Other')
+
+PROSE = {
+    'no anchors': "Lead the commercial team through its next stage of growth. You will own the pipeline.",
+    'one anchor': "A fractional leader to own the pipeline and coach the team two days a week.",
+    'every cluster': "Work with our CFO, CMO, CTO and COO as a fractional executive across the portfolio.",
+    'model links': "See [fractional jobs](/fractional-jobs) and [more roles](/fractional-jobs) or the "
+                   "[CFO page](/fractional-cfo-jobs-uk).",
+}
+
+_LINK = re.compile(r"\]\(([^)\s]+)\)")
+
+
+def check(condition: bool, message: str, failures: list[str]):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def main() -> int:
+    failures: list[str] = []
+    known = {cluster.url for cluster in CLUSTERS}
+    for category in ROLE_CATEGORIES:
+        own = next((cluster.url for cluster in CLUSTERS if cluster.role_category == category), None)
+        wrong = []
+        for name, prose in PROSE.items():
+            urls = _LINK.findall(inject_links(prose, category))
+            unique = set(urls)
+            if not MIN_LINKS <= len(unique) <= MAX_LINKS:
+                wrong.append(f"{name}: {len(unique)} unique links")
+            if len(urls) != len(unique):
+                wrong.append(f"{name}: repeated URL")
+            if unique - known:
+                wrong.append(f"{name}: unknown {sorted(unique - known)}")
+            if own and own not in unique and not _LINK.search(prose):
+                wrong.append(f"{name}: own cluster {own} missing")
+        check(not wrong, f"{category}" + (f": {'; '.join(wrong)}" if wrong else ""), failures)
+
+    print(f"\n{'FAILED' if failures else 'OK'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Exercise AdaptiveRateLimiter and the requeue-with-backoff loop against a fake model
+
+The fake model enforces its own requests-per-window quota (well below what the
+limiter is configured for) and injects extra random 429s with a Retry-After.
+Workers mirror classify_jobs.classify_stage: a TransientError puts the job back
+on the queue after retry_delay() instead of failing it. The check fails unless:
+  - every job is classified and none is reported as failed
+  - 429s were seen and cut the limiter's rates below the configured quota
+  - the limiter kept 429s rare once it had adapted, without starving throughput
+  - throttled time and working time were both measured
+
+Time is scaled down (a 1.2s "minute") so the run takes a few seconds.
+
+Usage:
+    python check_rate_limiter.py
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter, deque
+
+from rate_limiter import AdaptiveRateLimiter, TransientError, retry_delay
+
+MINUTE = 1.2
+JOBS = 120
+WORKERS = 8
+CONFIGURED_RPM = 120   # what we told the limiter
+REAL_RPM = 40          # what the fake provider actually allows
+INJECTED_429_RATE = 0.03
+MAX_ATTEMPTS = 6
+
+
+class FakeModel:
+    """Sliding-window quota plus random throttling; tokens are ~len(prompt) / 4"""
+
+    def __init__(self):
+        self.window: deque[float] = deque()
+        self.calls = 0
+        self.throttled: list[float] = []
+
+    async def run(self, prompt: str) -> tuple[str, int]:
+        self.calls += 1
+        now = time.monotonic()
+        while self.window and now - self.window[0] > MINUTE:
+            self.window.popleft()
+        if len(self.window) >= REAL_RPM or random.random() < INJECTED_429_RATE:
+            self.throttled.append(now)
+            await asyncio.sleep(0.005)
+            raise TransientError("HTTP 429 from fake model", retry_after=0.05, throttled=True)
+        self.window.append(now)
+        await asyncio.sleep(random.uniform(0.01, 0.03))
+        return f"classified {prompt}", len(prompt) // 4 + 50
+
+
+async def call(model: FakeModel, limiter: AdaptiveRateLimiter, prompt: str) -> str:
+    """Same bookkeeping as classify_jobs.run_model"""
+    estimate = len(prompt) // 4 + 100
+    await limiter.acquire(estimate)
+    started = time.monotonic()
+    try:
+        output, used = await model.run(prompt)
+    except TransientError as e:
+        limiter.record_throttle(e.retry_after, time.monotonic() - started)
+        raise
+    limiter.record_success(estimate, used, time.monotonic() - started)
+    return output
+
+
+def check(condition: bool, message: str, failures: list[str]):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+async def main() -> int:
+    random.seed(7)
+    model = FakeModel()
+    limiter = AdaptiveRateLimiter(CONFIGURED_RPM, 10_000_000, backoff_base=0.05, backoff_cap=0.5,
+                                  burst_seconds=MINUTE / 12, window_seconds=MINUTE)
+
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue()
+    attempts = Counter()
+    requeued = 0
+    for i in range(JOBS):
+        pending.put_nowait(f"posting {i} " + "x" * random.randint(200, 2000))
+
+    async def worker():
+        nonlocal requeued
+        while True:
+            job = await pending.get()
+            try:
+                results.put_nowait((job, await call(model, limiter, job), None))
+            except TransientError as e:
+                attempts[job] += 1
+                if attempts[job] < MAX_ATTEMPTS:
+                    requeued += 1
+                    loop.call_later(retry_delay(attempts[job], 0.05, 1.0, e.retry_after), pending.put_nowait, job)
+                else:
+                    results.put_nowait((job, None, str(e)))
+
+    started = time.monotonic()
+    workers = [asyncio.create_task(worker()) for _ in range(WORKERS)]
+    outcomes = [await results.get() for _ in range(JOBS)]
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    elapsed = time.monotonic() - started
+
+    failures: list[str] = []
+    stats = limiter.stats()
+    ok = sum(1 for _, output, error in outcomes if error is None and output)
+    settled = [t for t in model.throttled if t - started > elapsed / 2]
+    late_rate = len(settled) / max(1, model.calls / 2)
+
+    check(ok == JOBS, f"{ok}/{JOBS} jobs classified, {JOBS - ok} failed", failures)
+    check(requeued > 0 and stats['throttle_events'] > 0,
+          f"{stats['throttle_events']} 429s seen, {requeued} jobs requeued with backoff", failures)
+    rpm_now = stats['rpm']
+    check(rpm_now < CONFIGURED_RPM, f"limiter settled at {rpm_now:.0f} of {CONFIGURED_RPM} configured RPM "
+          f"(provider allows {REAL_RPM})", failures)
+    check(late_rate < 0.25, f"429s in the second half of the run: {late_rate:.0%} of calls", failures)
+    achieved = ok / (elapsed / MINUTE)
+    check(achieved > REAL_RPM / 3, f"throughput {achieved:.0f} jobs per minute against a {REAL_RPM} RPM quota",
+          failures)
+    check(stats['throttled_seconds'] > 0 and stats['working_seconds'] > 0,
+          f"{stats['working_seconds']:.1f}s working vs {stats['throttled_seconds']:.1f}s throttled "
+          f"({stats['throttled_share']:.0%}) across {WORKERS} workers in {elapsed:.1f}s", failures)
+
+    print(f"\n{'FAILED' if failures else 'OK'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
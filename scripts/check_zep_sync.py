@@ -0,0 +1,122 @@
+"""
+Exercise ZepSyncClient against a local stub of /api/graph/jobs
+
+The stub speaks HTTP/1.1 keep-alive, records every request and the client
+port it came from, and throttles or fails the first requests on demand. The
+check fails unless:
+  - batches are posted as "sync-many" and every ID is synced exactly once
+  - every request carries the bearer token
+  - 429 (with Retry-After) and 503 responses are retried, then succeed
+  - jobs the server failed or could not find come back by ID, not as success
+  - the whole run reuses pooled connections instead of one per request
+
+Usage:
+    python check_zep_sync.py
+"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from zep_sync import SYNC_MANY_MAX_IDS, ZepSyncClient
+
+
+class StubGraph:
+    def __init__(self, failures: list[int], failed_ids: set[str], missing_ids: set[str]):
+        self.failures = failures  # statuses returned before answering normally
+        self.failed_ids = failed_ids    # reported in failedIds of a 200 response
+        self.missing_ids = missing_ids  # reported in missingIds
+        self.batches: list[list[str]] = []
+        self.statuses: list[int] = []
+        self.client_ports: set[int] = set()
+        self.authorized = True
+        self.lock = threading.Lock()
+
+
+def make_handler(stub: StubGraph):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with stub.lock:
+                stub.client_ports.add(self.client_address[1])
+                if self.headers.get('Authorization') != 'Bearer stub-secret':
+                    stub.authorized = False
+                status = stub.failures.pop(0) if stub.failures else 200
+                stub.statuses.append(status)
+                if status == 200:
+                    stub.batches.append(body['jobIds'])
+
+            if status == 429:
+                return self.reply(429, {'error': 'Too Many Requests'}, {'Retry-After': '0.05'})
+            if status != 200:
+                return self.reply(status, {'error': 'unavailable'})
+            assert body['action'] == 'sync-many'
+            failed = [job_id for job_id in body['jobIds'] if job_id in stub.failed_ids]
+            missing = [job_id for job_id in body['jobIds'] if job_id in stub.missing_ids]
+            self.reply(200, {'success': not failed, 'requested': len(body['jobIds']),
+                             'missing': len(missing), 'missingIds': missing,
+                             'synced': len(body['jobIds']) - len(failed) - len(missing),
+                             'failed': len(failed), 'failedIds': failed})
+
+    return Handler
+
+
+def check(condition: bool, message: str, failures: list[str]):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+async def main() -> int:
+    stub = StubGraph(failures=[429, 503], failed_ids={'job-7', 'job-101'}, missing_ids={'job-42'})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failures: list[str] = []
+
+    job_ids = [f"job-{i}" for i in range(230)]
+    zep = ZepSyncClient(f"http://127.0.0.1:{server.server_address[1]}", 'stub-secret', backoff_base=0.05)
+    try:
+        # Outbox-sized batches, as the drainer claims them
+        results = [await zep.post_batch(job_ids[start:start + SYNC_MANY_MAX_IDS])
+                  for start in range(0, len(job_ids), SYNC_MANY_MAX_IDS)]
+    finally:
+        await zep.close()
+        server.shutdown()
+
+    synced = [job_id for batch in stub.batches for job_id in batch]
+    stats = zep.stats()
+    check(all(len(batch) <= SYNC_MANY_MAX_IDS for batch in stub.batches),
+          f"{len(stub.batches)} batches, none above {SYNC_MANY_MAX_IDS} IDs", failures)
+    check(sorted(synced) == sorted(job_ids), f"{len(synced)} IDs synced, each exactly once", failures)
+    check(stub.authorized, "every request carried the bearer token", failures)
+    check(stub.statuses[:2] == [429, 503] and stats['retries'] == 2, "429 and 503 were retried", failures)
+    check(all(result.error is None for result in results), "no batch was given up on", failures)
+    failed = sorted(job_id for result in results for job_id in result.failed_ids)
+    missing = sorted(job_id for result in results for job_id in result.missing_ids)
+    check(failed == ['job-101', 'job-7'] and missing == ['job-42'] and stats['synced'] == len(job_ids) - 3,
+          f"per-job outcomes: failed {failed}, missing {missing}, {stats['synced']} synced", failures)
+    check(len(stub.client_ports) < stats['requests'],
+          f"{stats['requests']} requests over {len(stub.client_ports)} connection(s)", failures)
+
+    print(f"\n{'FAILED' if failures else 'OK'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -14,17 +14,94 @@ Every job gets the full Condé Nast editorial treatment.
 import os
 import json
 import asyncio
-import httpx
+import hashlib
+import signal
+import socket
+import time
+from collections import Counter
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Callable, NamedTuple, Optional
 
+import httpx
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from pydantic import BaseModel, Field
+from psycopg2.extras import RealDictCursor, execute_values
+from pydantic import BaseModel, Field, ValidationError, create_model
 from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError, UnexpectedModelBehavior
+
+from context_cache import GEMINI_API_BASE_URL, CacheUnavailable, GeminiContextCache
+from fast_extract import RULE_FIELDS, RULES_VERSION, extract, field_values, low_confidence
+from link_injector import inject_links
+from llm_cache import CONNECTION_ERRORS, ClassificationCache
+from model_cascade import CascadeStats, ModelTier, escalation_reason, parse_tiers
+from near_duplicates import NearDuplicateIndex, minhash
+from raw_posting import RAW_POSTING_PROJECTION, RawPosting, posting_from_row
+from rate_limiter import TRANSIENT_STATUSES, AdaptiveRateLimiter, TransientError, retry_after_seconds, retry_delay
+from zep_outbox import OutboxDrainer, enqueue_zep_sync, print_metrics
+from zep_sync import ZepSyncClient
+
+# Number of agent.run calls in flight at once; DB writes stay serialized
+CLASSIFY_CONCURRENCY = int(os.environ.get('CLASSIFY_CONCURRENCY', '10'))
+
+# Classified jobs are written in batches: one UPDATE per table and one commit
+# per flush, triggered by batch size or by the flush interval, whichever first
+CLASSIFY_BATCH_SIZE = int(os.environ.get('CLASSIFY_BATCH_SIZE', '25'))
+CLASSIFY_FLUSH_SECONDS = float(os.environ.get('CLASSIFY_FLUSH_SECONDS', '5'))
+
+# Claimed raw_jobs are leased to this worker; expired leases go back to pending
+CLASSIFY_LEASE_SECONDS = int(os.environ.get('CLASSIFY_LEASE_SECONDS', '1800'))
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+# Daemon mode: micro-batch size, and the fallback poll interval when no NOTIFY
+# arrives (doubles from MIN to MAX while the queue stays empty)
+RAW_JOBS_CHANNEL = 'raw_jobs_pending'
+CLASSIFY_DAEMON_BATCH_SIZE = int(os.environ.get('CLASSIFY_DAEMON_BATCH_SIZE', '50'))
+CLASSIFY_DAEMON_MIN_IDLE = float(os.environ.get('CLASSIFY_DAEMON_MIN_IDLE', '5'))
+CLASSIFY_DAEMON_MAX_IDLE = float(os.environ.get('CLASSIFY_DAEMON_MAX_IDLE', '300'))
+# Backoff between attempts to reopen dropped database connections in daemon mode
+CLASSIFY_DAEMON_RECONNECT_CAP = float(os.environ.get('CLASSIFY_DAEMON_RECONNECT_CAP', '60'))
+
+# Persistent cache of classification results keyed on prompt, model and prompt version
+CLASSIFY_CACHE_ENABLED = os.environ.get('CLASSIFY_CACHE_ENABLED', 'true').lower() == 'true'
+CLASSIFY_CACHE_MAX_ENTRIES = int(os.environ.get('CLASSIFY_CACHE_MAX_ENTRIES', '50000'))
+
+# Near-duplicate postings (MinHash LSH) share one classification
+CLASSIFY_DEDUPE_ENABLED = os.environ.get('CLASSIFY_DEDUPE_ENABLED', 'true').lower() == 'true'
+CLASSIFY_DEDUPE_THRESHOLD = float(os.environ.get('CLASSIFY_DEDUPE_THRESHOLD', '0.85'))
+
+# Rule-extracted fields at or above this confidence skip the model; it then
+# only writes the editorial prose
+CLASSIFY_RULES_ENABLED = os.environ.get('CLASSIFY_RULES_ENABLED', 'true').lower() == 'true'
+CLASSIFY_RULES_MIN_CONFIDENCE = float(os.environ.get('CLASSIFY_RULES_MIN_CONFIDENCE', '0.8'))
+
+# Model cascade, cheapest first: an answer moves up a tier when it fails schema
+# validation, its self-reported confidence is below the threshold, or an enum
+# field is outside its allowed values. The last tier's answer is kept.
+CLASSIFY_MODEL_TIERS = os.environ.get('CLASSIFY_MODEL_TIERS', 'gemini-2.0-flash-lite,gemini-2.0-flash')
+CLASSIFY_MIN_CONFIDENCE = float(os.environ.get('CLASSIFY_MIN_CONFIDENCE', '0.7'))
+
+# Register the static system prompt + schema as Gemini cached content and
+# reference it by handle (per tier, for models in the cascade catalogue)
+CLASSIFY_CONTEXT_CACHE_ENABLED = os.environ.get('CLASSIFY_CONTEXT_CACHE_ENABLED', 'true').lower() == 'true'
+CLASSIFY_CONTEXT_CACHE_TTL = int(os.environ.get('CLASSIFY_CONTEXT_CACHE_TTL', '3600'))
+
+# Provider quota shared by all classifier tasks (0 disables the limiter); the
+# limiter backs off on 429s and creeps back up to these
+CLASSIFY_RPM = float(os.environ.get('CLASSIFY_RPM', '1000'))
+CLASSIFY_TPM = float(os.environ.get('CLASSIFY_TPM', '1000000'))
+# Expected reply size, reserved up front and corrected with the real usage
+CLASSIFY_OUTPUT_TOKEN_ESTIMATE = int(os.environ.get('CLASSIFY_OUTPUT_TOKEN_ESTIMATE', '1500'))
+
+# Throttled or transient model failures are requeued with exponential backoff;
+# a job is marked error only after this many attempts
+CLASSIFY_MAX_ATTEMPTS = int(os.environ.get('CLASSIFY_MAX_ATTEMPTS', '6'))
+CLASSIFY_RETRY_BASE_SECONDS = float(os.environ.get('CLASSIFY_RETRY_BASE_SECONDS', '5'))
+CLASSIFY_RETRY_CAP_SECONDS = float(os.environ.get('CLASSIFY_RETRY_CAP_SECONDS', '300'))
 
 # ZEP sync configuration
 ZEP_SYNC_ENABLED = os.environ.get('ZEP_SYNC_ENABLED', 'true').lower() == 'true'
+# Longest a finished run waits for the outbox drainer; the rest is left for the next run
+ZEP_DRAIN_GRACE_SECONDS = float(os.environ.get('ZEP_DRAIN_GRACE_SECONDS', '30'))
 API_BASE_URL = os.environ.get('API_BASE_URL', 'https://fractional.quest')
 REVALIDATE_SECRET = os.environ.get('REVALIDATE_SECRET', '')
 
@@ -78,45 +155,7 @@ class StructuredJob(BaseModel):
         Highlight what makes this role special.
         For fractional roles, emphasize flexibility and strategic impact.
 
-        IMPORTANT - Internal Linking for SEO:
-        Naturally weave 2-4 internal links into the prose using markdown format.
-
-        KEYWORD CLUSTERS (each links to a DIFFERENT dedicated page):
-        - CFO cluster → /fractional-cfo-jobs-uk
-          Link text variations: "fractional CFO", "fractional CFO jobs", "CFO roles",
-          "part-time CFO", "fractional finance director", "CFO opportunities"
-
-        - CMO cluster → /fractional-cmo-jobs-uk
-          Link text variations: "fractional CMO", "fractional CMO jobs", "CMO roles",
-          "part-time CMO", "fractional marketing director", "CMO opportunities"
-
-        - CTO cluster → /fractional-cto-jobs-uk
-          Link text variations: "fractional CTO", "fractional CTO jobs", "CTO roles",
-          "part-time CTO", "fractional tech director", "CTO opportunities"
-
-        - COO cluster → /fractional-coo-jobs-uk
-          Link text variations: "fractional COO", "fractional COO jobs", "COO roles",
-          "part-time COO", "fractional operations director", "COO opportunities"
-
-        - General fractional → /fractional-jobs
-          Link text variations: "fractional jobs", "fractional roles", "fractional executive",
-          "part-time executive", "portfolio career", "fractional opportunities"
-
-        RULES:
-        1. ONE link per keyword cluster maximum (no repeats of same cluster)
-        2. CRITICAL: Each URL must be UNIQUE - never link to the same URL twice!
-           - If you use /fractional-jobs once, you CANNOT use it again
-           - If you use /fractional-jobs?role=CFO once, you CANNOT use it again
-        3. Use the most natural phrase that fits the sentence
-        4. Prioritize the cluster that matches the job's role_category
-        5. Add 1-2 DIFFERENT role clusters (CFO, CMO, CTO, COO) if they fit naturally
-        6. Links must read smoothly - don't force them
-
-        Example: "This [fractional CFO](/fractional-jobs?role=CFO) opportunity is ideal for
-        executives exploring [portfolio careers](/fractional-jobs)."
-
-        BAD (duplicate URL): "[fractional opportunities](/fractional-jobs)...[portfolio career](/fractional-jobs)"
-        GOOD (unique URLs): "[fractional CFO](/fractional-jobs?role=CFO)...[portfolio career](/fractional-jobs)"
+        Plain prose only - no links or markdown; internal links are added afterwards.
     """)
 
     responsibilities: list[str] = Field(description="""
@@ -150,13 +189,26 @@ class StructuredJob(BaseModel):
         Include industry, stage, and any notable facts.
     """)
 
+    confidence: float = Field(ge=0, le=1, description="How sure you are of the classification fields, 0-1. Lower it when the posting is vague, very short, or ambiguous about the role, level or employment type.")
+
+
+# Values the constrained string fields must take; anything else is escalated
+ALLOWED_VALUES = {
+    'employment_type': {'full-time', 'part-time', 'fractional', 'contract', 'interim'},
+    'seniority_level': {'Executive', 'Director', 'Manager', 'Senior', 'Mid', 'Junior', 'Intern'},
+    'role_category': {'Engineering', 'Marketing', 'Finance', 'Operations', 'Sales', 'HR', 'Product', 'Design',
+                      'Data', 'Legal', 'Customer Success', 'Other'},
+    'salary_type': {'daily', 'annual', 'hourly'},
+}
 
-# Create the Pydantic AI agent using Google Gemini
+
+# Create the Pydantic AI agents using Google Gemini
 # Set GEMINI_API_KEY or GOOGLE_API_KEY in environment
-agent = Agent(
-    'google-gla:gemini-2.0-flash',
-    output_type=StructuredJob,
-    system_prompt="""You are the senior content editor for Fractional.Quest, the UK's premier platform for fractional executive opportunities.
+MODEL_TIERS = parse_tiers(CLASSIFY_MODEL_TIERS)
+# Identifies the cascade in cached results
+MODEL_NAME = ','.join(tier.model for tier in MODEL_TIERS)
+
+SYSTEM_PROMPT = """You are the senior content editor for Fractional.Quest, the UK's premier platform for fractional executive opportunities.
 
 Your role is to transform raw job postings into beautifully crafted, editorially polished listings that attract top-tier fractional talent.
 
@@ -213,28 +265,46 @@ seniority_level MUST be exactly one of: Executive, Director, Manager, Senior, Mi
 - The opportunity_description should paint a compelling picture
 - Responsibilities and requirements should be crisp and scannable
 
-**Internal Linking Strategy (SEO Critical):**
-The opportunity_description MUST include 2-4 internal links for SEO strength.
-Use markdown: [link text](url)
-
-Available DEDICATED PAGES (each is a truly different page - use each ONLY ONCE):
-- /fractional-cfo-jobs-uk (fractional CFO, CFO jobs, part-time CFO, finance director)
-- /fractional-cmo-jobs-uk (fractional CMO, CMO jobs, marketing director)
-- /fractional-cto-jobs-uk (fractional CTO, CTO jobs, tech director)
-- /fractional-coo-jobs-uk (fractional COO, COO jobs, operations director)
-- /fractional-jobs (fractional jobs, fractional roles, portfolio career, part-time executive)
-
-CRITICAL RULES:
-1. NEVER link to the same URL twice - Google penalizes duplicate internal links
-2. Use 2-4 DIFFERENT dedicated pages per description
-3. Prioritize the role-specific page matching the job category
-4. Vary anchor text naturally
-
 Remember: You're not just extracting data - you're crafting content that represents our brand.
 """
+
+
+# StructuredJob without the rule-extracted fields, for postings the rules fully cover
+EditorialJob = create_model(
+    'EditorialJob',
+    __doc__="Editorial content and the fields rules cannot derive",
+    **{name: (field.annotation, field) for name, field in StructuredJob.model_fields.items() if name not in RULE_FIELDS},
 )
 
 
+def prompt_fingerprint() -> str:
+    """Short hash of the system prompt, output schema and rules; changes whenever any is edited"""
+    schema = json.dumps(StructuredJob.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(f"{SYSTEM_PROMPT}\n{schema}\n{RULES_VERSION}".encode('utf-8')).hexdigest()[:16]
+
+
+PROMPT_VERSION = prompt_fingerprint()
+
+# One agent per tier and output type. Lower tiers don't re-ask on invalid
+# output; the next tier is the retry.
+agents = {
+    (tier.model, output_type): Agent(
+        tier.model,
+        output_type=output_type,
+        system_prompt=SYSTEM_PROMPT,
+        retries=1 if tier is MODEL_TIERS[-1] else 0,
+    )
+    for tier in MODEL_TIERS
+    for output_type in (StructuredJob, EditorialJob)
+}
+
+# How each job was classified this run: 'rules' (editorial-only call) or 'full'
+classification_routes: Counter = Counter()
+cascade_stats = CascadeStats(MODEL_TIERS)
+# Transient model failures this run: 'requeued', 'gave_up', 'backoff_seconds'
+retry_stats: Counter = Counter()
+
+
 def get_db_connection():
     """Get database connection"""
     database_url = os.environ.get('DATABASE_URL')
@@ -243,244 +313,1149 @@ def get_db_connection():
     return psycopg2.connect(database_url)
 
 
-def fetch_pending_raw_jobs(conn, limit: int = 10, source: str = None) -> list[dict]:
-    """Fetch raw jobs pending classification"""
+def reclaim_stale_leases(conn) -> int:
+    """Return jobs whose worker died mid-run (lease expired) to pending"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE raw_jobs SET
+                processing_status = 'pending',
+                claimed_by = NULL,
+                lease_expires_at = NULL
+            WHERE processing_status = 'processing'
+            AND lease_expires_at < NOW()
+        """)
+        reclaimed = cur.rowcount
+    conn.commit()
+    return reclaimed
+
+
+def claimed_job(row: dict) -> dict:
+    """Claimed row with its raw_data projection folded into a RawPosting under 'posting'"""
+    row['posting'] = posting_from_row(row)
+    return row
+
+
+def claim_raw_jobs(conn, candidates: str, params: dict, order_by: str, worker_id: str = WORKER_ID,
+                   lease_seconds: int = CLASSIFY_LEASE_SECONDS) -> list[dict]:
+    """
+    Lease the raw_jobs picked by `candidates` and return them joined to jobs
+
+    Rows are locked with FOR UPDATE SKIP LOCKED and flipped to 'processing'
+    under a lease in one committed statement, so concurrent workers on any
+    host each get a disjoint set of jobs.
+
+    Args:
+        candidates: SELECT id ... FOR UPDATE SKIP LOCKED over raw_jobs
+        order_by: Order of the returned rows, over the claimed columns (c.*)
+    """
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        if source:
-            cur.execute("""
-                SELECT r.id as raw_id, r.source, r.source_id, r.raw_data, r.job_id,
-                       j.title, j.company_name, j.location, j.full_description,
-                       j.employment_type, j.seniority_level, j.compensation
-                FROM raw_jobs r
-                LEFT JOIN jobs j ON r.job_id = j.id
-                WHERE r.processing_status = 'pending'
-                AND r.source = %s
-                ORDER BY r.received_at DESC
-                LIMIT %s
-            """, (source, limit))
-        else:
+        cur.execute(f"""
+            WITH claimed AS (
+                UPDATE raw_jobs SET
+                    processing_status = 'processing',
+                    claimed_by = %(worker_id)s,
+                    lease_expires_at = NOW() + %(lease_seconds)s * INTERVAL '1 second'
+                WHERE id IN ({candidates})
+                RETURNING id, source, source_id, job_id, received_at, {RAW_POSTING_PROJECTION}
+            )
+            SELECT c.id as raw_id, c.source, c.source_id, c.job_id,
+                   {', '.join(f'c.raw_{key}' for key in RawPosting._fields)},
+                   j.title, j.company_name, j.location, j.full_description,
+                   j.employment_type, j.seniority_level, j.compensation
+            FROM claimed c
+            LEFT JOIN jobs j ON c.job_id = j.id
+            ORDER BY {order_by}
+        """, {**params, 'worker_id': worker_id, 'lease_seconds': lease_seconds})
+        rows = [claimed_job(dict(row)) for row in cur.fetchall()]
+    conn.commit()
+    return rows
+
+
+def fetch_pending_raw_jobs(conn, limit: int = 10, source: str = None, worker_id: str = WORKER_ID,
+                           lease_seconds: int = CLASSIFY_LEASE_SECONDS) -> list[dict]:
+    """Claim raw jobs pending classification, newest first"""
+    return claim_raw_jobs(conn, """
+        SELECT id FROM raw_jobs
+        WHERE processing_status = 'pending'
+        AND (%(source)s::text IS NULL OR source = %(source)s)
+        ORDER BY received_at DESC
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    """, {'source': source, 'limit': limit}, 'c.received_at DESC', worker_id, lease_seconds)
+
+
+# Processed rows classified under another prompt fingerprint, or whose source
+# posting changed since (migrations/018)
+STALE_CONDITION = """
+    processing_status = 'processed'
+    AND (classified_prompt_version IS DISTINCT FROM %(version)s
+         OR classified_source_hash IS DISTINCT FROM raw_job_source_hash(raw_data))
+"""
+
+
+def fetch_stale_raw_jobs(conn, limit: int, source: str = None, after_id: Optional[str] = None) -> list[dict]:
+    """Claim the next stale processed jobs in id order, strictly after `after_id`"""
+    id_type = column_types(conn, 'raw_jobs', ('id',))['id']
+    return claim_raw_jobs(conn, f"""
+        SELECT id FROM raw_jobs
+        WHERE {STALE_CONDITION}
+        AND (%(source)s::text IS NULL OR source = %(source)s)
+        AND (%(after)s::text IS NULL OR id > %(after)s::{id_type})
+        ORDER BY id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    """, {'version': PROMPT_VERSION, 'source': source, 'after': after_id, 'limit': limit}, 'c.id')
+
+
+def count_stale_raw_jobs(conn, source: str = None, after_id: Optional[str] = None) -> int:
+    id_type = column_types(conn, 'raw_jobs', ('id',))['id']
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COUNT(*) FROM raw_jobs
+            WHERE {STALE_CONDITION}
+            AND (%(source)s::text IS NULL OR source = %(source)s)
+            AND (%(after)s::text IS NULL OR id > %(after)s::{id_type})
+        """, {'version': PROMPT_VERSION, 'source': source, 'after': after_id})
+        count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+
+def load_cursor(conn, name: str, restart: bool = False) -> tuple[Optional[str], int]:
+    """
+    Resume point of a re-classification pass: (last flushed raw id, jobs done so far)
+
+    A finished pass, one started under another prompt fingerprint, or
+    `restart` begins again from the first id.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT last_raw_id, processed FROM classification_cursors
+            WHERE name = %s AND prompt_version = %s AND completed_at IS NULL
+        """, (name, PROMPT_VERSION))
+        row = None if restart else cur.fetchone()
+        if row is None:
             cur.execute("""
-                SELECT r.id as raw_id, r.source, r.source_id, r.raw_data, r.job_id,
-                       j.title, j.company_name, j.location, j.full_description,
-                       j.employment_type, j.seniority_level, j.compensation
-                FROM raw_jobs r
-                LEFT JOIN jobs j ON r.job_id = j.id
-                WHERE r.processing_status = 'pending'
-                ORDER BY r.received_at DESC
-                LIMIT %s
-            """, (limit,))
-        return [dict(row) for row in cur.fetchall()]
+                INSERT INTO classification_cursors (name, prompt_version) VALUES (%s, %s)
+                ON CONFLICT (name) DO UPDATE SET
+                    prompt_version = EXCLUDED.prompt_version,
+                    last_raw_id = NULL,
+                    processed = 0,
+                    started_at = NOW(),
+                    updated_at = NOW(),
+                    completed_at = NULL
+            """, (name, PROMPT_VERSION))
+            row = (None, 0)
+    conn.commit()
+    return row[0], row[1]
+
+
+def save_cursor(conn, name: str, last_raw_id: Optional[str], processed: int, completed: bool = False):
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE classification_cursors SET
+                last_raw_id = %s,
+                processed = %s,
+                updated_at = NOW(),
+                completed_at = CASE WHEN %s THEN NOW() END
+            WHERE name = %s
+        """, (last_raw_id, processed, completed, name))
+    conn.commit()
+
+
+def release_claims(conn, worker_id: str = WORKER_ID):
+    """Hand back jobs this worker claimed but never finished"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE raw_jobs SET
+                processing_status = 'pending',
+                claimed_by = NULL,
+                lease_expires_at = NULL
+            WHERE claimed_by = %s AND processing_status = 'processing'
+        """, (worker_id,))
+    conn.commit()
+
+
+def extend_leases(conn, worker_id: str = WORKER_ID, lease_seconds: int = CLASSIFY_LEASE_SECONDS):
+    """Push out the lease on every job this worker still holds"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE raw_jobs SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+            WHERE claimed_by = %s AND processing_status = 'processing'
+        """, (lease_seconds, worker_id))
+
 
+def build_job_prompt(raw_job: dict, extracted: Optional[dict] = None) -> str:
+    """
+    User prompt for one posting
 
-async def classify_job(raw_job: dict) -> StructuredJob:
-    """Classify a single job using Pydantic AI"""
+    Args:
+        raw_job: Claimed raw_jobs row joined to jobs
+        extracted: Rule-extracted field values the model should take as given
+    """
 
-    raw_data = raw_job.get('raw_data', {})
-    if isinstance(raw_data, str):
-        raw_data = json.loads(raw_data)
+    posting: RawPosting = raw_job['posting']
 
     # Build comprehensive context
     context = f"""
 ## Job Details
 
-**Title:** {raw_job.get('title') or raw_data.get('job_title', 'Unknown')}
-**Company:** {raw_job.get('company_name') or raw_data.get('company_name', 'Unknown')}
-**Location:** {raw_job.get('location') or raw_data.get('location', 'Unknown')}
-**Employment Type:** {raw_job.get('employment_type') or raw_data.get('employment_type', 'Unknown')}
-**Seniority:** {raw_job.get('seniority_level') or raw_data.get('seniority_level', 'Unknown')}
-**Compensation:** {raw_job.get('compensation') or raw_data.get('salary_range', 'Not specified')}
-**Industry/Function:** {raw_data.get('job_function', 'Unknown')} / {raw_data.get('industries', 'Unknown')}
+**Title:** {raw_job.get('title') or posting.job_title or 'Unknown'}
+**Company:** {raw_job.get('company_name') or posting.company_name or 'Unknown'}
+**Location:** {raw_job.get('location') or posting.location or 'Unknown'}
+**Employment Type:** {raw_job.get('employment_type') or posting.employment_type or 'Unknown'}
+**Seniority:** {raw_job.get('seniority_level') or posting.seniority_level or 'Unknown'}
+**Compensation:** {raw_job.get('compensation') or posting.salary_range or 'Not specified'}
+**Industry/Function:** {posting.job_function or 'Unknown'} / {posting.industries or 'Unknown'}
 
 ## Full Job Description
 
-{raw_job.get('full_description') or raw_data.get('job_description', 'No description available')}
+{raw_job.get('full_description') or posting.job_description or 'No description available'}
 
 ## Additional Context
 
-- Posted: {raw_data.get('time_posted', 'Unknown')}
-- Applicants: {raw_data.get('num_applicants', 'Unknown')}
-- Easy Apply: {raw_data.get('easy_apply', 'Unknown')}
+- Posted: {posting.time_posted or 'Unknown'}
+- Applicants: {posting.num_applicants or 'Unknown'}
+- Easy Apply: {posting.easy_apply or 'Unknown'}
 - Source: {raw_job.get('source', 'Unknown')}
 """
 
-    result = await agent.run(f"Please analyze and structure this job posting into our editorial format:\n\n{context}")
-    return result.output
+    if extracted:
+        facts = "\n".join(f"- {name}: {value}" for name, value in extracted.items())
+        context += f"""
+## Already Extracted (consistent with these; do not contradict them)
+
+{facts}
+"""
+
+    return f"Please analyze and structure this job posting into our editorial format:\n\n{context}"
+
+
+def rule_fields(raw_job: dict) -> tuple[dict, list[str]]:
+    """Rule-extracted values confident enough to keep, and the fields left to the model"""
+    posting: RawPosting = raw_job['posting']
+    fields = extract(
+        raw_job.get('title') or posting.job_title or '',
+        raw_job.get('full_description') or posting.job_description or '',
+        raw_job.get('location') or posting.location or '',
+        raw_job.get('employment_type') or posting.employment_type or '',
+        raw_job.get('compensation') or posting.salary_range or '',
+    )
+    unsure = low_confidence(fields, CLASSIFY_RULES_MIN_CONFIDENCE)
+    confident = {name: value for name, value in field_values(fields).items() if name not in unsure}
+    return confident, unsure
+
+
+def transient_error(error: Exception) -> Optional[TransientError]:
+    """Classify a failed model call: a TransientError to retry later, or None if it is final"""
+    if isinstance(error, ModelHTTPError) and error.status_code in TRANSIENT_STATUSES:
+        return TransientError(f"HTTP {error.status_code} from {error.model_name}",
+                              retry_after_seconds(body=error.body), throttled=error.status_code == 429)
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in TRANSIENT_STATUSES:
+        response = error.response
+        return TransientError(f"HTTP {response.status_code} from the context-cached model",
+                              retry_after_seconds(response.headers.get('Retry-After'), response.text),
+                              throttled=response.status_code == 429)
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return TransientError(f"{type(error).__name__}: {error}")
+    return None
+
+
+class ModelReply(NamedTuple):
+    output: BaseModel
+    usage: dict      # input_tokens, cached_tokens, output_tokens
+    seconds: float   # Model latency, excluding time spent waiting on the limiter
+
+
+async def run_model(prompt: str, output_type, tier: ModelTier, context_cache: Optional[GeminiContextCache] = None,
+                    limiter: Optional[AdaptiveRateLimiter] = None) -> ModelReply:
+    """
+    One call to one tier's model, against the cached prefix when the provider accepted it
+
+    The call waits for RPM/TPM budget first and reports its outcome back to
+    the limiter. Throttling and other retryable failures surface as
+    TransientError.
+    """
+    estimate = (len(SYSTEM_PROMPT) + len(prompt)) // 4 + CLASSIFY_OUTPUT_TOKEN_ESTIMATE
+    if limiter:
+        await limiter.acquire(estimate)
+
+    started = time.monotonic()
+    try:
+        output = None
+        if context_cache:
+            try:
+                output, usage = await context_cache.generate(prompt, output_type)
+            except CacheUnavailable:
+                pass
+        if output is None:
+            result = await agents[tier.model, output_type].run(prompt)
+            run_usage = result.usage()
+            output = result.output
+            usage = {'input_tokens': run_usage.request_tokens or 0, 'cached_tokens': 0,
+                     'output_tokens': run_usage.response_tokens or 0}
+    except Exception as e:
+        transient = transient_error(e)
+        if limiter:
+            if transient and transient.throttled:
+                limiter.record_throttle(transient.retry_after, time.monotonic() - started)
+            else:
+                limiter.record_failure(time.monotonic() - started)
+        if transient:
+            raise transient from e
+        raise
+
+    elapsed = time.monotonic() - started
+    if limiter:
+        limiter.record_success(estimate, usage['input_tokens'] + usage['output_tokens'], elapsed)
+    return ModelReply(output, usage, elapsed)
+
+
+async def classify_job(raw_job: dict, cache: Optional[ClassificationCache] = None,
+                       use_rules: bool = CLASSIFY_RULES_ENABLED,
+                       context_caches: Optional[dict[str, GeminiContextCache]] = None,
+                       limiter: Optional[AdaptiveRateLimiter] = None) -> StructuredJob:
+    """
+    Classify a single job using Pydantic AI, reusing a cached result when available
+
+    Confident rule-extracted fields are passed to the model as given and win
+    over its output. When the rules cover every structured field the model is
+    only asked for the editorial content. The cheapest model tier answers
+    first; the answer moves up the cascade while it is invalid, unsure or off
+    the allowed values. Internal links are injected into the prose afterwards
+    rather than written by the model.
+    """
+    extracted, unsure = rule_fields(raw_job) if use_rules else ({}, list(RULE_FIELDS))
+    prompt = build_job_prompt(raw_job, extracted)
+
+    key = None
+    if cache:
+        key = cache.key(prompt)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return StructuredJob.model_validate(cached)
+
+    output_type = StructuredJob if unsure else EditorialJob
+    classification_routes['full' if unsure else 'rules'] += 1
+
+    for tier in MODEL_TIERS:
+        final = tier is MODEL_TIERS[-1]
+        started = time.monotonic()
+        try:
+            reply = await run_model(prompt, output_type, tier, (context_caches or {}).get(tier.model), limiter)
+        except (UnexpectedModelBehavior, ValidationError):
+            cascade_stats.record(tier, time.monotonic() - started, None, 'invalid', final=False)
+            if final:
+                raise
+            continue
+
+        if unsure:
+            structured = reply.output.model_copy(update=extracted)
+        else:
+            structured = StructuredJob(**reply.output.model_dump(), **extracted)
+        reason = escalation_reason(structured.model_dump(), ALLOWED_VALUES, CLASSIFY_MIN_CONFIDENCE)
+        cascade_stats.record(tier, reply.seconds, reply.usage, reason, final)
+        if reason is None:
+            break
+
+    structured = structured.model_copy(update={
+        'opportunity_description': inject_links(structured.opportunity_description, structured.role_category),
+    })
+
+    if cache:
+        await asyncio.to_thread(cache.put, key, structured.model_dump())
+
+    return structured
+
+
+# jobs columns written from a StructuredJob, in the order of structured_job_values()
+JOB_UPDATE_COLUMNS = (
+    'employment_type',
+    'is_fractional',
+    'hours_per_week',
+    'is_remote',
+    'seniority_level',
+    'role_category',
+    'salary_min',
+    'salary_max',
+    'salary_currency',
+    'description_snippet',
+    'full_description',
+    'responsibilities',
+    'requirements',
+    'benefits',
+    'skills_required',
+    'about_company',
+    'company_domain',
+    'classification_reasoning',
+    'classification_confidence',
+)
+
+_column_types: dict[tuple[str, str], str] = {}
+
+
+def column_types(conn, table: str, columns: tuple[str, ...]) -> dict[str, str]:
+    """
+    SQL types of table columns, looked up once per run
+
+    Batched UPDATE ... FROM (VALUES ...) needs explicit casts: VALUES rows
+    are typed as text, which does not assign to enum or uuid columns.
+    """
+    missing = [c for c in columns if (table, c) not in _column_types]
+    if missing:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT attname, format_type(atttypid, atttypmod)
+                FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attname = ANY(%s) AND NOT attisdropped
+            """, (table, missing))
+            for name, sql_type in cur.fetchall():
+                _column_types[(table, name)] = sql_type
+    return {c: _column_types[(table, c)] for c in columns}
+
+
+def structured_job_values(structured: StructuredJob) -> tuple:
+    """Column values for JOB_UPDATE_COLUMNS"""
+    return (
+        structured.employment_type,
+        structured.is_fractional,
+        structured.days_per_week,
+        structured.is_remote,
+        structured.seniority_level,
+        structured.role_category,
+        structured.salary_min,
+        structured.salary_max,
+        structured.salary_currency,
+        structured.summary,
+        structured.opportunity_description,
+        structured.responsibilities,
+        structured.requirements,
+        structured.benefits,
+        structured.skills_required,
+        structured.about_company,
+        structured.company_domain,
+        f"Pydantic AI - Vertical: {structured.vertical}, City: {structured.city}, Country: {structured.country}",
+        structured.confidence,
+    )
 
 
 def update_structured_job(conn, job_id: str, structured: StructuredJob):
     """Update the jobs table with AI-structured data"""
+    set_clause = ",\n                ".join(f"{c} = %s" for c in JOB_UPDATE_COLUMNS)
     with conn.cursor() as cur:
-        cur.execute("""
+        cur.execute(f"""
             UPDATE jobs SET
-                employment_type = %s,
-                is_fractional = %s,
-                hours_per_week = %s,
-                is_remote = %s,
-                seniority_level = %s,
-                role_category = %s,
-                salary_min = %s,
-                salary_max = %s,
-                salary_currency = %s,
-                description_snippet = %s,
-                full_description = %s,
-                responsibilities = %s,
-                requirements = %s,
-                benefits = %s,
-                skills_required = %s,
-                about_company = %s,
-                company_domain = %s,
-                classification_confidence = 1.0,
-                classification_reasoning = %s,
+                {set_clause},
                 updated_date = NOW()
             WHERE id = %s
-        """, (
-            structured.employment_type,
-            structured.is_fractional,
-            structured.days_per_week,
-            structured.is_remote,
-            structured.seniority_level,
-            structured.role_category,
-            structured.salary_min,
-            structured.salary_max,
-            structured.salary_currency,
-            structured.summary,
-            structured.opportunity_description,
-            structured.responsibilities,
-            structured.requirements,
-            structured.benefits,
-            structured.skills_required,
-            structured.about_company,
-            structured.company_domain,
-            f"Pydantic AI - Vertical: {structured.vertical}, City: {structured.city}, Country: {structured.country}",
-            job_id
-        ))
+        """, (*structured_job_values(structured), job_id))
+
+
+def update_structured_jobs_batch(conn, rows: list[tuple[str, StructuredJob]]):
+    """Update many jobs with one UPDATE ... FROM (VALUES ...)"""
+    if not rows:
+        return
+
+    columns = ('id',) + JOB_UPDATE_COLUMNS
+    types = column_types(conn, 'jobs', columns)
+    template = "(" + ", ".join(f"%s::{types[c]}" for c in columns) + ")"
+    set_clause = ",\n                ".join(f"{c} = v.{c}" for c in JOB_UPDATE_COLUMNS)
+
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            UPDATE jobs SET
+                {set_clause},
+                updated_date = NOW()
+            FROM (VALUES %s) AS v({', '.join(columns)})
+            WHERE jobs.id = v.id
+        """, [(job_id, *structured_job_values(structured)) for job_id, structured in rows],
+            template=template, page_size=len(rows))
 
 
 def mark_raw_job_processed(conn, raw_id: str, status: str = 'processed', error: str = None):
-    """Update raw_jobs status after processing"""
+    """Update raw_jobs status after processing; a success records the prompt and source fingerprints"""
     with conn.cursor() as cur:
         cur.execute("""
             UPDATE raw_jobs SET
-                processing_status = %s,
+                processing_status = %(status)s,
                 processed_at = NOW(),
-                processing_error = %s
-            WHERE id = %s
-        """, (status, error, raw_id))
-
-
-async def sync_job_to_zep(job_id: str, structured: StructuredJob, title: str, company: str, location: str) -> bool:
-    """Sync a processed job to ZEP knowledge graph via API"""
-    if not ZEP_SYNC_ENABLED:
-        return True  # Skip but don't fail
-
+                processing_error = %(error)s,
+                claimed_by = NULL,
+                lease_expires_at = NULL,
+                classified_prompt_version = COALESCE(%(version)s, classified_prompt_version),
+                classified_source_hash = CASE WHEN %(version)s::text IS NULL THEN classified_source_hash
+                                              ELSE raw_job_source_hash(raw_data) END
+            WHERE id = %(raw_id)s
+        """, {'status': status, 'error': error, 'raw_id': raw_id,
+              'version': PROMPT_VERSION if status == 'processed' else None})
+
+
+def mark_raw_jobs_batch(conn, rows: list[tuple[str, str, Optional[str]]]):
+    """Update raw_jobs status for many (raw_id, status, error) rows at once, like mark_raw_job_processed"""
+    if not rows:
+        return
+
+    types = column_types(conn, 'raw_jobs', ('id', 'processing_status', 'processing_error'))
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            UPDATE raw_jobs SET
+                processing_status = v.status,
+                processed_at = NOW(),
+                processing_error = v.error,
+                claimed_by = NULL,
+                lease_expires_at = NULL,
+                classified_prompt_version = COALESCE(v.version, raw_jobs.classified_prompt_version),
+                classified_source_hash = CASE WHEN v.version IS NULL THEN raw_jobs.classified_source_hash
+                                              ELSE raw_job_source_hash(raw_jobs.raw_data) END
+            FROM (VALUES %s) AS v(id, status, error, version)
+            WHERE raw_jobs.id = v.id
+        """, [(raw_id, status, error, PROMPT_VERSION if status == 'processed' else None)
+              for raw_id, status, error in rows], template=(
+            f"(%s::{types['id']}, %s::{types['processing_status']}, %s::{types['processing_error']}, %s::text)"
+        ), page_size=len(rows))
+
+
+def job_title_company(job: dict) -> tuple[str, str]:
+    posting: RawPosting = job['posting']
+    title = job.get('title') or posting.job_title or 'Unknown'
+    company = job.get('company_name') or posting.company_name or 'Unknown'
+    return title, company
+
+
+def print_job_result(structured: StructuredJob):
+    """Print the classification summary for one job"""
+    print(f"    ✓ Type: {structured.employment_type} {'(Fractional)' if structured.is_fractional else ''}")
+    print(f"    ✓ Location: {structured.city or 'Unknown'}, {structured.country} {'🌐' if structured.is_remote else ''}")
+    print(f"    ✓ Vertical: {structured.vertical}")
+    print(f"    ✓ Level: {structured.seniority_level}")
+    if structured.salary_min or structured.salary_max:
+        print(f"    ✓ Comp: {structured.salary_currency}{structured.salary_min or '?'}-{structured.salary_max or '?'} ({structured.salary_type})")
+    print(f"    ✓ Skills: {len(structured.skills_required)} extracted")
+    print(f"    ✓ Summary: {structured.summary[:80]}...")
+
+
+def posting_text(job: dict) -> str:
+    """Title plus description, the text compared for near-duplicates"""
+    title, _ = job_title_company(job)
+    return f"{title}\n{job.get('full_description') or job['posting'].job_description or ''}"
+
+
+def plan_near_duplicates(index: NearDuplicateIndex, jobs: list[dict]):
+    """
+    Decide which claimed jobs actually need the LLM
+
+    Returns:
+        resolved: (job, StructuredJob) copied from an indexed near-duplicate
+        to_classify: one representative per in-batch cluster, plus unsketchable jobs
+        siblings: representative raw_id -> jobs that will copy its result
+        signatures: raw_id -> MinHash signature, for indexing representatives later
+    """
+    by_id = {str(job['raw_id']): job for job in jobs}
+    signatures = {}
+    for key, job in by_id.items():
+        signature = minhash(posting_text(job))
+        if signature is not None:
+            signatures[key] = signature
+
+    matches = index.lookup(signatures)
+    resolved = [(by_id[key], StructuredJob.model_validate(result)) for key, (_, _, result) in matches.items()]
+
+    clusters = index.cluster({k: v for k, v in signatures.items() if k not in matches})
+    siblings = {rep: [by_id[key] for key in members] for rep, members in clusters.items() if members}
+
+    to_classify = [by_id[rep] for rep in clusters]
+    to_classify += [job for key, job in by_id.items() if key not in signatures]
+
+    return resolved, to_classify, siblings, signatures
+
+
+async def classify_stage(
+    pending: asyncio.Queue,
+    results: asyncio.Queue,
+    cache: Optional[ClassificationCache] = None,
+    siblings: Optional[dict[str, list[dict]]] = None,
+    use_rules: bool = CLASSIFY_RULES_ENABLED,
+    context_caches: Optional[dict[str, GeminiContextCache]] = None,
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    attempts: Optional[Counter] = None,
+):
+    """
+    Classifier worker: pull jobs, run the LLM, hand results to the writer
+
+    Runs until cancelled. A transient failure puts the job back on `pending`
+    after an exponential backoff instead of reporting it; only the last of
+    CLASSIFY_MAX_ATTEMPTS is reported as an error. `attempts` is shared by
+    all workers of a batch.
+    """
+    loop = asyncio.get_running_loop()
+    attempts = attempts if attempts is not None else Counter()
+    while True:
+        job = await pending.get()
+        try:
+            structured, error = await classify_job(job, cache, use_rules, context_caches, limiter), None
+        except TransientError as e:
+            key = str(job['raw_id'])
+            attempts[key] += 1
+            if attempts[key] < CLASSIFY_MAX_ATTEMPTS:
+                delay = retry_delay(attempts[key], CLASSIFY_RETRY_BASE_SECONDS, CLASSIFY_RETRY_CAP_SECONDS,
+                                    e.retry_after)
+                retry_stats['requeued'] += 1
+                retry_stats['backoff_seconds'] += delay
+                print(f"    ⚠ {job.get('title') or key}: {e}, retrying in {delay:.0f}s "
+                      f"(attempt {attempts[key] + 1}/{CLASSIFY_MAX_ATTEMPTS})")
+                loop.call_later(delay, pending.put_nowait, job)
+                continue
+            retry_stats['gave_up'] += 1
+            structured, error = None, f"{e} (gave up after {attempts[key]} attempts)"
+        except Exception as e:
+            structured, error = None, e
+
+        await results.put((job, structured, error))
+        # Near-duplicates of this job share its outcome
+        for sibling in (siblings or {}).get(str(job['raw_id']), []):
+            await results.put((sibling, structured, error))
+
+
+async def flush_batch(
+    conn,
+    batch: list[tuple[dict, StructuredJob]],
+    failed: list[tuple[dict, str]],
+    after_commit: Optional[Callable[[list[tuple[dict, StructuredJob]]], Awaitable[None]]] = None,
+) -> tuple[int, int]:
+    """
+    Write a batch of results with one UPDATE per table and a single commit
+
+    If the batched statement fails, the batch is replayed row by row under
+    savepoints so only the offending rows are marked as errors.
+    """
+    def write_all():
+        update_structured_jobs_batch(conn, [(job['job_id'], structured) for job, structured in batch if job['job_id']])
+        if ZEP_SYNC_ENABLED:
+            enqueue_zep_sync(conn, [job['job_id'] for job, _ in batch if job['job_id']])
+        mark_raw_jobs_batch(
+            conn,
+            [(job['raw_id'], 'processed', None) for job, _ in batch]
+            + [(job['raw_id'], 'error', error) for job, error in failed]
+        )
+
+    def write_row_by_row() -> list[tuple[dict, str]]:
+        row_errors = []
+        with conn.cursor() as cur:
+            for job, structured in batch:
+                cur.execute("SAVEPOINT classify_row")
+                try:
+                    if job['job_id']:
+                        update_structured_job(conn, job['job_id'], structured)
+                        if ZEP_SYNC_ENABLED:
+                            enqueue_zep_sync(conn, [job['job_id']])
+                    mark_raw_job_processed(conn, job['raw_id'], 'processed')
+                    cur.execute("RELEASE SAVEPOINT classify_row")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT classify_row")
+                    mark_raw_job_processed(conn, job['raw_id'], 'error', str(e))
+                    row_errors.append((job, str(e)))
+            for job, error in failed:
+                mark_raw_job_processed(conn, job['raw_id'], 'error', error)
+        return row_errors
+
+    row_errors: list[tuple[dict, str]] = []
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE_URL}/api/graph/jobs",
-                json={
-                    "action": "sync-one",
-                    "jobId": job_id,
-                },
-                headers={
-                    "Authorization": f"Bearer {REVALIDATE_SECRET}",
-                    "Content-Type": "application/json",
-                },
-                timeout=30.0,
-            )
-
-            if response.status_code == 200:
-                return True
-            else:
-                print(f"    ⚠ ZEP sync failed: {response.status_code}")
-                return False
+        await asyncio.to_thread(write_all)
     except Exception as e:
-        print(f"    ⚠ ZEP sync error: {str(e)[:50]}")
-        return False
-
-
-async def process_jobs(limit: int = 10, source: str = None):
-    """Main processing function"""
-    conn = get_db_connection()
-
-    try:
-        jobs = fetch_pending_raw_jobs(conn, limit, source)
-        print(f"\n{'='*60}")
-        print(f"PYDANTIC AI JOB CLASSIFICATION")
-        print(f"{'='*60}")
-        print(f"Found {len(jobs)} pending jobs to classify")
-        print(f"{'='*60}\n")
-
-        success_count = 0
-        error_count = 0
-
-        for i, job in enumerate(jobs):
-            title = job.get('title') or job.get('raw_data', {}).get('job_title', 'Unknown')
-            company = job.get('company_name') or job.get('raw_data', {}).get('company_name', 'Unknown')
-
-            print(f"\n[{i+1}/{len(jobs)}] {title}")
+        print(f"    ⚠ Batch write failed ({str(e)[:80]}), retrying row by row")
+        await asyncio.to_thread(conn.rollback)
+        row_errors = await asyncio.to_thread(write_row_by_row)
+
+    bad_rows = {job['raw_id'] for job, _ in row_errors}
+    written = [(job, structured) for job, structured in batch if job['raw_id'] not in bad_rows]
+
+    # Jobs still in flight stay leased for as long as the run keeps flushing
+    await asyncio.to_thread(extend_leases, conn)
+    await asyncio.to_thread(conn.commit)
+
+    if after_commit:
+        await after_commit(written)
+
+    for job, error in failed + row_errors:
+        print(f"    ✗ {job.get('title') or job['raw_id']}: {error[:100]}")
+    print(f"    ✓ Flushed {len(written)} processed, {len(failed) + len(row_errors)} errors")
+
+    return len(written), len(failed) + len(row_errors)
+
+
+async def write_stage(
+    conn,
+    results: asyncio.Queue,
+    total: int,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    flush_interval: float = CLASSIFY_FLUSH_SECONDS,
+    after_commit: Optional[Callable[[list[tuple[dict, StructuredJob]]], Awaitable[None]]] = None,
+) -> tuple[int, int]:
+    """
+    Single writer: collect results and flush them in batches on the shared connection
+
+    DB calls run in a thread so classifiers keep their requests in flight
+    while a flush is waiting on Neon.
+    """
+    loop = asyncio.get_running_loop()
+    success_count = 0
+    error_count = 0
+    batch: list[tuple[dict, StructuredJob]] = []
+    failed: list[tuple[dict, str]] = []
+    received = 0
+    deadline = loop.time() + flush_interval
+
+    while received < total:
+        try:
+            job, structured, error = await asyncio.wait_for(results.get(), timeout=max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            job = None
+
+        if job is not None:
+            received += 1
+            title, company = job_title_company(job)
+
+            print(f"\n[{received}/{total}] {title}")
             print(f"    Company: {company}")
             print(f"    Source: {job['source']}")
 
+            if error:
+                print(f"    ✗ Error: {str(error)[:100]}")
+                failed.append((job, str(error)))
+            else:
+                print_job_result(structured)
+                batch.append((job, structured))
+
+        pending_rows = len(batch) + len(failed)
+        if pending_rows and (pending_rows >= batch_size or loop.time() >= deadline or received == total):
+            ok, bad = await flush_batch(conn, batch, failed, after_commit)
+            success_count += ok
+            error_count += bad
+            batch, failed = [], []
+
+        if loop.time() >= deadline:
+            deadline = loop.time() + flush_interval
+
+    return success_count, error_count
+
+
+async def classify_batch(
+    conn,
+    claim: Callable[[], list[dict]],
+    concurrency: int,
+    batch_size: int,
+    flush_interval: float,
+    cache: Optional[ClassificationCache],
+    index: Optional[NearDuplicateIndex],
+    use_rules: bool,
+    context_caches: Optional[dict[str, GeminiContextCache]],
+    limiter: Optional[AdaptiveRateLimiter],
+) -> tuple[int, int, int]:
+    """
+    Claim one batch of jobs and run them through the pipeline
+
+    Args:
+        claim: Leases and returns the batch, e.g. fetch_pending_raw_jobs
+
+    Returns:
+        (claimed, processed, errors)
+    """
+    reclaimed = reclaim_stale_leases(conn)
+    if reclaimed:
+        print(f"Reclaimed {reclaimed} jobs with expired leases")
+
+    jobs = claim()
+    if not jobs:
+        return 0, 0, 0
+    print(f"Claimed {len(jobs)} jobs as {WORKER_ID} (concurrency {concurrency})")
+
+    pending: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue()
+
+    to_classify, siblings, signatures, representatives = jobs, {}, {}, set()
+    if index:
+        resolved, to_classify, siblings, signatures = await asyncio.to_thread(plan_near_duplicates, index, jobs)
+        copied = sum(len(members) for members in siblings.values())
+        print(f"Near-duplicates: {len(resolved)} matched earlier postings, {copied} share a representative, "
+              f"{len(to_classify)} to classify")
+
+        for job, structured in resolved:
+            results.put_nowait((job, structured, None))
+
+        representatives = {str(job['raw_id']) for job in to_classify}
+
+    async def after_commit(written):
+        """Index freshly classified representatives; the batch is already committed"""
+        if not index:
+            return
+        entries = [
+            (key, signatures[key], structured.model_dump())
+            for job, structured in written
+            if (key := str(job['raw_id'])) in representatives and key in signatures
+        ]
+        try:
+            await asyncio.to_thread(index.add, entries)
+        except CONNECTION_ERRORS as e:
+            print(f"    ⚠ Near-duplicate index write skipped ({str(e)[:80]})")
+
+    for job in to_classify:
+        pending.put_nowait(job)
+
+    # Workers outlive the initial queue (requeued jobs come back after their
+    # backoff) and are cancelled once the writer has every result
+    workers = max(1, min(concurrency, len(to_classify)))
+    attempts = Counter()
+    classifiers = [
+        asyncio.create_task(classify_stage(pending, results, cache, siblings, use_rules, context_caches,
+                                           limiter, attempts))
+        for _ in range(workers)
+    ]
+    try:
+        success_count, error_count = await write_stage(
+            conn, results, len(jobs), batch_size, flush_interval, after_commit
+        )
+    finally:
+        for task in classifiers:
+            task.cancel()
+        await asyncio.gather(*classifiers, return_exceptions=True)
+
+    return len(jobs), success_count, error_count
+
+
+async def wait_for_notify(listener, timeout: float) -> bool:
+    """Wait up to `timeout` for a NOTIFY on the listening connection; True if one arrived"""
+    listener.poll()
+    if not listener.notifies:
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(listener.fileno(), readable.set)
+        try:
+            await asyncio.wait_for(readable.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(listener.fileno())
+        listener.poll()
+
+    woke = bool(listener.notifies)
+    listener.notifies.clear()
+    return woke
+
+
+def open_listener():
+    """
+    Dedicated autocommit connection subscribed to raw_jobs inserts
+
+    LISTEN needs a session-level connection, so a transaction-pooling URL
+    (Neon's pooler) is bypassed for DATABASE_URL_UNPOOLED when it is set.
+    """
+    listener = psycopg2.connect(os.environ.get('DATABASE_URL_UNPOOLED') or os.environ['DATABASE_URL'])
+    listener.autocommit = True
+    with listener.cursor() as cur:
+        cur.execute(f"LISTEN {RAW_JOBS_CHANNEL}")
+    return listener
+
+
+async def run_daemon(classify, stop: asyncio.Event, reconnect: Callable[[], Awaitable[None]]):
+    """
+    Classify continuously, woken by NOTIFY from the raw_jobs insert trigger
+
+    The backlog is drained in back-to-back micro-batches. Once a claim comes
+    back empty the daemon sleeps until a notification arrives, with the
+    fallback poll interval doubling up to CLASSIFY_DAEMON_MAX_IDLE so an idle
+    queue costs almost nothing. `reconnect` reopens any dropped connection
+    before each batch; a batch that fails on a lost connection is retried
+    after a backoff, and its claims come back once their leases expire.
+    """
+    listener = open_listener()
+    idle = CLASSIFY_DAEMON_MIN_IDLE
+    backoff = CLASSIFY_DAEMON_MIN_IDLE
+    print(f"Listening on '{RAW_JOBS_CHANNEL}' for new raw_jobs")
+    try:
+        while not stop.is_set():
             try:
-                # Classify with Pydantic AI
-                structured = await classify_job(job)
-
-                # Update the structured jobs table
-                if job['job_id']:
-                    update_structured_job(conn, job['job_id'], structured)
-
-                    # Sync to ZEP knowledge graph
-                    zep_synced = await sync_job_to_zep(
-                        job['job_id'], structured, title, company,
-                        structured.city or job.get('location', 'UK')
-                    )
-                    if zep_synced:
-                        print(f"    ✓ Synced to ZEP graph")
-
-                # Mark as processed
-                mark_raw_job_processed(conn, job['raw_id'], 'processed')
-                conn.commit()
-
-                # Print summary
-                print(f"    ✓ Type: {structured.employment_type} {'(Fractional)' if structured.is_fractional else ''}")
-                print(f"    ✓ Location: {structured.city or 'Unknown'}, {structured.country} {'🌐' if structured.is_remote else ''}")
-                print(f"    ✓ Vertical: {structured.vertical}")
-                print(f"    ✓ Level: {structured.seniority_level}")
-                if structured.salary_min or structured.salary_max:
-                    print(f"    ✓ Comp: {structured.salary_currency}{structured.salary_min or '?'}-{structured.salary_max or '?'} ({structured.salary_type})")
-                print(f"    ✓ Skills: {len(structured.skills_required)} extracted")
-                print(f"    ✓ Summary: {structured.summary[:80]}...")
-
-                success_count += 1
+                await reconnect()
+                claimed, processed, errors = await classify()
+            except CONNECTION_ERRORS as e:
+                print(f"⚠ Database connection lost ({str(e).strip()[:80]}), reconnecting in {backoff:.0f}s")
+                try:
+                    await asyncio.wait_for(stop.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, CLASSIFY_DAEMON_RECONNECT_CAP)
+                continue
+            backoff = CLASSIFY_DAEMON_MIN_IDLE
+            if claimed:
+                print(f"  micro-batch: {processed} processed, {errors} errors")
+                idle = CLASSIFY_DAEMON_MIN_IDLE
+                continue
 
-            except Exception as e:
-                print(f"    ✗ Error: {str(e)[:100]}")
-                mark_raw_job_processed(conn, job['raw_id'], 'error', str(e))
-                conn.commit()
-                error_count += 1
+            waiter = asyncio.create_task(wait_for_notify(listener, idle))
+            stopper = asyncio.create_task(stop.wait())
+            try:
+                await asyncio.wait({waiter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stopper.cancel()
+            if not waiter.done():
+                waiter.cancel()
+                await asyncio.gather(waiter, return_exceptions=True)
+                continue
+
+            try:
+                woke = waiter.result()
+            except psycopg2.Error as e:
+                print(f"⚠ Listener connection lost ({e}), reconnecting")
+                listener.close()
+                await asyncio.sleep(CLASSIFY_DAEMON_MIN_IDLE)
+                listener = open_listener()
                 continue
+            idle = CLASSIFY_DAEMON_MIN_IDLE if woke else min(idle * 2, CLASSIFY_DAEMON_MAX_IDLE)
+    finally:
+        listener.close()
+
+
+async def reclassify_stale(classify, conn, limit: int, source: Optional[str] = None, restart: bool = False):
+    """
+    Re-classify processed jobs whose prompt fingerprint or source posting changed
+
+    Stale rows are claimed in raw_jobs.id order behind a cursor saved after
+    every flushed batch, so an interrupted pass resumes where it stopped and
+    each claim is a short index range scan. Rows behind the cursor that go
+    stale during the pass are left for the next one.
+    """
+    name = f"reclassify-stale:{source}" if source else 'reclassify-stale'
+    after, done = load_cursor(conn, name, restart)
+    remaining = count_stale_raw_jobs(conn, source, after)
+    print(f"{'Resuming' if after else 'Starting'} {name} for prompt {PROMPT_VERSION}: {remaining} stale jobs ahead"
+          + (f", {done} already re-classified" if done else ""))
+
+    while True:
+        claimed_ids = []
+
+        def claim() -> list[dict]:
+            jobs = fetch_stale_raw_jobs(conn, limit, source, after)
+            claimed_ids.extend(str(job['raw_id']) for job in jobs)
+            return jobs
+
+        claimed, processed, _ = await classify(claim)
+        if not claimed:
+            save_cursor(conn, name, after, done, completed=True)
+            print(f"✓ {name} complete: {done} re-classified")
+            return
+
+        after = claimed_ids[-1]
+        done += processed
+        remaining -= claimed
+        save_cursor(conn, name, after, done)
+        print(f"  cursor at {after}: {done} re-classified, ~{max(remaining, 0)} stale jobs ahead")
+
+
+async def process_jobs(
+    limit: int = 10,
+    source: str = None,
+    concurrency: int = CLASSIFY_CONCURRENCY,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    flush_interval: float = CLASSIFY_FLUSH_SECONDS,
+    use_cache: bool = CLASSIFY_CACHE_ENABLED,
+    use_dedupe: bool = CLASSIFY_DEDUPE_ENABLED,
+    use_rules: bool = CLASSIFY_RULES_ENABLED,
+    use_context_cache: bool = CLASSIFY_CONTEXT_CACHE_ENABLED,
+    mode: str = 'once',
+    restart_cursor: bool = False,
+):
+    """
+    Main processing function
+
+    Jobs flow through a bounded pool of classifier tasks into one writer,
+    so up to `concurrency` LLM calls overlap while database updates stay
+    serialized on a single connection and are committed in batches.
+    Near-duplicate postings are classified once per cluster.
+
+    Args:
+        limit: Jobs claimed per batch
+        mode: 'once' for a single batch, 'drain' to repeat until nothing is
+            pending, 'daemon' to keep running and wake on new raw_jobs,
+            'stale' to re-classify jobs whose prompt or source changed
+        restart_cursor: In 'stale' mode, ignore a saved cursor and start over
+    """
+    conn = get_db_connection()
+    cache = None
+    if use_cache:
+        cache = ClassificationCache(
+            os.environ['DATABASE_URL'], MODEL_NAME, PROMPT_VERSION, CLASSIFY_CACHE_MAX_ENTRIES
+        )
+    index = None
+    if use_dedupe:
+        index = NearDuplicateIndex(os.environ['DATABASE_URL'], PROMPT_VERSION, CLASSIFY_DEDUPE_THRESHOLD)
+    # One cached prefix per tier; models without an explicit-caching id send the full prompt
+    context_caches = {}
+    api_key = os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY')
+    if use_context_cache and api_key:
+        context_caches = {
+            tier.model: GeminiContextCache(
+                api_key, tier.info.cache_id, SYSTEM_PROMPT, CLASSIFY_CONTEXT_CACHE_TTL,
+                os.environ.get('GEMINI_API_BASE_URL', GEMINI_API_BASE_URL),
+            )
+            for tier in MODEL_TIERS if tier.info and tier.info.cache_id
+        }
+    limiter = AdaptiveRateLimiter(CLASSIFY_RPM, CLASSIFY_TPM) if CLASSIFY_RPM > 0 else None
+    # Graph sync drains the outbox concurrently; classification never waits on it
+    zep, drainer, drainer_task, drain_stop = None, None, None, asyncio.Event()
+    if ZEP_SYNC_ENABLED:
+        zep = ZepSyncClient(API_BASE_URL, REVALIDATE_SECRET, max_attempts=2)
+        drainer = OutboxDrainer(os.environ['DATABASE_URL'], zep)
+        drainer_task = asyncio.create_task(drainer.supervise(drain_stop))
+
+    totals = Counter()
+
+    def reopen_closed():
+        """Replace any connection that dropped; the writer's is rolled back if merely aborted"""
+        nonlocal conn
+        if conn.closed:
+            conn = get_db_connection()
+            print("  ↻ Reopened the database connection")
+        else:
+            conn.rollback()
+        for helper in (cache, index):
+            if helper and helper.closed:
+                helper.reconnect()
+                print(f"  ↻ Reopened the {type(helper).__name__} connection")
+
+    async def reconnect():
+        await asyncio.to_thread(reopen_closed)
+
+    async def classify(claim: Optional[Callable[[], list[dict]]] = None) -> tuple[int, int, int]:
+        claimed, processed, errors = await classify_batch(
+            conn, claim or (lambda: fetch_pending_raw_jobs(conn, limit, source)), concurrency, batch_size, flush_interval, cache, index, use_rules, context_caches,
+            limiter,
+        )
+        totals.update(claimed=claimed, processed=processed, errors=errors)
+        return claimed, processed, errors
+
+    print(f"\n{'='*60}")
+    print(f"PYDANTIC AI JOB CLASSIFICATION ({mode})")
+    print(f"{'='*60}\n")
+
+    try:
+        if mode == 'daemon':
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            await run_daemon(classify, stop, reconnect)
+        elif mode == 'drain':
+            while (await classify())[0]:
+                pass
+        elif mode == 'stale':
+            await reclassify_stale(classify, conn, limit, source, restart_cursor)
+        else:
+            await classify()
 
         print(f"\n{'='*60}")
-        print(f"COMPLETE: {success_count} processed, {error_count} errors")
+        print(f"COMPLETE: {totals['processed']} processed, {totals['errors']} errors")
+        if use_rules:
+            print(f"Rules: {classification_routes['rules']} editorial-only calls, "
+                  f"{classification_routes['full']} full classifications (confident fields still taken from rules)")
+        if cache:
+            stats = cache.stats()
+            evicted = cache.evict()
+            print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), {evicted} evicted")
+        for model, context_cache in context_caches.items():
+            if not context_cache.calls:
+                continue
+            stats = context_cache.stats()
+            print(f"Context cache ({model}): {stats['calls']} calls on {stats['caches_created']} cached prefixes "
+                  f"{stats['prefix_tokens']}, {stats['cached_tokens']} of {stats['prompt_tokens']} prompt tokens cached, "
+                  f"prefix cost {stats['prefix_cost_cached']:.0f} vs {stats['prefix_cost_uncached']} uncached "
+                  f"({stats['saved_ratio']:.0%} saved)")
+        for row in cascade_stats.summary():
+            cost = f"${row['cost']:.4f}" if row['cost'] is not None else "cost unknown"
+            print(f"Tier {row['tier']}: {row['accepted']}/{row['calls']} accepted ({row['hit_rate']:.0%}), "
+                  f"{row['avg_seconds']:.1f}s avg, {cost}, flagged {row['flagged'] or 'none'}")
+        top_cost = cascade_stats.top_tier_cost()
+        if len(MODEL_TIERS) > 1 and top_cost is not None:
+            spent = sum(row['cost'] or 0.0 for row in cascade_stats.summary())
+            print(f"Cascade cost ${spent:.4f} vs ~${top_cost:.4f} with {MODEL_TIERS[-1].name} alone")
+        if limiter:
+            stats = limiter.stats()
+            print(f"Rate limit: {stats['calls']} calls, {stats['working_seconds']:.0f}s working vs "
+                  f"{stats['throttled_seconds']:.0f}s throttled ({stats['throttled_share']:.0%}), "
+                  f"{stats['throttle_events']} 429s, limits now {stats['rpm']:.0f} RPM / {stats['tpm']:.0f} TPM")
+        if retry_stats:
+            print(f"Retries: {retry_stats['requeued']} requeued ({retry_stats['backoff_seconds']:.0f}s backoff), "
+                  f"{retry_stats['gave_up']} gave up after {CLASSIFY_MAX_ATTEMPTS} attempts")
         print(f"{'='*60}\n")
 
     finally:
+        # Interrupted runs return unfinished claims instead of waiting out the lease
+        try:
+            conn.rollback()
+            release_claims(conn)
+        except psycopg2.Error as e:
+            print(f"⚠ Could not release claims: {e}")
         conn.close()
+        if cache:
+            cache.close()
+        if index:
+            index.close()
+        for context_cache in context_caches.values():
+            await context_cache.close()
+        if drainer_task:
+            drain_stop.set()
+            try:
+                await asyncio.wait_for(drainer_task, ZEP_DRAIN_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"⚠ ZEP outbox not drained within {ZEP_DRAIN_GRACE_SECONDS:.0f}s, leaving the rest queued")
+            except Exception as e:
+                print(f"⚠ ZEP outbox drainer failed: {e}")
+            try:
+                print_metrics(await asyncio.to_thread(drainer.metrics))
+            except psycopg2.Error as e:
+                print(f"⚠ ZEP outbox metrics unavailable: {e}")
+            await zep.close()
+            drainer.close()
 
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description='Classify jobs using Pydantic AI')
-    parser.add_argument('--limit', type=int, default=10, help='Number of jobs to process')
+    parser.add_argument('--limit', type=int,
+                        help='Jobs per batch (default 10, or CLASSIFY_DAEMON_BATCH_SIZE with --all/--daemon/--reclassify-stale)')
     parser.add_argument('--source', type=str, help='Filter by source (e.g., linkedin, greenhouse)')
-    parser.add_argument('--all', action='store_true', help='Process all pending jobs')
+    parser.add_argument('--all', action='store_true', help='Process all pending jobs, in batches of --limit')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running, woken by new raw_jobs (batches of --limit)')
+    parser.add_argument('--reclassify-stale', action='store_true',
+                        help='Re-classify processed jobs whose prompt fingerprint or source changed; resumable')
+    parser.add_argument('--restart-cursor', action='store_true',
+                        help='With --reclassify-stale, start from the first job instead of the saved cursor')
+    parser.add_argument('--concurrency', type=int, default=CLASSIFY_CONCURRENCY, help='Concurrent LLM calls')
+    parser.add_argument('--batch-size', type=int, default=CLASSIFY_BATCH_SIZE, help='Results per database flush')
+    parser.add_argument('--flush-interval', type=float, default=CLASSIFY_FLUSH_SECONDS, help='Max seconds between flushes')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the model, ignoring cached results')
+    parser.add_argument('--no-dedupe', action='store_true', help='Classify near-duplicate postings individually')
+    parser.add_argument('--no-rules', action='store_true', help='Let the model decide every field')
+    parser.add_argument('--no-context-cache', action='store_true', help='Send the full system prompt on every call')
 
     args = parser.parse_args()
 
-    limit = 1000 if args.all else args.limit
+    mode = 'stale' if args.reclassify_stale else 'daemon' if args.daemon else 'drain' if args.all else 'once'
+    limit = args.limit or (10 if mode == 'once' else CLASSIFY_DAEMON_BATCH_SIZE)
 
     print(f"\nStarting Pydantic AI Job Classification...")
-    print(f"Limit: {limit}, Source: {args.source or 'all'}")
-
-    asyncio.run(process_jobs(limit=limit, source=args.source))
+    print(f"Mode: {mode}, Batch: {limit}, Source: {args.source or 'all'}, Concurrency: {args.concurrency}")
+
+    asyncio.run(process_jobs(
+        limit=limit,
+        source=args.source,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        use_cache=CLASSIFY_CACHE_ENABLED and not args.no_cache,
+        use_dedupe=CLASSIFY_DEDUPE_ENABLED and not args.no_dedupe,
+        use_rules=CLASSIFY_RULES_ENABLED and not args.no_rules,
+        use_context_cache=CLASSIFY_CONTEXT_CACHE_ENABLED and not args.no_context_cache,
+        mode=mode,
+        restart_cursor=args.restart_cursor,
+    ))
@@ -0,0 +1,168 @@
+"""
+Gemini context caching for the static classification prefix
+
+The system prompt and output schema are identical on every call. They are
+registered once as Gemini cached content (POST /v1beta/cachedContents) and each
+generateContent request references the returned handle instead of resending
+them. Cached tokens are billed at a fraction of the normal input rate, so the
+class also tallies how much of each call's prompt was served from the cache.
+
+If the provider rejects the cache (e.g. the prefix is below the model's minimum
+cacheable size) the prefix is marked unsupported and callers fall back to the
+regular agent.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Type
+
+import httpx
+from pydantic import BaseModel
+
+GEMINI_API_BASE_URL = 'https://generativelanguage.googleapis.com'
+
+# Gemini 2.0 Flash bills cached input tokens at 25% of the normal rate
+CACHED_TOKEN_PRICE_RATIO = 0.25
+
+# Recreate the cache this long before it expires rather than racing the expiry
+REFRESH_MARGIN = timedelta(seconds=60)
+
+
+class CacheUnavailable(Exception):
+    """The provider would not cache this prefix; use the uncached path"""
+
+
+def system_instruction(system_prompt: str, output_type: Type[BaseModel]) -> str:
+    """Static prefix: the system prompt plus the JSON schema the reply must follow"""
+    schema = json.dumps(output_type.model_json_schema(), indent=1)
+    return f"{system_prompt}\n\n## Output Format\n\nReply with one JSON object matching this JSON schema:\n\n{schema}"
+
+
+class GeminiContextCache:
+    """
+    One cached-content handle per output type, created lazily and reused
+
+    Args:
+        api_key: Gemini API key
+        model: Versioned model id that supports explicit caching, e.g. 'gemini-2.0-flash-001'
+        system_prompt: Static instructions shared by every call
+        ttl_seconds: Lifetime requested for each cached content
+        base_url: API root; point at a local stub to exercise the cache
+    """
+
+    def __init__(self, api_key: str, model: str, system_prompt: str, ttl_seconds: int = 3600,
+                 base_url: str = GEMINI_API_BASE_URL):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.ttl_seconds = ttl_seconds
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={'x-goog-api-key': api_key, 'Content-Type': 'application/json'},
+            timeout=120.0,
+        )
+        self._handles: dict[str, tuple[str, datetime]] = {}
+        self._unsupported: dict[str, str] = {}
+        self._lock = asyncio.Lock()
+
+        self.created = 0
+        self.calls = 0
+        self.prefix_tokens: dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    async def _create(self, output_type: Type[BaseModel]) -> tuple[str, datetime]:
+        response = await self._client.post('/v1beta/cachedContents', json={
+            'model': f'models/{self.model}',
+            'systemInstruction': {'parts': [{'text': system_instruction(self.system_prompt, output_type)}]},
+            'ttl': f'{self.ttl_seconds}s',
+        })
+        if response.status_code >= 400:
+            raise CacheUnavailable(f"{response.status_code}: {response.text[:200]}")
+
+        body = response.json()
+        self.created += 1
+        self.prefix_tokens[output_type.__name__] = body.get('usageMetadata', {}).get('totalTokenCount', 0)
+        expires = body.get('expireTime')
+        if expires:
+            expires_at = datetime.fromisoformat(expires.replace('Z', '+00:00'))
+        else:
+            expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        return body['name'], expires_at
+
+    async def handle(self, output_type: Type[BaseModel], stale: Optional[str] = None) -> str:
+        """
+        Cached-content name for this output type, creating or renewing it as needed
+
+        Args:
+            output_type: Reply model; each has its own prefix
+            stale: Handle the provider no longer recognises; replaced unless another task already did
+        """
+        name = output_type.__name__
+        if name in self._unsupported:
+            raise CacheUnavailable(self._unsupported[name])
+
+        async with self._lock:
+            current = self._handles.get(name)
+            if (current and current[0] != stale
+                    and current[1] - REFRESH_MARGIN > datetime.now(timezone.utc)):
+                return current[0]
+            try:
+                self._handles[name] = await self._create(output_type)
+            except CacheUnavailable as e:
+                self._unsupported[name] = str(e)
+                print(f"⚠ Context cache unavailable for {name}, using full prompts: {str(e)[:100]}")
+                raise
+            return self._handles[name][0]
+
+    async def generate(self, prompt: str, output_type: Type[BaseModel]) -> tuple[BaseModel, dict]:
+        """
+        Run one prompt against the cached prefix and parse the JSON reply
+
+        Returns:
+            (reply, usage) with usage as input_tokens, cached_tokens and output_tokens
+        """
+        handle = await self.handle(output_type)
+        for attempt in range(2):
+            response = await self._client.post(f'/v1beta/models/{self.model}:generateContent', json={
+                'cachedContent': handle,
+                'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                'generationConfig': {'responseMimeType': 'application/json'},
+            })
+            # The cache expired or was evicted server-side: register it again once
+            if response.status_code in (403, 404) and attempt == 0:
+                handle = await self.handle(output_type, stale=handle)
+                continue
+            response.raise_for_status()
+            break
+
+        body = response.json()
+        usage = body.get('usageMetadata', {})
+        self.calls += 1
+        self.prompt_tokens += usage.get('promptTokenCount', 0)
+        self.cached_tokens += usage.get('cachedContentTokenCount', 0)
+
+        text = body['candidates'][0]['content']['parts'][0]['text']
+        return output_type.model_validate_json(text), {
+            'input_tokens': usage.get('promptTokenCount', 0),
+            'cached_tokens': usage.get('cachedContentTokenCount', 0),
+            'output_tokens': usage.get('candidatesTokenCount', 0),
+        }
+
+    def stats(self) -> dict:
+        """Prefix token cost with and without the cache, in input-token equivalents"""
+        uncached = self.cached_tokens
+        cached_cost = self.cached_tokens * CACHED_TOKEN_PRICE_RATIO
+        return {
+            'calls': self.calls,
+            'caches_created': self.created,
+            'prefix_tokens': dict(self.prefix_tokens),
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'prefix_cost_uncached': uncached,
+            'prefix_cost_cached': cached_cost,
+            'saved_ratio': (1 - cached_cost / uncached) if uncached else 0.0,
+        }
+
+    async def close(self):
+        # Cached content is left to expire by TTL so a following run can't race a delete
+        await self._client.aclose()
@@ -0,0 +1,319 @@
+"""
+Rule-based extraction of the structured StructuredJob fields
+
+Employment type, fractional status, days per week, compensation, remote
+status, seniority and role category follow the indicators spelled out in
+the classifier's system prompt (£/p/d/pa, "2-3 days", C-suite -> Executive),
+so they can be read off the posting with compiled regexes. Each field comes
+back with a confidence; when every field clears the threshold the model is
+only asked for the editorial prose.
+"""
+import re
+from typing import Any, NamedTuple, Optional
+
+# Bump when the rules change so cached and indexed results are not reused
+RULES_VERSION = "3"
+
+RULE_FIELDS = (
+    'employment_type',
+    'is_fractional',
+    'days_per_week',
+    'is_remote',
+    'seniority_level',
+    'role_category',
+    'salary_min',
+    'salary_max',
+    'salary_currency',
+    'salary_type',
+)
+
+
+class FieldGuess(NamedTuple):
+    value: Any
+    confidence: float
+    rule: str
+
+
+_FRACTIONAL = re.compile(r"\bfractional\b", re.I)
+_PART_TIME = re.compile(r"\bpart[\s-]?time\b", re.I)
+_INTERIM = re.compile(r"\binterim\b", re.I)
+_CONTRACT = re.compile(r"\b(contract|contractor|freelance|outside ir35|inside ir35|fixed[\s-]term)\b", re.I)
+_FULL_TIME = re.compile(r"\bfull[\s-]?time\b|\bpermanent\b", re.I)
+_PORTFOLIO = re.compile(r"\bportfolio (career|role|basis)\b", re.I)
+
+_NUMBER_WORDS = {'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'half': '0.5'}
+_DAY_NUM = r"(\d(?:\.5)?|one|two|three|four|five|half)"
+_PER_WEEK = r"\s*(?:days?|d)\s*(?:(?:per|a|each|/|p)\s*\.?\s*(?:week|wk|w)\b|weekly\b)"
+_DAYS_RANGE = re.compile(_DAY_NUM + r"\s*(?:-|–|to|or)\s*" + _DAY_NUM + _PER_WEEK, re.I)
+_DAYS_SINGLE = re.compile(_DAY_NUM + _PER_WEEK, re.I)
+_DAYS_ANY = re.compile(r"\bdays?\s*(?:(?:per|a|/)\s*(?:week|wk)\b|weekly\b)", re.I)
+
+_CURRENCY_SYMBOLS = {'£': 'GBP', '$': 'USD', '€': 'EUR'}
+_CURRENCY = r"(?:[£$€]|\b(?:GBP|USD|EUR)\s?)"
+_MONEY = re.compile(
+    r"(?P<cur>" + _CURRENCY + r")?(?P<a1>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(?P<k1>k)?"
+    r"(?:\s*(?:-|–|to)\s*" + _CURRENCY + r"?(?P<a2>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(?P<k2>k)?)?"
+    # Lookahead, so a rejected figure's tail does not swallow the next figure
+    r"(?=(?P<tail>[^\n.;]{0,40}))",
+    re.I,
+)
+_DAILY = re.compile(r"\b(per day|a day|p/?d|pd|daily|day rate|per diem)\b", re.I)
+_HOURLY = re.compile(r"\b(per hour|an hour|p/?h|ph|hourly|/\s*hr|/\s*hour)\b", re.I)
+_ANNUAL = re.compile(r"\b(per annum|p\.?a\.?|pa|per year|a year|annual|annually|salary|/\s*yr|/\s*year)\b", re.I)
+# A figure in free text only counts as pay when rate/salary wording leads straight into it
+_PAY_LEAD = re.compile(
+    r"\b(day rate|daily rate|hourly rate|rate|salary|compensation|remuneration|pay|package|ote|per day|per annum)"
+    r"\s*(?:of|is|from|:|-|–)?\s*(?:up to|circa|c\.|from)?\s*$",
+    re.I,
+)
+# Funding rounds, valuations and headcounts rather than pay
+_NOT_PAY = re.compile(r"^\s*(?:m|mn|bn|million|billion)\b|^\s*(?:\+\s*)?(?:employees|staff|people|customers|users)\b",
+                      re.I)
+
+_REMOTE = re.compile(r"\b(fully remote|remote[\s-]first|remote working|work from home|wfh|remote)\b", re.I)
+_HYBRID = re.compile(r"\bhybrid\b", re.I)
+_ONSITE = re.compile(r"\b(on[\s-]?site|office[\s-]based|in[\s-]office|in the office \d|no remote)\b", re.I)
+# "3 days per week in the office" is hybrid attendance, not a working pattern
+_ATTENDANCE = re.compile(r"^[\s,]*(?:in|at|from)\s+(?:the|our|an?)?\s*(?:office|hq|studio)\b|^[\s,]*on[\s-]?site\b",
+                         re.I)
+
+# Checked in order; the first match on the title wins
+_SENIORITY_RULES = [
+    ('Intern', re.compile(r"\b(intern|internship|apprentice|apprenticeship|placement|graduate scheme)\b", re.I)),
+    ('Executive', re.compile(
+        r"\b(c[efmotdirs]o|cxo|chief [a-z ]*officer|chief of staff|vp|svp|evp|vice[\s-]president|"
+        r"managing partner|managing director|president|(?:co[\s-]?)?founder(?!['’]?s?\s+(?:associate|assistant|office)))\b",
+        re.I)),
+    ('Director', re.compile(r"\b(director|head of|head,)\b", re.I)),
+    ('Manager', re.compile(r"\b(manager|team lead|lead|supervisor)\b", re.I)),
+    ('Senior', re.compile(r"\b(senior|sr\.?|principal|staff)\b", re.I)),
+    ('Junior', re.compile(r"\b(junior|jr\.?|graduate|entry[\s-]level|associate|trainee|assistant)\b", re.I)),
+]
+
+_CATEGORY_RULES = [
+    ('Finance', re.compile(
+        r"\b(cfo|finance|financial|(?-i:FD)|accountant|accounting|controller|fp&a|treasury|treasurer|payroll|audit|tax)\b", re.I)),
+    ('Marketing', re.compile(
+        r"\b(cmo|marketing|marketer|growth|demand gen(?:eration)?|content|brand|communications|comms|seo|(?-i:PR))\b", re.I)),
+    ('Engineering', re.compile(
+        r"\b(cto|engineer|engineering|developer|software|devops|platform|architect|technology|technical|cio|(?-i:IT))\b", re.I)),
+    ('Operations', re.compile(
+        r"\b(coo|operations|operating|ops|project manager|programme|program manager|chief of staff|pmo|transformation)\b",
+        re.I)),
+    ('Sales', re.compile(
+        r"\b(cro|sales|business development|bdr|sdr|account executive|partnerships|revenue|commercial)\b", re.I)),
+    # CPO is usually the Chief Product Officer; a "People" CPO also hits HR and is left to the model
+    ('HR', re.compile(r"\b(chro|chief people officer|hr|human resources|people|talent|recruiter|recruitment|l&d)\b",
+                      re.I)),
+    ('Product', re.compile(
+        r"\b(cpo|chief product officer|product manager|product director|product owner|head of product|product)\b",
+        re.I)),
+    ('Design', re.compile(r"\b(designer|design|ux|ui|user research(?:er)?)\b", re.I)),
+    ('Data', re.compile(
+        r"\b(data|analytics|analyst|(?-i:BI)|business intelligence|machine learning|(?-i:ML|AI))\b", re.I)),
+    ('Legal', re.compile(r"\b(legal|counsel|lawyer|solicitor|compliance|contracts|general counsel)\b", re.I)),
+    ('Customer Success', re.compile(r"\b(customer success|csm|customer support|support lead|customer experience)\b", re.I)),
+]
+
+
+def _days(value: str) -> str:
+    return _NUMBER_WORDS.get(value.lower(), value)
+
+
+def _amount(number: str, k: Optional[str]) -> int:
+    value = float(number.replace(",", ""))
+    return int(value * 1000) if k else int(value)
+
+
+def extract_employment(title: str, text: str, hint: str) -> dict[str, FieldGuess]:
+    fractional_title = bool(_FRACTIONAL.search(title))
+    part_time_title = bool(_PART_TIME.search(title))
+
+    if fractional_title:
+        employment = FieldGuess('fractional', 0.95, 'title:fractional')
+    elif _INTERIM.search(title):
+        employment = FieldGuess('interim', 0.9, 'title:interim')
+    elif part_time_title:
+        employment = FieldGuess('part-time', 0.9, 'title:part-time')
+    elif _FRACTIONAL.search(text):
+        employment = FieldGuess('fractional', 0.75, 'text:fractional')
+    elif _PART_TIME.search(hint) or _PART_TIME.search(text):
+        employment = FieldGuess('part-time', 0.8, 'hint:part-time')
+    elif _CONTRACT.search(hint) or _CONTRACT.search(title):
+        employment = FieldGuess('contract', 0.85, 'hint:contract')
+    elif _FULL_TIME.search(hint):
+        employment = FieldGuess('full-time', 0.85, 'hint:full-time')
+    elif _CONTRACT.search(text):
+        employment = FieldGuess('contract', 0.65, 'text:contract')
+    else:
+        employment = FieldGuess('full-time', 0.6, 'default')
+
+    full_time = bool(_FULL_TIME.search(hint) or _FULL_TIME.search(text))
+    days_high = 0.0
+    days_match = _DAYS_RANGE.search(text) or _DAYS_SINGLE.search(text)
+    if days_match and _ATTENDANCE.search(text[days_match.end():]):
+        days = FieldGuess(None, 0.5, 'days:office attendance')
+    elif days_match and days_match.re is _DAYS_RANGE:
+        days_high = float(_days(days_match.group(2)))
+        days = FieldGuess(f"{_days(days_match.group(1))}-{_days(days_match.group(2))} days", 0.9, 'days:range')
+    elif days_match:
+        count = _days(days_match.group(1))
+        days_high = float(count)
+        days = FieldGuess(f"{count} day" if count in ('1', '0.5') else f"{count} days", 0.9, 'days:single')
+    elif _DAYS_ANY.search(text):
+        days = FieldGuess(None, 0.4, 'days:unparsed')
+    else:
+        # Silence is not evidence of a full-time week; leave it to the model
+        days = FieldGuess(None, 0.5, 'days:none')
+
+    if fractional_title or part_time_title:
+        fractional = FieldGuess(True, 0.95, 'title')
+    elif employment.value in ('fractional', 'part-time') or _PORTFOLIO.search(text):
+        fractional = FieldGuess(True, min(employment.confidence, 0.8), 'text')
+    elif days.value and not full_time and days_high < 4:
+        # A short week alone is suggestive, not conclusive; the model confirms it
+        fractional = FieldGuess(True, 0.7, 'days')
+    else:
+        fractional = FieldGuess(False, min(employment.confidence, 0.85), 'no indicators')
+
+    return {'employment_type': employment, 'is_fractional': fractional, 'days_per_week': days}
+
+
+def _pay_unit(tail: str, lead: str) -> Optional[str]:
+    for unit, pattern in (('daily', _DAILY), ('hourly', _HOURLY), ('annual', _ANNUAL)):
+        if pattern.search(tail) or pattern.search(lead):
+            return unit
+    return None
+
+
+def _salary_from(text: str, compensation_field: bool) -> Optional[dict[str, FieldGuess]]:
+    for match in _MONEY.finditer(text):
+        low = _amount(match.group('a1'), match.group('k1'))
+        high = _amount(match.group('a2'), match.group('k2')) if match.group('a2') else None
+        if high is not None and match.group('k2') and not match.group('k1') and low < 1000:
+            low *= 1000  # "£80-100k"
+        tail = match.group('tail')
+        if low < 10 or _NOT_PAY.search(tail):
+            continue
+
+        # Same line and sentence only, so "Salary: competitive. We raised $20m" does not count
+        lead = re.split(r"[\n.;]", text[max(0, match.start() - 40):match.start()])[-1]
+        near_tail = tail[:25]
+        cur = (match.group('cur') or '').strip().upper()
+        unit = _pay_unit(near_tail, lead)
+        if not compensation_field and not _PAY_LEAD.search(lead) and not (cur and unit):
+            continue
+
+        if unit:
+            salary_type, confidence = unit, 0.9
+        elif low >= 15_000:
+            salary_type, confidence = 'annual', 0.75
+        elif 250 <= low <= 3_000:
+            salary_type, confidence = 'daily', 0.7
+        else:
+            salary_type, confidence = 'hourly', 0.5
+
+        if cur:
+            # The currency is only as trustworthy as the figure it was read from
+            currency = FieldGuess(_CURRENCY_SYMBOLS.get(cur, cur), min(0.95, confidence), 'money')
+        else:
+            currency = FieldGuess('GBP', 0.5, 'money:no symbol')
+        return {
+            'salary_min': FieldGuess(low, confidence, 'money'),
+            'salary_max': FieldGuess(high if high is not None else low, confidence, 'money'),
+            'salary_currency': currency,
+            'salary_type': FieldGuess(salary_type, confidence, 'money:unit'),
+        }
+    return None
+
+
+def extract_salary(text: str, compensation: str = '') -> dict[str, FieldGuess]:
+    """
+    Pay from the source's compensation field, else from a figure in the text
+    that sits next to rate or salary wording
+    """
+    found = _salary_from(compensation, True) if compensation else None
+    if found is None:
+        found = _salary_from(text, False)
+    if found is not None:
+        return found
+
+    # No usable figure: these are only the schema defaults, so the model decides
+    return {
+        'salary_min': FieldGuess(None, 0.5, 'none'),
+        'salary_max': FieldGuess(None, 0.5, 'none'),
+        'salary_currency': FieldGuess('GBP', 0.5, 'default'),
+        'salary_type': FieldGuess('daily', 0.5, 'default'),
+    }
+
+
+def extract_remote(title: str, location: str, text: str) -> FieldGuess:
+    header = f"{title}\n{location}"
+    if _REMOTE.search(header):
+        return FieldGuess(True, 0.95, 'header:remote')
+    if _HYBRID.search(header):
+        return FieldGuess(True, 0.7, 'header:hybrid')
+    if _REMOTE.search(text):
+        return FieldGuess(True, 0.75, 'text:remote')
+    if _HYBRID.search(text):
+        return FieldGuess(True, 0.6, 'text:hybrid')
+    if _ONSITE.search(header) or _ONSITE.search(text):
+        return FieldGuess(False, 0.85, 'on-site')
+    return FieldGuess(False, 0.5, 'no mention')
+
+
+def extract_seniority(title: str, fractional: bool) -> FieldGuess:
+    for level, pattern in _SENIORITY_RULES:
+        if pattern.search(title):
+            # "Fractional CFO" style titles are executive even without the C-suite acronym
+            return FieldGuess(level, 0.9, f'title:{level}')
+    if fractional:
+        return FieldGuess('Executive', 0.6, 'fractional')
+    return FieldGuess('Mid', 0.55, 'default')
+
+
+def extract_role_category(title: str, text: str) -> FieldGuess:
+    title_hits = [category for category, pattern in _CATEGORY_RULES if pattern.search(title)]
+    if len(title_hits) == 1:
+        return FieldGuess(title_hits[0], 0.9, 'title')
+    if title_hits:
+        # Earlier rules are the more specific C-suite functions
+        return FieldGuess(title_hits[0], 0.65, 'title:ambiguous')
+
+    counts = {category: len(pattern.findall(text)) for category, pattern in _CATEGORY_RULES}
+    best = max(counts, key=counts.get)
+    if counts[best] == 0:
+        return FieldGuess('Other', 0.3, 'none')
+    return FieldGuess(best, 0.5, 'text')
+
+
+def extract(title: str, description: str, location: str = '', employment_hint: str = '',
+            compensation: str = '') -> dict[str, FieldGuess]:
+    """
+    Rule-derived values for RULE_FIELDS
+
+    Args:
+        title: Job title
+        description: Full posting text
+        location: Location string as scraped
+        employment_hint: Employment type reported by the source, if any
+        compensation: Salary text reported by the source, if any
+    """
+    title = title or ''
+    text = f"{title}\n{compensation or ''}\n{description or ''}"
+
+    fields = extract_employment(title, text, employment_hint or '')
+    fields.update(extract_salary(text, compensation or ''))
+    fields['is_remote'] = extract_remote(title, location or '', text)
+    fields['seniority_level'] = extract_seniority(title, fields['is_fractional'].value)
+    fields['role_category'] = extract_role_category(title, text)
+    return fields
+
+
+def low_confidence(fields: dict[str, FieldGuess], min_confidence: float) -> list[str]:
+    """Fields the model still has to decide"""
+    return [name for name in RULE_FIELDS if fields[name].confidence < min_confidence]
+
+
+def field_values(fields: dict[str, FieldGuess]) -> dict[str, Any]:
+    return {name: guess.value for name, guess in fields.items()}
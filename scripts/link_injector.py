@@ -0,0 +1,130 @@
+"""
+Deterministic internal links for classified job descriptions
+
+The model writes plain prose; this stage weaves in 2-4 markdown links to the
+dedicated listing pages. The cluster matching the job's role_category goes
+first, then the general fractional page, then any other role cluster whose
+keywords appear in the text. Each URL is used at most once, and links the
+model emitted anyway are kept only if their URL is not already taken. When
+the prose offers too few anchors a closing sentence tops it up to MIN_LINKS
+from the same order, so categories without a cluster of their own (Sales,
+HR, Other, ...) still get links.
+"""
+import re
+from typing import NamedTuple, Optional
+
+
+class LinkCluster(NamedTuple):
+    url: str
+    role_category: Optional[str]
+    phrases: tuple[str, ...]  # longest first, so "fractional CFO jobs" beats "CFO"
+
+
+CLUSTERS = (
+    LinkCluster('/fractional-cfo-jobs-uk', 'Finance', (
+        'fractional finance director', 'fractional CFO jobs', 'CFO opportunities', 'fractional CFO',
+        'part-time CFO', 'finance director', 'CFO roles', 'CFO',
+    )),
+    LinkCluster('/fractional-cmo-jobs-uk', 'Marketing', (
+        'fractional marketing director', 'fractional CMO jobs', 'CMO opportunities', 'fractional CMO',
+        'part-time CMO', 'marketing director', 'CMO roles', 'CMO',
+    )),
+    LinkCluster('/fractional-cto-jobs-uk', 'Engineering', (
+        'fractional tech director', 'fractional CTO jobs', 'CTO opportunities', 'fractional CTO',
+        'part-time CTO', 'technology director', 'CTO roles', 'CTO',
+    )),
+    LinkCluster('/fractional-coo-jobs-uk', 'Operations', (
+        'fractional operations director', 'fractional COO jobs', 'COO opportunities', 'fractional COO',
+        'part-time COO', 'operations director', 'COO roles', 'COO',
+    )),
+    LinkCluster('/fractional-jobs', None, (
+        'fractional opportunities', 'part-time executive', 'fractional executive', 'portfolio careers',
+        'portfolio career', 'fractional roles', 'fractional jobs', 'fractional role', 'fractional',
+    )),
+)
+
+GENERAL = CLUSTERS[-1]
+MIN_LINKS = 2
+MAX_LINKS = 4
+
+_MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_PATTERNS = {
+    cluster.url: re.compile(r"\b(" + "|".join(re.escape(p) for p in cluster.phrases) + r")\b", re.I)
+    for cluster in CLUSTERS
+}
+
+# Closing sentence used when the prose offers too few natural anchors
+_FALLBACK = {
+    GENERAL.url: "[fractional jobs]({url})",
+    '/fractional-cfo-jobs-uk': "[fractional CFO jobs]({url})",
+    '/fractional-cmo-jobs-uk': "[fractional CMO jobs]({url})",
+    '/fractional-cto-jobs-uk': "[fractional CTO jobs]({url})",
+    '/fractional-coo-jobs-uk': "[fractional COO jobs]({url})",
+}
+
+
+def _dedupe_existing(text: str, used: set[str]) -> str:
+    """Unwrap model-written links whose URL already appeared"""
+    def keep_first(match: re.Match) -> str:
+        url = match.group(2)
+        if url in used:
+            return match.group(1)
+        used.add(url)
+        return match.group(0)
+
+    return _MARKDOWN_LINK.sub(keep_first, text)
+
+
+def _link_first(text: str, cluster: LinkCluster) -> Optional[str]:
+    """Link the first keyword outside an existing link, or None if there is none"""
+    position = 0
+    for link in list(_MARKDOWN_LINK.finditer(text)) + [None]:
+        end = link.start() if link else len(text)
+        match = _PATTERNS[cluster.url].search(text, position, end)
+        if match:
+            return f"{text[:match.start()]}[{match.group(0)}]({cluster.url}){text[match.end():]}"
+        if link is None:
+            return None
+        position = link.end()
+
+
+def cluster_order(role_category: Optional[str]) -> list[LinkCluster]:
+    """Matching role cluster first, then the general page, then the other roles"""
+    primary = [c for c in CLUSTERS if c.role_category and c.role_category == role_category]
+    others = [c for c in CLUSTERS if c.role_category and c.role_category != role_category]
+    return primary + [GENERAL] + others
+
+
+def inject_links(text: str, role_category: Optional[str], min_links: int = MIN_LINKS,
+                 max_links: int = MAX_LINKS) -> str:
+    """
+    Add internal links to plain prose
+
+    Args:
+        text: opportunity_description as written by the model
+        role_category: StructuredJob.role_category, picks the primary cluster
+        min_links: Topped up in cluster_order with a closing sentence
+        max_links: Upper bound including links already present
+    """
+    used: set[str] = set()
+    text = _dedupe_existing(text, used)
+
+    order = cluster_order(role_category)
+    for cluster in order:
+        if len(used) >= max_links:
+            break
+        if cluster.url in used:
+            continue
+        linked = _link_first(text, cluster)
+        if linked is not None:
+            text = linked
+            used.add(cluster.url)
+
+    missing = [c.url for c in order if c.url not in used][:max(0, min_links - len(used))]
+    if missing:
+        anchors = [_FALLBACK[url].format(url=url) for url in missing]
+        anchors = anchors[0] if len(anchors) == 1 else f"{', '.join(anchors[:-1])} and {anchors[-1]}"
+        text = f"{text.rstrip()}\n\nExplore more {anchors} on Fractional.Quest."
+
+    return text
+
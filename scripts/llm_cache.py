@@ -0,0 +1,129 @@
+"""
+Content-addressed cache for LLM classification results
+
+Keys are a sha256 of the model name, the prompt/schema version and the
+normalized prompt, so identical postings scraped again or from another
+source reuse the stored result instead of paying for another model call.
+Entries live in the classification_cache table (migrations/014).
+"""
+import hashlib
+import json
+import re
+import threading
+from typing import Optional
+
+import psycopg2
+
+# Prompt lines that change between scrapes without changing the posting
+VOLATILE_PROMPT_LINES = re.compile(r"^\s*- (Posted|Applicants|Source):.*$", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s+")
+
+# A dropped connection turns lookups into misses instead of failing the job
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", VOLATILE_PROMPT_LINES.sub("", prompt)).strip()
+
+
+def cache_key(prompt: str, model: str, prompt_version: str) -> str:
+    payload = f"{model}\n{prompt_version}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """
+    Postgres-backed result cache with LRU eviction and hit/miss counters
+
+    Uses its own autocommit connection so lookups from concurrent classifier
+    tasks never join the writer's open transaction. If that connection drops,
+    get() misses and put() is skipped until reconnect().
+
+    Args:
+        database_url: Postgres connection string
+        model: Model name mixed into every key
+        prompt_version: Prompt/schema fingerprint mixed into every key
+        max_entries: Entries kept after evict()
+    """
+
+    def __init__(self, database_url: str, model: str, prompt_version: str, max_entries: int = 50_000):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._database_url = database_url
+        self._conn = psycopg2.connect(database_url)
+        self._conn.autocommit = True
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._conn.closed)
+
+    def reconnect(self):
+        with self._lock:
+            self._conn.close()
+            self._conn = psycopg2.connect(self._database_url)
+            self._conn.autocommit = True
+
+    def key(self, prompt: str) -> str:
+        return cache_key(prompt, self.model, self.prompt_version)
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with self._lock, self._conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE classification_cache SET hits = hits + 1, last_hit_at = NOW()
+                    WHERE cache_key = %s
+                    RETURNING result
+                """, (key,))
+                row = cur.fetchone()
+        except CONNECTION_ERRORS:
+            self.errors += 1
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result = row[0]
+        return json.loads(result) if isinstance(result, str) else result
+
+    def put(self, key: str, result: dict):
+        try:
+            with self._lock, self._conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO classification_cache (cache_key, model, prompt_version, result)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (cache_key) DO UPDATE SET result = EXCLUDED.result, last_hit_at = NOW()
+                """, (key, self.model, self.prompt_version, json.dumps(result)))
+        except CONNECTION_ERRORS:
+            self.errors += 1
+
+    def evict(self) -> int:
+        """Delete least recently used entries beyond max_entries"""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM classification_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM classification_cache
+                    ORDER BY last_hit_at DESC
+                    OFFSET %s
+                )
+            """, (self.max_entries,))
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        self._conn.close()
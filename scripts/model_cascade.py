@@ -0,0 +1,129 @@
+"""
+Tiered model cascade for job classification
+
+Postings go to the cheapest model first. A tier's answer is escalated to the
+next tier when the reply fails schema validation, the model's self-reported
+confidence is below the threshold, or a constrained field (role_category,
+seniority_level, ...) is outside its allowed values. The last tier's answer is
+always kept. Hit rate, latency and token cost are tallied per tier so the
+tier list and threshold can be tuned.
+"""
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from context_cache import CACHED_TOKEN_PRICE_RATIO
+
+PROVIDER_PREFIX = 'google-gla:'
+
+
+class ModelInfo(NamedTuple):
+    input_price: float       # USD per 1M input tokens
+    output_price: float      # USD per 1M output tokens
+    cache_id: Optional[str]  # Versioned id for explicit context caching, None if unsupported
+
+
+# Gemini API paid-tier list prices for text prompts
+MODEL_CATALOGUE = {
+    'gemini-2.0-flash-lite': ModelInfo(0.075, 0.30, 'gemini-2.0-flash-lite-001'),
+    'gemini-2.0-flash': ModelInfo(0.10, 0.40, 'gemini-2.0-flash-001'),
+    'gemini-2.5-flash': ModelInfo(0.30, 2.50, 'gemini-2.5-flash'),
+    'gemini-2.5-pro': ModelInfo(1.25, 10.00, 'gemini-2.5-pro'),
+}
+
+
+class ModelTier(NamedTuple):
+    name: str                 # Bare model id, e.g. 'gemini-2.0-flash-lite'
+    model: str                # pydantic_ai model string
+    info: Optional[ModelInfo]
+
+
+def parse_tiers(spec: str) -> list[ModelTier]:
+    """Comma-separated model ids, cheapest first; the provider prefix is optional"""
+    tiers = []
+    for entry in spec.split(','):
+        name = entry.strip().removeprefix(PROVIDER_PREFIX)
+        if name:
+            tiers.append(ModelTier(name, PROVIDER_PREFIX + name, MODEL_CATALOGUE.get(name)))
+    if not tiers:
+        raise ValueError("At least one model tier is required")
+    return tiers
+
+
+def escalation_reason(values: dict, allowed: dict[str, set[str]], min_confidence: float) -> Optional[str]:
+    """Why this answer should go to a stronger model, or None to accept it"""
+    confidence = values.get('confidence')
+    if confidence is not None and confidence < min_confidence:
+        return 'low_confidence'
+    for field, choices in allowed.items():
+        if values.get(field) not in choices:
+            return f'bad_{field}'
+    return None
+
+
+def call_cost(info: Optional[ModelInfo], usage: dict) -> Optional[float]:
+    """USD for one call; cached input tokens are billed at the discounted rate"""
+    if info is None:
+        return None
+    cached = usage.get('cached_tokens', 0)
+    uncached = usage.get('input_tokens', 0) - cached
+    return (
+        uncached * info.input_price
+        + cached * info.input_price * CACHED_TOKEN_PRICE_RATIO
+        + usage.get('output_tokens', 0) * info.output_price
+    ) / 1_000_000
+
+
+class CascadeStats:
+    """Per-tier outcome counts, latency and cost for one run"""
+
+    def __init__(self, tiers: list[ModelTier]):
+        self.tiers = tiers
+        self.calls = Counter()
+        self.accepted = Counter()
+        self.flagged: dict[str, Counter] = {tier.name: Counter() for tier in tiers}
+        self.seconds = Counter()
+        self.cost = Counter()
+        self.tokens: dict[str, Counter] = {tier.name: Counter() for tier in tiers}
+
+    def record(self, tier: ModelTier, elapsed: float, usage: Optional[dict], reason: Optional[str],
+               final: bool):
+        """
+        One call at one tier
+
+        Args:
+            reason: Escalation reason, None if the answer was good
+            final: This was the last tier, so the answer is kept regardless
+        """
+        self.calls[tier.name] += 1
+        self.seconds[tier.name] += elapsed
+        if usage:
+            self.tokens[tier.name].update(usage)
+            self.cost[tier.name] += call_cost(tier.info, usage) or 0.0
+        if reason is None:
+            self.accepted[tier.name] += 1
+        else:
+            self.flagged[tier.name][reason if not final else f'kept_{reason}'] += 1
+
+    def summary(self) -> list[dict]:
+        rows = []
+        for tier in self.tiers:
+            calls = self.calls[tier.name]
+            rows.append({
+                'tier': tier.name,
+                'calls': calls,
+                'accepted': self.accepted[tier.name],
+                'hit_rate': self.accepted[tier.name] / calls if calls else 0.0,
+                'avg_seconds': self.seconds[tier.name] / calls if calls else 0.0,
+                'cost': self.cost[tier.name] if tier.info else None,
+                'flagged': dict(self.flagged[tier.name]),
+            })
+        return rows
+
+    def top_tier_cost(self) -> Optional[float]:
+        """What the same tokens would have cost on the last tier alone, for comparison"""
+        top = self.tiers[-1].info
+        if top is None:
+            return None
+        # Each posting is counted once, with the tokens of its first call
+        first = self.tiers[0].name
+        return call_cost(top, self.tokens[first]) if self.calls[first] else 0.0
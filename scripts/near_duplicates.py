@@ -0,0 +1,191 @@
+"""
+Near-duplicate posting detection with MinHash LSH
+
+Recruiters post the same role with small wording changes across boards, which
+an exact-hash cache misses. Postings are shingled into word 5-grams and
+sketched with MinHash; banding the signatures (LSH) finds candidate pairs
+without comparing every posting to every other. The index persists in
+posting_signatures / posting_lsh_buckets (migrations/015) and grows as each
+run classifies new representatives.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+from typing import Optional
+
+import psycopg2
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS  # candidate threshold ~ (1/BANDS) ** (1/ROWS) ~ 0.77
+SHINGLE_SIZE = 5
+MIN_WORDS = 40  # shorter texts are too generic to deduplicate safely
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"[a-z0-9£$€%]+")
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big") & _PRIME
+
+
+def minhash(text: str) -> Optional[list[int]]:
+    """MinHash signature of a text, or None if it is too short to compare"""
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = {_hash64(" ".join(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return [min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMUTATIONS]
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of the underlying shingle sets"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def band_buckets(signature: list[int]) -> list[tuple[int, int]]:
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        # Signed 63-bit so it fits a BIGINT column
+        buckets.append((band, _hash64(",".join(map(str, rows))) >> 1))
+    return buckets
+
+
+class NearDuplicateIndex:
+    """
+    Persistent LSH index of classified representatives
+
+    Args:
+        database_url: Postgres connection string
+        prompt_version: Only results classified under this version are reused
+        threshold: Minimum estimated Jaccard similarity to count as a duplicate
+    """
+
+    def __init__(self, database_url: str, prompt_version: str, threshold: float = 0.85):
+        self.prompt_version = prompt_version
+        self.threshold = threshold
+        self._database_url = database_url
+        self._conn = psycopg2.connect(database_url)
+        self._conn.autocommit = True
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._conn.closed)
+
+    def reconnect(self):
+        with self._lock:
+            self._conn.close()
+            self._conn = psycopg2.connect(self._database_url)
+            self._conn.autocommit = True
+
+    def lookup(self, signatures: dict[str, list[int]]) -> dict[str, tuple[str, float, dict]]:
+        """
+        Match postings against previously indexed representatives
+
+        Returns {key: (representative raw_id, similarity, result)} for every
+        posting with a stored near-duplicate above the threshold.
+        """
+        if not signatures:
+            return {}
+
+        bands, buckets = [], []
+        for signature in signatures.values():
+            for band, bucket in band_buckets(signature):
+                bands.append(band)
+                buckets.append(bucket)
+
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT s.raw_id, s.signature, s.result
+                FROM unnest(%s::smallint[], %s::bigint[]) AS q(band, bucket)
+                JOIN posting_lsh_buckets b ON b.band = q.band AND b.bucket = q.bucket
+                JOIN posting_signatures s ON s.raw_id = b.raw_id
+                WHERE s.prompt_version = %s
+            """, (bands, buckets, self.prompt_version))
+            candidates = cur.fetchall()
+
+        # Candidates are few (only bucket collisions); score them per posting
+        by_bucket: dict[tuple[int, int], list[tuple]] = {}
+        for candidate in candidates:
+            for bucket in band_buckets(candidate[1]):
+                by_bucket.setdefault(bucket, []).append(candidate)
+
+        matches = {}
+        for key, signature in signatures.items():
+            best = None
+            for bucket in band_buckets(signature):
+                for raw_id, stored, result in by_bucket.get(bucket, []):
+                    if raw_id == key:
+                        continue
+                    score = similarity(signature, stored)
+                    if score >= self.threshold and (best is None or score > best[1]):
+                        best = (raw_id, score, json.loads(result) if isinstance(result, str) else result)
+            if best:
+                matches[key] = best
+        return matches
+
+    def cluster(self, signatures: dict[str, list[int]]) -> dict[str, list[str]]:
+        """
+        Group postings in this batch into near-duplicate clusters
+
+        Returns {representative: [siblings]}; every key of `signatures`
+        appears exactly once, as a representative or a sibling.
+        """
+        parent = {key: key for key in signatures}
+
+        def find(key: str) -> str:
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        buckets: dict[tuple[int, int], list[str]] = {}
+        for key, signature in signatures.items():
+            for bucket in band_buckets(signature):
+                buckets.setdefault(bucket, []).append(key)
+
+        for members in buckets.values():
+            for other in members[1:]:
+                root_a, root_b = find(members[0]), find(other)
+                if root_a != root_b and similarity(signatures[members[0]], signatures[other]) >= self.threshold:
+                    parent[root_b] = root_a
+
+        clusters: dict[str, list[str]] = {}
+        for key in signatures:
+            root = find(key)
+            clusters.setdefault(root, [])
+            if key != root:
+                clusters[root].append(key)
+        return clusters
+
+    def add(self, entries: list[tuple[str, list[int], dict]]):
+        """Index classified representatives: (raw_id, signature, result)"""
+        if not entries:
+            return
+
+        with self._lock, self._conn.cursor() as cur:
+            for raw_id, signature, result in entries:
+                cur.execute("""
+                    INSERT INTO posting_signatures (raw_id, signature, prompt_version, result)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (raw_id) DO UPDATE SET
+                        signature = EXCLUDED.signature,
+                        prompt_version = EXCLUDED.prompt_version,
+                        result = EXCLUDED.result
+                """, (raw_id, signature, self.prompt_version, json.dumps(result)))
+                bands = band_buckets(signature)
+                cur.execute("""
+                    INSERT INTO posting_lsh_buckets (band, bucket, raw_id)
+                    SELECT band, bucket, %s FROM unnest(%s::smallint[], %s::bigint[]) AS t(band, bucket)
+                    ON CONFLICT DO NOTHING
+                """, (raw_id, [b for b, _ in bands], [k for _, k in bands]))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,201 @@
+"""
+Adaptive request/token rate limiting for model calls
+
+Two token buckets gate every call: requests per minute and tokens per minute.
+A call reserves its estimated tokens up front and the estimate is corrected
+with the real usage afterwards. A 429 pauses every caller until the
+provider's Retry-After (or a backoff) has passed and cuts both rates
+multiplicatively; each success raises them additively back toward the
+configured quota (AIMD), so the limiter settles just under the real limit.
+
+Time spent waiting on the limiter and time spent in model calls are tallied
+separately to size the quota. Callers raise TransientError for failures that
+should be retried, and retry_delay() spaces out the requeued attempts.
+"""
+import asyncio
+import random
+import re
+import time
+from typing import Optional
+
+# Multiplicative decrease on 429 and the floor it can't go below (fraction of quota)
+DECREASE_FACTOR = 0.7
+MIN_RATE_FRACTION = 0.05
+# Additive increase: fraction of quota regained per window of successful calls
+INCREASE_FRACTION = 0.1
+
+
+# Statuses worth retrying later rather than failing the job
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Gemini puts the wait in the error body (RetryInfo) rather than a Retry-After header
+RETRY_DELAY_PATTERN = re.compile(r'retryDelay["\']?\s*[:=]\s*["\']?(\d+(?:\.\d+)?)s')
+
+
+class TransientError(Exception):
+    """
+    A model call failed in a way that should be retried later
+
+    Args:
+        message: What went wrong, for logs
+        retry_after: Seconds the provider asked us to wait, if it said
+        throttled: True for 429s, which also slow the limiter down
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, throttled: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+def retry_after_seconds(header: Optional[str] = None, body: object = None) -> Optional[float]:
+    """Wait requested by a Retry-After header (seconds form) or a Gemini RetryInfo body"""
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    if body:
+        match = RETRY_DELAY_PATTERN.search(body if isinstance(body, str) else str(body))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Continuous-refill bucket at `per_window` per `window_seconds`, holding at most `burst_seconds` worth"""
+
+    def __init__(self, per_window: float, window_seconds: float, burst_seconds: float):
+        self.window_seconds = window_seconds
+        self.burst_seconds = burst_seconds
+        self.set_rate(per_window)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_window: float):
+        self.per_window = per_window
+        self.rate = per_window / self.window_seconds
+        self.capacity = self.rate * self.burst_seconds
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self.refill()
+        # A single call bigger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.refill()
+        self.level -= amount  # may go negative when correcting an underestimate
+
+
+class AdaptiveRateLimiter:
+    """
+    RPM/TPM limiter shared by all classifier tasks
+
+    Args:
+        rpm: Requests per minute allowed by the quota
+        tpm: Tokens (input + output) per minute allowed by the quota
+        backoff_base: Pause after a 429 without Retry-After; doubles while 429s continue
+        backoff_cap: Longest single pause
+        burst_seconds: Budget that may be spent at once after an idle spell
+        window_seconds: Length of the quota window; a minute for RPM/TPM
+    """
+
+    def __init__(self, rpm: float, tpm: float, backoff_base: float = 2.0, backoff_cap: float = 120.0,
+                 burst_seconds: float = 5.0, window_seconds: float = 60.0):
+        self.max_rpm = rpm
+        self.max_tpm = tpm
+        self.requests = TokenBucket(rpm, window_seconds, burst_seconds)
+        self.tokens = TokenBucket(tpm, window_seconds, burst_seconds)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = asyncio.Lock()
+
+        self.calls = 0
+        self.throttle_events = 0
+        self.throttled_seconds = 0.0
+        self.working_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait until a call of this size fits both budgets, then reserve it"""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                wait = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+        self.throttled_seconds += time.monotonic() - started
+
+    def record_success(self, estimated_tokens: int, actual_tokens: Optional[int], elapsed: float):
+        """Correct the token reservation and creep the rates back up"""
+        self.calls += 1
+        self.working_seconds += elapsed
+        self._consecutive_throttles = 0
+        if actual_tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+        # Spread the per-window increase over the calls a window holds at the current rate
+        share = INCREASE_FRACTION / max(1.0, self.requests.per_window)
+        self._scale(self.requests, self.max_rpm, self.requests.per_window + self.max_rpm * share)
+        self._scale(self.tokens, self.max_tpm, self.tokens.per_window + self.max_tpm * share)
+
+    def record_throttle(self, retry_after: Optional[float], elapsed: float = 0.0):
+        """Provider said 429: pause everyone and cut the rates"""
+        self.throttle_events += 1
+        self.working_seconds += elapsed
+        self._consecutive_throttles += 1
+        if retry_after is None:
+            ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (self._consecutive_throttles - 1))
+            retry_after = random.uniform(ceiling / 2, ceiling)
+        now = time.monotonic()
+        # Calls already in flight when the first 429 paused us belong to the same overload: cut once
+        already_paused = now < self._paused_until
+        self._paused_until = max(self._paused_until, now + retry_after)
+        if already_paused:
+            return
+        self._scale(self.requests, self.max_rpm, self.requests.per_window * DECREASE_FACTOR)
+        self._scale(self.tokens, self.max_tpm, self.tokens.per_window * DECREASE_FACTOR)
+        # Resume at the reduced rate rather than with a saved-up burst
+        self.requests.level = min(self.requests.level, 0.0)
+
+    def record_failure(self, elapsed: float):
+        """Any other failed call still used the connection for this long"""
+        self.working_seconds += elapsed
+
+    @staticmethod
+    def _scale(bucket: TokenBucket, quota: float, per_window: float):
+        bucket.refill()
+        bucket.set_rate(max(quota * MIN_RATE_FRACTION, min(quota, per_window)))
+        bucket.level = min(bucket.level, bucket.capacity)
+
+    def stats(self) -> dict:
+        busy = self.throttled_seconds + self.working_seconds
+        return {
+            'calls': self.calls,
+            'throttle_events': self.throttle_events,
+            'throttled_seconds': self.throttled_seconds,
+            'working_seconds': self.working_seconds,
+            'throttled_share': self.throttled_seconds / busy if busy else 0.0,
+            'rpm': self.requests.per_window,
+            'tpm': self.tokens.per_window,
+        }
+
+
+def retry_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Requeue delay for a job's `attempt`-th transient failure (1-based), jittered"""
+    ceiling = min(cap, base * 2 ** (attempt - 1))
+    delay = random.uniform(ceiling / 2, ceiling)
+    return max(delay, retry_after or 0.0)
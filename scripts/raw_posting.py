@@ -0,0 +1,34 @@
+"""
+Compact view of a raw_jobs.raw_data payload
+
+Scraper payloads (LinkedIn especially) carry far more keys than the classifier
+reads. Claims project only these keys server-side with ->>, so the blob is
+neither transferred nor parsed; the values arrive as text (JSON text for
+non-string values) and are carried as a RawPosting.
+"""
+from typing import NamedTuple, Optional
+
+
+class RawPosting(NamedTuple):
+    """The raw_data keys the classifier reads"""
+    job_title: Optional[str]
+    company_name: Optional[str]
+    location: Optional[str]
+    employment_type: Optional[str]
+    seniority_level: Optional[str]
+    salary_range: Optional[str]
+    job_function: Optional[str]
+    industries: Optional[str]
+    job_description: Optional[str]
+    time_posted: Optional[str]
+    num_applicants: Optional[str]
+    easy_apply: Optional[str]
+
+
+# Select list for raw_jobs: one raw_<key> text column per RawPosting field
+RAW_POSTING_PROJECTION = ", ".join(f"raw_data->>'{key}' AS raw_{key}" for key in RawPosting._fields)
+
+
+def posting_from_row(row: dict) -> RawPosting:
+    """Pop the raw_<key> columns off a result row"""
+    return RawPosting(*(row.pop(f'raw_{key}') for key in RawPosting._fields))
@@ -0,0 +1,394 @@
+"""
+Drain the ZEP sync outbox
+
+classify_jobs.py writes a zep_sync_outbox row in the same transaction as each
+job update (migrations/016). This drainer claims pending rows in batches,
+posts them through ZepSyncClient and records the outcome per job: delivered
+rows are marked done, rows whose job failed go back to pending with
+exponential backoff until max_attempts, then dead. A circuit breaker stops
+hammering the graph API while it is down, lag metrics show how far behind
+the outbox is, and done rows are deleted after a retention period.
+
+Runs alongside process_jobs, or on its own:
+
+    python zep_outbox.py           # drain continuously
+    python zep_outbox.py --once    # drain until empty, then exit
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+from typing import Optional
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor, execute_values
+
+from zep_sync import SYNC_MANY_MAX_IDS, ZepSyncClient
+
+load_dotenv()
+
+# Outbox drainer configuration
+ZEP_OUTBOX_BATCH_SIZE = int(os.environ.get('ZEP_OUTBOX_BATCH_SIZE', str(SYNC_MANY_MAX_IDS)))
+ZEP_OUTBOX_POLL_SECONDS = float(os.environ.get('ZEP_OUTBOX_POLL_SECONDS', '2'))
+ZEP_OUTBOX_LEASE_SECONDS = int(os.environ.get('ZEP_OUTBOX_LEASE_SECONDS', '120'))
+ZEP_OUTBOX_BACKOFF_SECONDS = float(os.environ.get('ZEP_OUTBOX_BACKOFF_SECONDS', '10'))
+ZEP_OUTBOX_BACKOFF_CAP = float(os.environ.get('ZEP_OUTBOX_BACKOFF_CAP', '3600'))
+
+# Delivered rows are deleted this many days after sending (0 keeps them), checked this often
+ZEP_OUTBOX_RETENTION_DAYS = float(os.environ.get('ZEP_OUTBOX_RETENTION_DAYS', '7'))
+ZEP_OUTBOX_PURGE_SECONDS = float(os.environ.get('ZEP_OUTBOX_PURGE_SECONDS', '3600'))
+ZEP_OUTBOX_PURGE_BATCH = 10_000
+
+# Circuit breaker: open after this many consecutive failed batches, probe again after the cooldown
+ZEP_BREAKER_THRESHOLD = int(os.environ.get('ZEP_BREAKER_THRESHOLD', '5'))
+ZEP_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('ZEP_BREAKER_COOLDOWN_SECONDS', '30'))
+
+# A crashed drainer (e.g. its connection dropped) restarts after this, doubling up to the cap
+ZEP_OUTBOX_RESTART_SECONDS = float(os.environ.get('ZEP_OUTBOX_RESTART_SECONDS', '5'))
+ZEP_OUTBOX_RESTART_CAP = float(os.environ.get('ZEP_OUTBOX_RESTART_CAP', '300'))
+
+API_BASE_URL = os.environ.get('API_BASE_URL', 'https://fractional.quest')
+REVALIDATE_SECRET = os.environ.get('REVALIDATE_SECRET', '')
+DRAINER_ID = f"{socket.gethostname()}-{os.getpid()}-zep"
+
+
+def enqueue_zep_sync(conn, job_ids: list[str]):
+    """Add outbox rows on the caller's connection, inside its open transaction"""
+    if not job_ids:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, "INSERT INTO zep_sync_outbox (job_id) VALUES %s",
+                       [(str(job_id),) for job_id in job_ids], page_size=len(job_ids))
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures; half-open after `cooldown`
+
+    While open the drainer leaves rows untouched, so an outage costs neither
+    attempts nor API calls. One batch is let through when half-open; its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold: int = ZEP_BREAKER_THRESHOLD, cooldown: float = ZEP_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def wait_seconds(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed half-open probe re-opens straight away
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.trips += 1
+            self.opened_at = time.monotonic()
+
+
+class OutboxDrainer:
+    """
+    Claim, send and settle zep_sync_outbox rows
+
+    Uses its own autocommit connection so it never joins the classifier's
+    transaction.
+
+    Args:
+        database_url: Postgres connection string
+        client: Shared ZepSyncClient (one keep-alive pool per process)
+        batch_size: Rows per claim and per POST, at most SYNC_MANY_MAX_IDS
+        poll_seconds: Sleep between claims when the outbox is empty
+    """
+
+    def __init__(self, database_url: str, client: ZepSyncClient, batch_size: int = ZEP_OUTBOX_BATCH_SIZE,
+                 poll_seconds: float = ZEP_OUTBOX_POLL_SECONDS, breaker: Optional[CircuitBreaker] = None):
+        self.client = client
+        self.batch_size = min(batch_size, SYNC_MANY_MAX_IDS)
+        self.poll_seconds = poll_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._database_url = database_url
+        self._conn = psycopg2.connect(database_url)
+        self._conn.autocommit = True
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.missing = 0
+        self.purged = 0
+        self.restarts = 0
+        self.last_lag_seconds: Optional[float] = None
+
+    def reconnect(self):
+        self._conn.close()
+        self._conn = psycopg2.connect(self._database_url)
+        self._conn.autocommit = True
+
+    def claim(self) -> list[dict]:
+        with self._conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                UPDATE zep_sync_outbox SET
+                    status = 'sending',
+                    attempts = attempts + 1,
+                    claimed_by = %(drainer)s,
+                    lease_expires_at = NOW() + %(lease)s * INTERVAL '1 second'
+                WHERE id IN (
+                    SELECT id FROM zep_sync_outbox
+                    WHERE (status = 'pending' AND available_at <= NOW())
+                    OR (status = 'sending' AND lease_expires_at < NOW())
+                    ORDER BY available_at, id
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, job_id, attempts, max_attempts,
+                          EXTRACT(EPOCH FROM NOW() - created_at) AS lag_seconds
+            """, {'drainer': DRAINER_ID, 'lease': ZEP_OUTBOX_LEASE_SECONDS, 'limit': self.batch_size})
+            return [dict(row) for row in cur.fetchall()]
+
+    def settle_sent(self, rows: list[dict]):
+        with self._conn.cursor() as cur:
+            cur.execute("""
+                UPDATE zep_sync_outbox SET
+                    status = 'done', sent_at = NOW(), claimed_by = NULL, lease_expires_at = NULL, last_error = NULL
+                WHERE id = ANY(%s)
+            """, ([row['id'] for row in rows],))
+
+    def settle_failed(self, rows: list[dict], error: str) -> int:
+        """Back off or bury each row; returns how many are now dead"""
+        settled = []
+        dead = 0
+        for row in rows:
+            if row['attempts'] >= row['max_attempts']:
+                settled.append((row['id'], 'dead', 0.0))
+                dead += 1
+            else:
+                ceiling = min(ZEP_OUTBOX_BACKOFF_CAP, ZEP_OUTBOX_BACKOFF_SECONDS * 2 ** (row['attempts'] - 1))
+                settled.append((row['id'], 'pending', random.uniform(ceiling / 2, ceiling)))
+
+        with self._conn.cursor() as cur:
+            execute_values(cur, """
+                UPDATE zep_sync_outbox o SET
+                    status = v.status,
+                    available_at = NOW() + v.delay * INTERVAL '1 second',
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    last_error = v.error
+                FROM (VALUES %s) AS v(id, status, delay, error)
+                WHERE o.id = v.id
+            """, [(row_id, status, delay, error) for row_id, status, delay in settled],
+                template="(%s::bigint, %s, %s::float8, %s)", page_size=len(settled))
+        return dead
+
+    def purge_done(self) -> int:
+        """Delete done rows past the retention period, in chunks; returns rows deleted"""
+        if ZEP_OUTBOX_RETENTION_DAYS <= 0:
+            return 0
+        deleted = 0
+        with self._conn.cursor() as cur:
+            while True:
+                cur.execute("""
+                    DELETE FROM zep_sync_outbox WHERE id IN (
+                        SELECT id FROM zep_sync_outbox
+                        WHERE status = 'done' AND sent_at < NOW() - %s * INTERVAL '1 day'
+                        LIMIT %s
+                    )
+                """, (ZEP_OUTBOX_RETENTION_DAYS, ZEP_OUTBOX_PURGE_BATCH))
+                deleted += cur.rowcount
+                if cur.rowcount < ZEP_OUTBOX_PURGE_BATCH:
+                    return deleted
+
+    def release(self):
+        """Hand back rows this drainer claimed but did not settle"""
+        with self._conn.cursor() as cur:
+            cur.execute("""
+                UPDATE zep_sync_outbox SET status = 'pending', claimed_by = NULL, lease_expires_at = NULL
+                WHERE claimed_by = %s AND status = 'sending'
+            """, (DRAINER_ID,))
+
+    def metrics(self) -> dict:
+        """Outbox depth and lag, plus this drainer's counters"""
+        with self._conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                    COUNT(*) FILTER (WHERE status = 'sending') AS sending,
+                    COUNT(*) FILTER (WHERE status = 'dead') AS dead_total,
+                    EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE status IN ('pending', 'sending')))
+                        AS oldest_lag_seconds
+                FROM zep_sync_outbox
+                WHERE status <> 'done'
+            """)
+            depth = dict(cur.fetchone())
+
+        return {
+            **depth,
+            'oldest_lag_seconds': float(depth['oldest_lag_seconds'] or 0),
+            'sent': self.sent,
+            'retried': self.retried,
+            'dead': self.dead,
+            'missing': self.missing,
+            'purged': self.purged,
+            'restarts': self.restarts,
+            'last_lag_seconds': self.last_lag_seconds,
+            'breaker': self.breaker.state,
+            'breaker_trips': self.breaker.trips,
+        }
+
+    async def drain_once(self) -> int:
+        """Send one claimed batch; returns rows claimed (0 when idle or the breaker is open)"""
+        if self.breaker.state == 'open':
+            return 0
+
+        rows = await asyncio.to_thread(self.claim)
+        if not rows:
+            return 0
+
+        job_ids = list(dict.fromkeys(str(row['job_id']) for row in rows))
+        result = await self.client.post_batch(job_ids)
+
+        # Jobs with no jobs row have nothing to sync and are settled along with the delivered ones
+        failed_ids = set(result.failed_ids)
+        sent = [row for row in rows if str(row['job_id']) not in failed_ids]
+        failed = [row for row in rows if str(row['job_id']) in failed_ids]
+
+        if sent:
+            await asyncio.to_thread(self.settle_sent, sent)
+            self.sent += len(sent)
+            self.missing += len(result.missing_ids)
+            self.last_lag_seconds = max(float(row['lag_seconds']) for row in sent)
+        if failed:
+            error = result.error or 'ZEP sync failed for this job'
+            dead = await asyncio.to_thread(self.settle_failed, failed, error)
+            self.retried += len(failed) - dead
+            self.dead += dead
+
+        # Only a batch where nothing got through counts against the graph API
+        if sent:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if failed:
+            print(f"    ⚠ ZEP outbox: {len(failed)}/{len(rows)} rows failed ({error[:80]}), "
+                  f"breaker {self.breaker.state}")
+        return len(rows)
+
+    async def run(self, stop: Optional[asyncio.Event] = None, until_empty: bool = False):
+        """
+        Drain until stopped
+
+        Args:
+            stop: Once set, keep draining what is ready and return when the outbox is idle
+            until_empty: Return as soon as nothing is ready to send
+        """
+        stop = stop or asyncio.Event()
+        last_purge: Optional[float] = None
+        try:
+            while True:
+                if last_purge is None or time.monotonic() - last_purge >= ZEP_OUTBOX_PURGE_SECONDS:
+                    self.purged += await asyncio.to_thread(self.purge_done)
+                    last_purge = time.monotonic()
+
+                if self.breaker.state == 'open':
+                    if stop.is_set() or until_empty:
+                        return
+                    await asyncio.sleep(self.breaker.wait_seconds())
+                    continue
+
+                claimed = await self.drain_once()
+                if claimed:
+                    continue
+                if stop.is_set() or until_empty:
+                    return
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.to_thread(self.release)
+
+    async def supervise(self, stop: Optional[asyncio.Event] = None, until_empty: bool = False):
+        """
+        run(), restarted with backoff when it fails
+
+        A crash (typically the database connection dropping) is logged, the
+        connection reopened and draining resumed, so it never silently ends.
+        """
+        stop = stop or asyncio.Event()
+        delay = ZEP_OUTBOX_RESTART_SECONDS
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run(stop, until_empty)
+                return
+            except Exception as e:
+                self.restarts += 1
+                # A long healthy spell earns a fresh backoff
+                if time.monotonic() - started > ZEP_OUTBOX_RESTART_CAP:
+                    delay = ZEP_OUTBOX_RESTART_SECONDS
+                print(f"    ⚠ ZEP outbox drainer failed ({str(e)[:80]}), restarting in {delay:.0f}s")
+
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, ZEP_OUTBOX_RESTART_CAP)
+            try:
+                await asyncio.to_thread(self.reconnect)
+            except psycopg2.Error as e:
+                print(f"    ⚠ ZEP outbox reconnect failed ({str(e)[:80]}), will retry")
+
+    def close(self):
+        self._conn.close()
+
+
+def print_metrics(metrics: dict):
+    print(f"ZEP outbox: {metrics['sent']} sent ({metrics['missing']} missing jobs), {metrics['retried']} retrying, "
+          f"{metrics['dead']} dead, {metrics['purged']} purged; "
+          f"{metrics['pending']} pending, oldest {metrics['oldest_lag_seconds']:.0f}s behind; "
+          f"breaker {metrics['breaker']} ({metrics['breaker_trips']} trips), {metrics['restarts']} restarts")
+
+
+async def main(once: bool, report_seconds: float):
+    client = ZepSyncClient(API_BASE_URL, REVALIDATE_SECRET, max_attempts=2)
+    drainer = OutboxDrainer(os.environ['DATABASE_URL'], client)
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_seconds)
+            print_metrics(await asyncio.to_thread(drainer.metrics))
+
+    reporter = asyncio.create_task(report())
+    try:
+        await drainer.supervise(until_empty=once)
+    finally:
+        reporter.cancel()
+        print_metrics(await asyncio.to_thread(drainer.metrics))
+        await client.close()
+        drainer.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Drain the ZEP sync outbox')
+    parser.add_argument('--once', action='store_true', help='Exit when nothing is ready to send')
+    parser.add_argument('--report-every', type=float, default=60, help='Seconds between metrics lines')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.once, args.report_every))
@@ -0,0 +1,110 @@
+"""
+Batched ZEP knowledge-graph sync over one pooled HTTP client
+
+Job IDs are posted to /api/graph/jobs in groups (action "sync-many") over a
+single keep-alive client (HTTP/2 when the h2 package is installed) that
+lives for the whole run. 429 and 5xx responses and transport errors are
+retried with full-jitter exponential backoff, honouring Retry-After when the
+server sends it. Batches come from the zep_sync_outbox drainer (zep_outbox.py).
+"""
+import asyncio
+import random
+from typing import NamedTuple, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Largest batch the sync-many action accepts (SYNC_MANY_MAX_IDS in app/api/graph/jobs/route.ts)
+SYNC_MANY_MAX_IDS = 20
+
+
+class BatchResult(NamedTuple):
+    failed_ids: list[str]   # Not synced; the outbox retries these
+    missing_ids: list[str]  # No jobs row, so nothing to retry
+    error: Optional[str]    # Why the whole batch failed, None if the server answered
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)], or the server's Retry-After"""
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ZepSyncClient:
+    """
+    Post job ID batches to the graph endpoint
+
+    Args:
+        base_url: Site root serving /api/graph/jobs
+        secret: REVALIDATE_SECRET sent as a bearer token
+        max_attempts: Tries per batch before it is counted as failed
+        backoff_base: First retry delay ceiling in seconds; doubles per attempt
+        backoff_cap: Upper bound for any single delay
+    """
+
+    def __init__(self, base_url: str, secret: str, max_attempts: int = 5, backoff_base: float = 0.5,
+                 backoff_cap: float = 30.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={'Authorization': f'Bearer {secret}', 'Content-Type': 'application/json'},
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+
+        self.requests = 0
+        self.retries = 0
+        self.synced = 0
+        self.failed = 0
+
+    async def post_batch(self, job_ids: list[str]) -> BatchResult:
+        """POST one batch, retrying throttling and server errors; a final error fails every ID"""
+        error = None
+        for attempt in range(self.max_attempts):
+            retry_after = None
+            try:
+                self.requests += 1
+                response = await self._client.post('/api/graph/jobs', json={'action': 'sync-many', 'jobIds': job_ids})
+                if response.status_code == 200:
+                    body = response.json()
+                    failed_ids = [str(job_id) for job_id in body.get('failedIds', [])]
+                    missing_ids = [str(job_id) for job_id in body.get('missingIds', [])]
+                    self.synced += body.get('synced', len(job_ids) - len(failed_ids) - len(missing_ids))
+                    self.failed += len(failed_ids) + len(missing_ids)
+                    return BatchResult(failed_ids, missing_ids, None)
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get('Retry-After')
+                reason = str(response.status_code)
+            except httpx.TransportError as e:
+                error = reason = f"{type(e).__name__}: {e}"[:200]
+
+            if attempt + 1 < self.max_attempts:
+                self.retries += 1
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, retry_after)
+                print(f"    ⚠ ZEP sync {reason}, retrying {len(job_ids)} jobs in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.failed += len(job_ids)
+        return BatchResult(list(job_ids), [], error)
+
+    def stats(self) -> dict:
+        return {'requests': self.requests, 'retries': self.retries, 'synced': self.synced, 'failed': self.failed}
+
+    async def close(self):
+        await self._client.aclose()
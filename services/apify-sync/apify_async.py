@@ -0,0 +1,79 @@
+"""
+Async Apify access layer
+Wraps the native async Apify client so dataset fetches, schedule listings,
+actor triggers and run polling never block the FastAPI event loop
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from apify_client import ApifyClientAsync
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApify:
+    """
+    Non-blocking facade over ApifyClientAsync
+
+    A semaphore caps the number of Apify API calls in flight so a burst of
+    webhooks cannot exhaust sockets or trip Apify rate limits, while calls
+    from different requests still overlap freely below that cap.
+    """
+
+    def __init__(self, token: str, max_concurrency: int = 8):
+        self._client = ApifyClientAsync(token)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def list_dataset_page(self, dataset_id: str, offset: int, limit: int):
+        """Fetch a single page of dataset items"""
+        async with self._semaphore:
+            return await self._client.dataset(dataset_id).list_items(offset=offset, limit=limit)
+
+    async def iter_dataset_chunks(
+        self,
+        dataset_id: str,
+        chunk_size: int,
+        start_offset: int = 0,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield a dataset page by page instead of materialising every item
+
+        Args:
+            dataset_id: Apify dataset ID
+            chunk_size: Maximum number of items per page
+            start_offset: Number of leading items to skip (resume point)
+        """
+        offset = start_offset
+
+        while True:
+            page = await self.list_dataset_page(dataset_id, offset, chunk_size)
+            if not page.items:
+                return
+
+            yield page.items
+            offset += len(page.items)
+
+            if page.total is not None and offset >= page.total:
+                return
+
+    async def list_schedules(self) -> List[Dict[str, Any]]:
+        """List all schedules on the account"""
+        async with self._semaphore:
+            page = await self._client.schedules().list()
+        return page.items
+
+    async def last_run(self, actor_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent run of an actor, or None if it has never run"""
+        async with self._semaphore:
+            return await self._client.actor(actor_id).last_run().get()
+
+    async def start_actor(self, actor_id: str) -> Dict[str, Any]:
+        """Start an actor run and return immediately without waiting for it to finish"""
+        async with self._semaphore:
+            return await self._client.actor(actor_id).start()
+
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a run, or None if it does not exist"""
+        async with self._semaphore:
+            return await self._client.run(run_id).get()
@@ -0,0 +1,116 @@
+"""
+Event loop responsiveness benchmark for the Apify webhook service
+
+Runs a burst of concurrent dataset ingestions, as queue workers would after
+a wave of webhooks, while polling /scraper/dashboard and reports dashboard
+latency. Apify, Neon and the classifier are replaced with fakes that wait a
+fixed time, either by blocking the thread (how the old synchronous
+ApifyClient behaved) or by awaiting (the async access layer).
+
+Usage:
+    python bench_event_loop.py --mode async --webhooks 20 --polls 50
+    python bench_event_loop.py --mode blocking --webhooks 20 --polls 50
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+import main
+from dashboard import DashboardCache
+from database import RowOutcome
+
+
+class FakeApify:
+    """Stand-in for AsyncApify with a fixed per-call latency"""
+
+    def __init__(self, latency: float, blocking: bool, pages: int = 3):
+        self.latency = latency
+        self.blocking = blocking
+        self.pages = pages
+
+    async def _wait(self):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    async def iter_dataset_chunks(self, dataset_id, chunk_size, start_offset=0):
+        for _ in range(self.pages):
+            await self._wait()
+            yield [{"id": i} for i in range(chunk_size)]
+
+    async def list_schedules(self):
+        await self._wait()
+        return [{"id": "s1", "name": "linkedin", "actorId": "a1", "isEnabled": True}]
+
+    async def last_run(self, actor_id):
+        await self._wait()
+        return {"id": "run", "status": "SUCCEEDED", "stats": {}}
+
+    async def start_actor(self, actor_id):
+        await self._wait()
+        return {"id": "run", "status": "READY", "startedAt": None}
+
+
+async def _noop_save(items, actor_name):
+    return [RowOutcome(str(item["id"]), "inserted") for item in items]
+
+
+async def _noop_classify(items, actor_name):
+    return None
+
+
+async def run(mode: str, webhooks: int, polls: int, latency: float) -> dict:
+    main.apify = FakeApify(latency, blocking=(mode == "blocking"))
+    main.dashboard_cache = DashboardCache(main.apify, refresh_interval=latency * 4)
+    main.save_jobs_to_neon = _noop_save
+    main.classify_and_sync_jobs = _noop_classify
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def poll() -> list[float]:
+            latencies = []
+            for _ in range(polls):
+                started = time.perf_counter()
+                await client.get("/scraper/dashboard")
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            poll(),
+            *(main.process_apify_dataset("linkedin", f"dataset-{i}", f"run-{i}") for i in range(webhooks))
+        )
+        wall = time.perf_counter() - started
+
+    latencies = sorted(results[0])
+    return {
+        "mode": mode,
+        "wall": wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "worst": latencies[-1],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard latency under webhook load")
+    parser.add_argument("--mode", choices=["async", "blocking"], default="async")
+    parser.add_argument("--webhooks", type=int, default=20, help="Concurrent dataset ingestions")
+    parser.add_argument("--polls", type=int, default=50, help="Sequential dashboard polls")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated Apify call latency (s)")
+    args = parser.parse_args()
+
+    # Per-chunk and per-request info logs would swamp the result line
+    logging.getLogger().setLevel(logging.WARNING)
+    stats = asyncio.run(run(args.mode, args.webhooks, args.polls, args.latency))
+    print(
+        f"{stats['mode']:>8}: wall {stats['wall']:.2f}s | dashboard "
+        f"p50 {stats['p50'] * 1000:.1f}ms p95 {stats['p95'] * 1000:.1f}ms "
+        f"max {stats['worst'] * 1000:.1f}ms"
+    )
@@ -0,0 +1,109 @@
+"""
+Ingestion write-path benchmark: row-at-a-time vs COPY + merge
+
+Generates synthetic LinkedIn-style items under a throwaway source name,
+saves them with both strategies at each size and removes them afterwards.
+Point it at a scratch database, never production.
+
+Usage:
+    BENCH_DATABASE_URL=postgres://... python bench_upsert.py --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import database
+from database import save_jobs_to_neon, to_staging_record
+
+ROW_JOB_SQL = """
+    INSERT INTO jobs (
+        slug, title, company_name, location, is_remote,
+        employment_type, seniority_level, compensation, full_description,
+        source_url, job_source, is_active, created_at, updated_at
+    )
+    VALUES ($3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $1, true, NOW(), NOW())
+    ON CONFLICT (slug) DO UPDATE SET
+        title = EXCLUDED.title,
+        is_active = true,
+        updated_at = NOW()
+    RETURNING id
+"""
+
+ROW_RAW_SQL = """
+    INSERT INTO raw_jobs (source, source_id, raw_data, job_id, processing_status, received_at)
+    VALUES ($1, $2, $3::jsonb, $4, 'pending', NOW())
+    ON CONFLICT (source, source_id) DO UPDATE SET
+        raw_data = EXCLUDED.raw_data,
+        job_id = EXCLUDED.job_id,
+        received_at = NOW()
+"""
+
+
+def make_items(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"bench-{i}",
+            "job_title": f"Fractional CFO {i}",
+            "company_name": f"Company {i % 500}",
+            "location": "London, England, United Kingdom",
+            "employment_type": "Part-time",
+            "seniority_level": "Executive",
+            "salary_range": "£800-£1,000 per day",
+            "job_description": "Lead finance for a scaling business. " * 40,
+            "url": f"https://example.com/jobs/{i}",
+        }
+        for i in range(n)
+    ]
+
+
+async def save_row_by_row(items: list[dict], source: str):
+    """Baseline: two statements per item inside one transaction"""
+    async with database.get_pool().acquire() as conn:
+        async with conn.transaction():
+            for item in items:
+                record = to_staging_record(item, source)
+                job_id = await conn.fetchval(ROW_JOB_SQL, *record[:12])
+                await conn.execute(ROW_RAW_SQL, record[0], record[1], record[12], job_id)
+
+
+async def cleanup(source: str):
+    async with database.get_pool().acquire() as conn:
+        job_ids = await conn.fetch("SELECT job_id FROM raw_jobs WHERE source = $1", source)
+        await conn.execute("DELETE FROM raw_jobs WHERE source = $1", source)
+        await conn.execute("DELETE FROM jobs WHERE id = ANY($1)", [r["job_id"] for r in job_ids])
+
+
+async def main(sizes: list[int]):
+    await database.init_pool(os.environ["BENCH_DATABASE_URL"], min_size=1, max_size=2)
+    try:
+        print(f"{'items':>8} | {'row-at-a-time':>14} | {'COPY+merge':>11} | speedup")
+        for n in sizes:
+            items = make_items(n)
+            source = f"bench-{uuid.uuid4().hex[:8]}"
+
+            try:
+                started = time.perf_counter()
+                await save_row_by_row(items, source)
+                row_time = time.perf_counter() - started
+            finally:
+                await cleanup(source)
+
+            try:
+                started = time.perf_counter()
+                await save_jobs_to_neon(items, source)
+                copy_time = time.perf_counter() - started
+            finally:
+                await cleanup(source)
+
+            print(f"{n:>8} | {row_time:>13.2f}s | {copy_time:>10.2f}s | {row_time / copy_time:.1f}x")
+    finally:
+        await database.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Apify ingestion write paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
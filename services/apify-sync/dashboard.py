@@ -0,0 +1,128 @@
+"""
+Stale-while-revalidate cache for the /scraper/dashboard schedule view
+
+A background task rebuilds the snapshot on a fixed interval, fetching each
+actor's last run concurrently, so requests are answered from memory and
+never wait on the Apify API once the first snapshot exists.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from apify_async import AsyncApify
+
+logger = logging.getLogger(__name__)
+
+
+def _last_run_stats(run: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not run:
+        return None
+    stats = run.get("stats") or {}
+    return {
+        "run_id": run.get("id"),
+        "status": run.get("status"),
+        "started_at": run.get("startedAt"),
+        "finished_at": run.get("finishedAt"),
+        "duration_secs": stats.get("runTimeSecs"),
+        "compute_units": stats.get("computeUnits"),
+        "dataset_id": run.get("defaultDatasetId"),
+    }
+
+
+class DashboardCache:
+    """
+    Holds the latest dashboard payload and refreshes it in the background
+
+    Args:
+        apify: Async Apify access layer
+        refresh_interval: Seconds between background refreshes
+    """
+
+    def __init__(self, apify: AsyncApify, refresh_interval: float = 60.0):
+        self.apify = apify
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+
+    async def _build(self) -> Dict[str, Any]:
+        schedules_list = await self.apify.list_schedules()
+
+        actor_ids = sorted({s.get("actorId") for s in schedules_list if s.get("actorId")})
+        runs = await asyncio.gather(
+            *(self.apify.last_run(actor_id) for actor_id in actor_ids),
+            return_exceptions=True
+        )
+        last_runs = {
+            actor_id: None if isinstance(run, Exception) else _last_run_stats(run)
+            for actor_id, run in zip(actor_ids, runs)
+        }
+
+        schedules_info = []
+        for schedule in schedules_list:
+            schedules_info.append({
+                "id": schedule.get("id"),
+                "name": schedule.get("name"),
+                "actor_id": schedule.get("actorId"),
+                "cron_expression": schedule.get("cronExpression"),
+                "is_enabled": schedule.get("isEnabled"),
+                "next_run": schedule.get("nextRunAt"),
+                "last_run": schedule.get("lastRunAt"),
+                "last_run_stats": last_runs.get(schedule.get("actorId"))
+            })
+
+        return {
+            "active_scrapers": len([s for s in schedules_info if s["is_enabled"]]),
+            "total_schedules": len(schedules_info),
+            "schedules": schedules_info,
+            "refreshed_at": datetime.now(timezone.utc).isoformat()
+        }
+
+    async def refresh(self):
+        """Rebuild the snapshot; concurrent callers share one in-flight refresh"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self):
+        try:
+            self._snapshot = await self._build()
+            self._refreshed_at = time.monotonic()
+            self.last_error = None
+        except Exception as e:
+            # Keep serving the previous snapshot
+            self.last_error = str(e)
+            logger.error(f"Dashboard refresh failed: {e}")
+
+    async def get(self) -> Dict[str, Any]:
+        """Serve the current snapshot, fetching synchronously only on first use"""
+        if self._snapshot is None:
+            await self.refresh()
+            if self._snapshot is None:
+                raise RuntimeError(self.last_error or "Dashboard unavailable")
+        elif self.age() > self.refresh_interval * 2 and (self._refreshing is None or self._refreshing.done()):
+            # Background loop fell behind: revalidate without making this caller wait
+            self._refreshing = asyncio.create_task(self._refresh())
+
+        return {**self._snapshot, "age_seconds": round(self.age(), 1), "last_error": self.last_error}
+
+    def age(self) -> float:
+        return time.monotonic() - self._refreshed_at if self._refreshed_at else float("inf")
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
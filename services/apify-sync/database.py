@@ -0,0 +1,388 @@
+"""
+Neon persistence for the Apify webhook service
+
+Jobs are written in bulk: each chunk is COPYed into a temporary staging
+table and merged into jobs and raw_jobs with one INSERT ... ON CONFLICT per
+table, so a chunk costs a handful of round-trips whatever its size.
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from delta import item_source_id
+
+# Pool sizing and prepared statement cache. Set DB_STATEMENT_CACHE_SIZE=0
+# when connecting through a transaction-mode pooler that cannot hold
+# prepared statements across transactions.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+_pool: Optional[asyncpg.Pool] = None
+_metrics = {"connections_opened": 0, "acquires": 0, "acquire_wait_seconds": 0.0}
+
+
+async def _on_connect(conn: asyncpg.Connection):
+    _metrics["connections_opened"] += 1
+
+
+async def init_pool(
+    dsn: str,
+    min_size: int = DB_POOL_MIN_SIZE,
+    max_size: int = DB_POOL_MAX_SIZE,
+) -> asyncpg.Pool:
+    """Create the process-wide connection pool; reused if already open"""
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            dsn,
+            min_size=min_size,
+            max_size=max_size,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            init=_on_connect,
+        )
+    return _pool
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("Database pool not initialised")
+    return _pool
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """Acquire a pooled connection, recording how long the caller waited"""
+    started = time.perf_counter()
+    async with get_pool().acquire() as conn:
+        _metrics["acquires"] += 1
+        _metrics["acquire_wait_seconds"] += time.perf_counter() - started
+        yield conn
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Pool occupancy plus cumulative connection and acquire counters"""
+    if _pool is None:
+        return {"initialised": False}
+
+    acquires = _metrics["acquires"]
+    return {
+        "initialised": True,
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "connections_opened": _metrics["connections_opened"],
+        "acquires": acquires,
+        "avg_acquire_wait_ms": round(_metrics["acquire_wait_seconds"] / acquires * 1000, 3) if acquires else 0.0,
+    }
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+# Column order of the staging table and of each record COPYed into it
+STAGING_COLUMNS = (
+    "source",
+    "source_id",
+    "slug",
+    "title",
+    "company_name",
+    "location",
+    "is_remote",
+    "employment_type",
+    "seniority_level",
+    "compensation",
+    "full_description",
+    "source_url",
+    "raw_data",
+)
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE apify_staging (
+        source TEXT,
+        source_id TEXT,
+        slug TEXT,
+        title TEXT,
+        company_name TEXT,
+        location TEXT,
+        is_remote BOOLEAN,
+        employment_type TEXT,
+        seniority_level TEXT,
+        compensation TEXT,
+        full_description TEXT,
+        source_url TEXT,
+        raw_data TEXT
+    ) ON COMMIT DROP
+"""
+
+# Postings resolve to an existing jobs row by source identity first: the
+# raw_jobs row already linked to (source, source_id), then a jobs row with the
+# same source_url (the key the TS ingesters dedupe on). Only postings matching
+# neither insert a new jobs row, so a retitled posting or one ingested by both
+# paths keeps a single listing.
+MERGE_SQL = """
+    WITH resolved AS (
+        SELECT s.*, coalesce(linked.id, by_url.id) AS existing_job_id
+        FROM apify_staging s
+        LEFT JOIN raw_jobs r ON r.source = s.source AND r.source_id = s.source_id
+        LEFT JOIN jobs linked ON linked.id = r.job_id
+        LEFT JOIN LATERAL (
+            SELECT j.id FROM jobs j
+            WHERE linked.id IS NULL AND s.source_url IS NOT NULL AND j.source_url = s.source_url
+            ORDER BY j.created_at
+            LIMIT 1
+        ) by_url ON true
+    ),
+    updated_jobs AS (
+        UPDATE jobs j SET
+            title = s.title,
+            company_name = s.company_name,
+            location = s.location,
+            is_remote = s.is_remote,
+            employment_type = s.employment_type,
+            seniority_level = s.seniority_level,
+            compensation = s.compensation,
+            full_description = s.full_description,
+            source_url = coalesce(s.source_url, j.source_url),
+            is_active = true,
+            updated_at = NOW()
+        FROM resolved s
+        WHERE j.id = s.existing_job_id
+        RETURNING j.id
+    ),
+    inserted_jobs AS (
+        INSERT INTO jobs (
+            slug, title, company_name, location, is_remote,
+            employment_type, seniority_level, compensation, full_description,
+            source_url, job_source, is_active, created_at, updated_at
+        )
+        SELECT
+            slug, title, company_name, location, is_remote,
+            employment_type, seniority_level, compensation, full_description,
+            source_url, source, true, NOW(), NOW()
+        FROM resolved
+        WHERE existing_job_id IS NULL
+        ON CONFLICT (slug) DO UPDATE SET
+            title = EXCLUDED.title,
+            company_name = EXCLUDED.company_name,
+            location = EXCLUDED.location,
+            is_remote = EXCLUDED.is_remote,
+            employment_type = EXCLUDED.employment_type,
+            seniority_level = EXCLUDED.seniority_level,
+            compensation = EXCLUDED.compensation,
+            full_description = EXCLUDED.full_description,
+            source_url = EXCLUDED.source_url,
+            is_active = true,
+            updated_at = NOW()
+        RETURNING id, slug, (xmax = 0) AS inserted
+    ),
+    job_ids AS (
+        SELECT s.source, s.source_id, s.raw_data,
+               coalesce(s.existing_job_id, i.id) AS job_id,
+               coalesce(i.inserted, false) AS inserted
+        FROM resolved s
+        LEFT JOIN inserted_jobs i ON s.existing_job_id IS NULL AND i.slug = s.slug
+    ),
+    upserted_raw AS (
+        INSERT INTO raw_jobs (source, source_id, raw_data, job_id, processing_status, received_at)
+        SELECT source, source_id, raw_data::jsonb, job_id, 'pending', NOW()
+        FROM job_ids
+        WHERE job_id IS NOT NULL
+        ON CONFLICT (source, source_id) DO UPDATE SET
+            raw_data = EXCLUDED.raw_data,
+            job_id = EXCLUDED.job_id,
+            processing_status = 'pending',
+            processing_error = NULL,
+            received_at = NOW()
+        RETURNING source_id
+    )
+    SELECT r.source_id, k.job_id, k.inserted
+    FROM upserted_raw r
+    JOIN job_ids k ON k.source_id = r.source_id
+"""
+
+
+@dataclass
+class RowOutcome:
+    """Result of saving one dataset item"""
+    source_id: Optional[str]
+    outcome: str  # inserted, updated, skipped
+    job_id: Optional[Any] = None
+    reason: Optional[str] = None
+
+
+def _first(item: Dict[str, Any], *keys: str) -> Optional[Any]:
+    for key in keys:
+        value = item.get(key)
+        if value:
+            return value
+    return None
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value if v) or None
+    return str(value)
+
+
+def make_slug(title: str, company: Optional[str], source: str, source_id: str) -> str:
+    """
+    Slug for a newly inserted jobs row: readable prefix plus a hash of the
+    source identity. Only used on insert; re-scrapes are matched to their
+    jobs row through raw_jobs/source_url in MERGE_SQL, so a later title or
+    company change keeps the original slug
+    """
+    combined = re.sub(r"[^a-z0-9]+", "-", f"{title} {company or ''}".lower()).strip("-")[:80]
+    suffix = hashlib.sha1(f"{source}:{source_id}".encode("utf-8")).hexdigest()[:8]
+    return f"{combined}-{suffix}"
+
+
+def to_staging_record(item: Dict[str, Any], actor_name: str) -> Optional[tuple]:
+    """Map a LinkedIn/Ashby/Greenhouse style item to a staging row, or None if unusable"""
+    source_id = item_source_id(item)
+    title = _first(item, "job_title", "title", "position")
+    if not source_id or not title:
+        return None
+
+    company = _text(_first(item, "company_name", "organization", "company"))
+    locations = item.get("locations_derived") or []
+    location = _text(_first(item, "location", "job_location")) or (locations[0] if locations else None)
+    workplace = f"{location or ''} {item.get('workplace_type') or ''} {title}".lower()
+
+    return (
+        actor_name,
+        source_id,
+        make_slug(str(title), company, actor_name, source_id),
+        str(title),
+        company,
+        location,
+        bool(item.get("remote_derived")) or "remote" in workplace,
+        _text(_first(item, "employment_type", "employmentType")),
+        _text(_first(item, "seniority_level", "seniority")),
+        _text(_first(item, "salary_range", "salary", "base_salary")),
+        _text(_first(item, "job_description", "description_text", "description")),
+        _text(_first(item, "url", "job_url", "link", "apply_link")),
+        json.dumps(item, default=str),
+    )
+
+
+async def save_jobs_to_neon(items: List[Dict[str, Any]], actor_name: str) -> List[RowOutcome]:
+    """
+    Bulk upsert a chunk of dataset items into jobs and raw_jobs
+
+    Args:
+        items: Apify dataset items
+        actor_name: Source name recorded on raw_jobs/jobs
+
+    Returns:
+        One RowOutcome per input item, in input order
+    """
+    outcomes: List[RowOutcome] = []
+    staged: Dict[str, tuple] = {}
+
+    for item in items:
+        record = to_staging_record(item, actor_name)
+        if record is None:
+            outcomes.append(RowOutcome(item_source_id(item), "skipped", reason="missing id or title"))
+            continue
+        # Repeated postings within a chunk collapse onto the last occurrence
+        staged[record[1]] = record
+        outcomes.append(RowOutcome(record[1], "pending"))
+
+    if staged:
+        async with acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(CREATE_STAGING_SQL)
+                await conn.copy_records_to_table(
+                    "apify_staging",
+                    records=list(staged.values()),
+                    columns=STAGING_COLUMNS,
+                )
+                rows = await conn.fetch(MERGE_SQL)
+
+        merged = {row["source_id"]: row for row in rows}
+        for outcome in outcomes:
+            if outcome.outcome != "pending":
+                continue
+            row = merged.get(outcome.source_id)
+            if row is None:
+                outcome.outcome = "skipped"
+                outcome.reason = "not merged"
+            else:
+                outcome.outcome = "inserted" if row["inserted"] else "updated"
+                outcome.job_id = row["job_id"]
+
+    return outcomes
+
+
+RECENT_JOBS_SQL = """
+    SELECT r.id AS raw_id, r.source, r.source_id, r.processing_status, r.received_at,
+           j.id AS job_id, j.slug, j.title, j.company_name, j.location
+    FROM raw_jobs r
+    LEFT JOIN jobs j ON r.job_id = j.id
+    {where}
+    ORDER BY r.received_at DESC, r.id::text DESC
+    LIMIT $1
+"""
+
+
+def encode_cursor(received_at: datetime, raw_id: Any) -> str:
+    """Opaque keyset cursor for the (received_at, id) position of a row"""
+    payload = json.dumps({"t": received_at.isoformat(), "id": str(raw_id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), payload["id"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_recent_jobs(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Page through raw jobs newest first with keyset pagination
+
+    Args:
+        limit: Page size
+        cursor: next_cursor from the previous page, or None for the first page
+
+    Returns:
+        (jobs, next_cursor) where next_cursor is None on the last page
+    """
+    # Row comparison on (received_at, id) seeks the index instead of scanning
+    # an OFFSET. id is compared as text so the order is total whatever its type.
+    if cursor:
+        received_at, raw_id = decode_cursor(cursor)
+        rows = await get_pool().fetch(RECENT_JOBS_SQL.format(
+            where="WHERE (r.received_at, r.id::text) < ($2, $3)"
+        ), limit + 1, received_at, raw_id)
+    else:
+        rows = await get_pool().fetch(RECENT_JOBS_SQL.format(where=""), limit + 1)
+
+    jobs = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = jobs[-1]
+        next_cursor = encode_cursor(last["received_at"], last["raw_id"])
+
+    return jobs, next_cursor
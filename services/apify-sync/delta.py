@@ -0,0 +1,137 @@
+"""
+Content-hash delta ingestion for Apify datasets
+
+Each item is fingerprinted by a stable hash of its normalized fields and
+compared in bulk against apify_item_fingerprints (migrations/010). Only new
+or changed items go on to save_jobs_to_neon and classification.
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+# Fields that change between scrapes without the posting itself changing
+VOLATILE_FIELDS = {
+    "num_applicants",
+    "applicants",
+    "applicants_count",
+    "time_posted",
+    "scraped_at",
+    "crawled_at",
+    "date_scraped",
+    "retrieved_at",
+}
+
+# Candidate keys identifying a posting within one source, in priority order
+SOURCE_ID_FIELDS = ("id", "job_id", "jobId", "url", "job_url", "link")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def item_source_id(item: Dict[str, Any]) -> Optional[str]:
+    for key in SOURCE_ID_FIELDS:
+        value = item.get(key)
+        if value:
+            return str(value)
+    return None
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def fingerprint(item: Dict[str, Any]) -> str:
+    """Stable sha256 of an item, independent of key order and whitespace"""
+    canonical = json.dumps(
+        _normalize(item),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class DeltaResult:
+    """Outcome of comparing one chunk against stored fingerprints"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    hashes: Dict[str, str] = field(default_factory=dict)
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+class DeltaFilter:
+    """Splits chunks into new/changed/unchanged items by content hash"""
+
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+
+    async def split(self, source: str, items: List[Dict[str, Any]]) -> DeltaResult:
+        """
+        Keep only new or changed items
+
+        Items without a recognisable source ID cannot be tracked and are
+        always passed through as new.
+        """
+        result = DeltaResult()
+
+        # Last occurrence wins when a dataset repeats a posting
+        keyed: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            source_id = item_source_id(item)
+            if source_id is None:
+                result.items.append(item)
+                result.new += 1
+            else:
+                keyed[source_id] = item
+
+        if not keyed:
+            return result
+
+        rows = await self.pool.fetch("""
+            SELECT source_id, content_hash FROM apify_item_fingerprints
+            WHERE source = $1 AND source_id = ANY($2::text[])
+        """, source, list(keyed))
+        stored = {row["source_id"]: row["content_hash"] for row in rows}
+
+        for source_id, item in keyed.items():
+            content_hash = fingerprint(item)
+            previous = stored.get(source_id)
+
+            if previous == content_hash:
+                result.unchanged += 1
+                continue
+
+            if previous is None:
+                result.new += 1
+            else:
+                result.changed += 1
+            result.items.append(item)
+            result.hashes[source_id] = content_hash
+
+        return result
+
+    async def commit(self, source: str, result: DeltaResult):
+        """Store hashes for items that were saved; call after the chunk succeeds"""
+        if not result.hashes:
+            return
+
+        await self.pool.execute("""
+            INSERT INTO apify_item_fingerprints (source, source_id, content_hash)
+            SELECT $1, source_id, content_hash
+            FROM unnest($2::text[], $3::text[]) AS t(source_id, content_hash)
+            ON CONFLICT (source, source_id) DO UPDATE SET
+                content_hash = EXCLUDED.content_hash,
+                updated_at = NOW()
+        """, source, list(result.hashes), list(result.hashes.values()))
@@ -0,0 +1,75 @@
+"""
+Idempotency store for Apify webhook deliveries
+
+An in-memory LRU answers repeat deliveries without a database round-trip;
+apify_webhook_deliveries (migrations/009) is the durable source of truth
+shared by every instance and surviving restarts.
+"""
+from collections import OrderedDict
+from typing import Optional
+
+import asyncpg
+
+
+class DeliveryLedger:
+    """
+    Records the first delivery of each run/dataset
+
+    Args:
+        capacity: Number of recently seen keys kept in memory
+    """
+
+    def __init__(self, capacity: int = 10_000):
+        self.capacity = capacity
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+
+    @staticmethod
+    def _keys(run_id: Optional[str], dataset_id: str) -> list[str]:
+        keys = [f"dataset:{dataset_id}"]
+        if run_id:
+            keys.append(f"run:{run_id}")
+        return keys
+
+    def seen(self, run_id: Optional[str], dataset_id: str) -> bool:
+        """Fast path: True if this process has already recorded the delivery"""
+        for key in self._keys(run_id, dataset_id):
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return True
+        return False
+
+    def remember(self, run_id: Optional[str], dataset_id: str):
+        for key in self._keys(run_id, dataset_id):
+            self._recent[key] = None
+            self._recent.move_to_end(key)
+        while len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+    async def claim(
+        self,
+        conn: asyncpg.Connection,
+        actor_name: str,
+        run_id: Optional[str],
+        dataset_id: str,
+    ) -> bool:
+        """
+        Durably record a delivery
+
+        Returns True for the first delivery of this run/dataset and False for
+        a duplicate. Call inside the transaction that schedules the work so a
+        claim is never recorded without its queue row.
+        """
+        inserted = await conn.fetchval("""
+            INSERT INTO apify_webhook_deliveries (dataset_id, run_id, actor_name)
+            VALUES ($1, $2, $3)
+            ON CONFLICT DO NOTHING
+            RETURNING dataset_id
+        """, dataset_id, run_id, actor_name)
+
+        return inserted is not None
+
+    async def attach_queue_job(self, conn: asyncpg.Connection, dataset_id: str, queue_job_id: int):
+        await conn.execute(
+            "UPDATE apify_webhook_deliveries SET queue_job_id = $2 WHERE dataset_id = $1",
+            dataset_id, queue_job_id
+        )
@@ -2,16 +2,33 @@
 Apify Webhook Receiver Service
 Receives job data from Apify actors and syncs to Neon database
 """
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import hashlib
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, Optional
 import os
 
-from apify_client import ApifyClient
-from database import save_jobs_to_neon, get_recent_jobs
+from apify_async import AsyncApify
+from cache import TTLCache
+from dashboard import DashboardCache
+from runs import RunTracker
+from database import (
+    DB_POOL_MAX_SIZE,
+    acquire,
+    close_pool,
+    get_recent_jobs,
+    init_pool,
+    pool_metrics,
+    save_jobs_to_neon,
+)
 from classifiers import classify_and_sync_jobs
+from delta import DeltaFilter
+from idempotency import DeliveryLedger
+from work_queue import QueueJob, WebhookQueue
 
 # Configure logging
 logging.basicConfig(
@@ -23,22 +40,86 @@ logger = logging.getLogger(__name__)
 # Environment variables
 APIFY_API_KEY = os.getenv("APIFY_API_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Items pulled from a dataset per page; each page is saved and classified
+# before the next one is fetched, so memory stays bounded by this size
+APIFY_CHUNK_SIZE = int(os.getenv("APIFY_CHUNK_SIZE", "500"))
+# Upper bound on concurrent Apify API calls across all requests
+APIFY_MAX_CONCURRENCY = int(os.getenv("APIFY_MAX_CONCURRENCY", "8"))
+# Durable webhook queue: workers per process, lease (visibility timeout) and retry policy
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "2"))
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "600"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "5"))
+QUEUE_BACKOFF_SECONDS = float(os.getenv("QUEUE_BACKOFF_SECONDS", "30"))
+# Recently seen run/dataset IDs answered from memory before hitting the ledger table
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# How long a /jobs/recent page is served from memory before re-querying Neon
+RECENT_JOBS_CACHE_TTL = float(os.getenv("RECENT_JOBS_CACHE_TTL", "15"))
+# Interval of the background refresh behind /scraper/dashboard
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+# Poll interval for runs started via /scraper/trigger
+RUN_POLL_SECONDS = float(os.getenv("RUN_POLL_SECONDS", "10"))
 
 if not APIFY_API_KEY:
     logger.warning("APIFY_API_KEY not set - some features will be unavailable")
 
-# Initialize Apify client
-apify_client = ApifyClient(APIFY_API_KEY) if APIFY_API_KEY else None
+# Initialize async Apify client
+apify = AsyncApify(APIFY_API_KEY, APIFY_MAX_CONCURRENCY) if APIFY_API_KEY else None
+
+# Schedule view served from memory, refreshed in the background
+dashboard_cache = DashboardCache(apify, DASHBOARD_REFRESH_SECONDS) if apify else None
+
+# Status of triggered runs, polled in the background until they finish
+run_tracker = RunTracker(apify, RUN_POLL_SECONDS) if apify else None
+
+# Webhook work queue and delta filter, created in lifespan once the pool exists
+queue: Optional[WebhookQueue] = None
+delta_filter: Optional[DeltaFilter] = None
+
+# Idempotency ledger for webhook deliveries
+deliveries = DeliveryLedger(IDEMPOTENCY_CACHE_SIZE)
+
+# Rendered /jobs/recent pages keyed on (limit, cursor), dropped whenever a chunk commits
+recent_jobs_cache = TTLCache(RECENT_JOBS_CACHE_TTL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
+    global queue, delta_filter
+
     logger.info("Starting Apify Webhook Service")
     logger.info(f"Database URL configured: {bool(DATABASE_URL)}")
     logger.info(f"Apify API Key configured: {bool(APIFY_API_KEY)}")
+
+    if DATABASE_URL:
+        # Workers each hold a connection while processing; leave headroom for requests
+        pool = await init_pool(DATABASE_URL, max_size=max(DB_POOL_MAX_SIZE, QUEUE_WORKERS + 2))
+        delta_filter = DeltaFilter(pool)
+        queue = WebhookQueue(
+            pool,
+            lease_seconds=QUEUE_LEASE_SECONDS,
+            max_attempts=QUEUE_MAX_ATTEMPTS,
+            backoff_base=QUEUE_BACKOFF_SECONDS,
+        )
+        queue.start(process_queue_job, QUEUE_WORKERS)
+        logger.info(f"Started {QUEUE_WORKERS} queue workers")
+
+    if dashboard_cache:
+        dashboard_cache.start()
+    if run_tracker:
+        run_tracker.start()
+
     yield
+
     logger.info("Shutting down Apify Webhook Service")
+    if dashboard_cache:
+        await dashboard_cache.stop()
+    if run_tracker:
+        await run_tracker.stop()
+    if queue:
+        # In-flight jobs are released back to the queue for the next instance
+        await queue.stop()
+    await close_pool()
 
 
 app = FastAPI(
@@ -75,15 +156,15 @@ async def health():
     return {
         "status": "healthy",
         "apify_api": "connected" if APIFY_API_KEY else "not_configured",
-        "database": "connected" if DATABASE_URL else "not_configured"
+        "database": "connected" if DATABASE_URL else "not_configured",
+        "db_pool": pool_metrics()
     }
 
 
 @app.post("/webhook/apify/{actor_name}")
 async def handle_apify_webhook(
     actor_name: str,
-    payload: Dict[str, Any],
-    background_tasks: BackgroundTasks
+    payload: Dict[str, Any]
 ):
     """
     Receive webhook from Apify when an actor completes
@@ -110,129 +191,242 @@ async def handle_apify_webhook(
         logger.error("No dataset ID in webhook payload")
         raise HTTPException(status_code=400, detail="Missing dataset ID")
 
-    # Process in background so webhook responds quickly
-    background_tasks.add_task(
-        process_apify_dataset,
-        actor_name,
-        dataset_id,
-        run_id
-    )
+    duplicate_response = {
+        "status": "duplicate",
+        "actor": actor_name,
+        "dataset_id": dataset_id,
+        "run_id": run_id
+    }
+
+    # Retried or re-sent delivery: acknowledge without scheduling work again
+    if deliveries.seen(run_id, dataset_id):
+        logger.info(f"Duplicate delivery for dataset {dataset_id} (cached)")
+        return duplicate_response
+
+    if not queue:
+        raise HTTPException(status_code=503, detail="Work queue not configured")
+
+    # Record the delivery and persist the work item in one transaction so
+    # the webhook responds quickly, survives restarts and is processed once
+    async with acquire() as conn:
+        async with conn.transaction():
+            if not await deliveries.claim(conn, actor_name, run_id, dataset_id):
+                queue_job_id = None
+            else:
+                queue_job_id = await queue.enqueue(actor_name, dataset_id, run_id, conn=conn)
+                await deliveries.attach_queue_job(conn, dataset_id, queue_job_id)
+
+    deliveries.remember(run_id, dataset_id)
+
+    if queue_job_id is None:
+        logger.info(f"Duplicate delivery for dataset {dataset_id}")
+        return duplicate_response
+
+    queue.wake()
 
     return {
-        "status": "received",
+        "status": "queued",
         "actor": actor_name,
         "dataset_id": dataset_id,
-        "run_id": run_id
+        "run_id": run_id,
+        "queue_job_id": queue_job_id
     }
 
 
-async def process_apify_dataset(actor_name: str, dataset_id: str, run_id: str):
+async def process_apify_dataset(
+    actor_name: str,
+    dataset_id: str,
+    run_id: str,
+    start_offset: int = 0,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> Dict[str, int]:
     """
-    Fetch dataset from Apify and process jobs
+    Stream dataset from Apify and process jobs chunk by chunk
 
     Args:
         actor_name: Name of the actor (e.g., 'linkedin', 'ashby')
         dataset_id: Apify dataset ID
         run_id: Apify run ID
-    """
-    try:
-        logger.info(f"Processing dataset {dataset_id} from {actor_name}")
-
-        if not apify_client:
-            logger.error("Apify client not configured")
-            return
-
-        # 1. Fetch dataset from Apify
-        dataset = apify_client.dataset(dataset_id)
-        items = list(dataset.iterate_items())
+        start_offset: Dataset offset to resume from
+        on_progress: Awaited with the new offset after each chunk is committed
 
-        logger.info(f"Fetched {len(items)} items from Apify dataset")
-
-        if not items:
-            logger.warning("No items in dataset")
-            return
-
-        # 2. Save to Neon database
-        logger.info("Saving jobs to Neon database...")
-        saved_count = await save_jobs_to_neon(items, actor_name)
-        logger.info(f"Saved {saved_count} jobs to Neon")
+    Returns counts of new, changed and unchanged items. Raises on failure so
+    the queue can retry from the last checkpoint.
+    """
+    logger.info(f"Processing dataset {dataset_id} from {actor_name} (run {run_id}) at offset {start_offset}")
+
+    if not apify:
+        raise RuntimeError("Apify client not configured")
+
+    offset = start_offset
+    total_saved = 0
+    chunk_number = 0
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+
+    async for items in apify.iter_dataset_chunks(dataset_id, APIFY_CHUNK_SIZE, start_offset):
+        chunk_number += 1
+
+        # 1. Drop postings whose content hash is unchanged since the last scrape
+        delta = await delta_filter.split(actor_name, items) if delta_filter else None
+        pending = delta.items if delta else items
+
+        saved_count = 0
+        if pending:
+            # 2. Bulk upsert new/changed items into Neon database
+            outcomes = await save_jobs_to_neon(pending, actor_name)
+            saved_count = sum(1 for o in outcomes if o.outcome != "skipped")
+            recent_jobs_cache.invalidate()
+
+            # 3. Classify and sync to ZEP (async)
+            await classify_and_sync_jobs(pending, actor_name)
+
+        if delta:
+            await delta_filter.commit(actor_name, delta)
+            counts["new"] += delta.new
+            counts["changed"] += delta.changed
+            counts["unchanged"] += delta.unchanged
+        else:
+            counts["new"] += len(items)
+
+        offset += len(items)
+        total_saved += saved_count
+        logger.info(
+            f"Chunk {chunk_number}: {len(items)} items, {len(pending)} new/changed, {saved_count} saved "
+            f"({offset} items processed / {total_saved} saved this attempt for dataset {dataset_id})"
+        )
+
+        if on_progress:
+            await on_progress(offset)
+
+    if offset == 0:
+        logger.warning("No items in dataset")
+        return counts
+
+    logger.info(
+        f"Dataset {dataset_id} complete: {offset} items, {total_saved} saved this attempt "
+        f"(new {counts['new']}, changed {counts['changed']}, unchanged {counts['unchanged']})"
+    )
+    return counts
 
-        # 3. Classify and sync to ZEP (async)
-        logger.info("Starting classification and ZEP sync...")
-        await classify_and_sync_jobs(items, actor_name)
-        logger.info("Classification and sync complete")
 
-    except Exception as e:
-        logger.error(f"Error processing dataset {dataset_id}: {e}", exc_info=True)
+async def process_queue_job(job: QueueJob, checkpoint: Callable[[int], Awaitable[None]]):
+    """Queue handler: resume the dataset from the job's last checkpoint"""
+    await process_apify_dataset(
+        job.actor_name,
+        job.dataset_id,
+        job.run_id,
+        start_offset=job.items_processed,
+        on_progress=checkpoint
+    )
 
 
 @app.get("/scraper/dashboard")
 async def dashboard():
-    """View all Apify actors and their schedules"""
-    if not apify_client:
+    """View all Apify actors, their schedules and last-run stats"""
+    if not dashboard_cache:
         raise HTTPException(status_code=503, detail="Apify client not configured")
 
     try:
-        # Get all schedules
-        schedules_list = apify_client.schedules().list().items
-
-        schedules_info = []
-        for schedule in schedules_list:
-            schedules_info.append({
-                "id": schedule.get("id"),
-                "name": schedule.get("name"),
-                "actor_id": schedule.get("actorId"),
-                "cron_expression": schedule.get("cronExpression"),
-                "is_enabled": schedule.get("isEnabled"),
-                "next_run": schedule.get("nextRunAt"),
-                "last_run": schedule.get("lastRunAt")
-            })
-
-        return {
-            "active_scrapers": len([s for s in schedules_info if s["is_enabled"]]),
-            "total_schedules": len(schedules_info),
-            "schedules": schedules_info
-        }
+        return await dashboard_cache.get()
     except Exception as e:
         logger.error(f"Error fetching schedules: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/scraper/trigger/{actor_id}")
+@app.post("/scraper/trigger/{actor_id}", status_code=202)
 async def manual_trigger(actor_id: str):
-    """Manually trigger an Apify actor"""
-    if not apify_client:
+    """
+    Manually trigger an Apify actor
+
+    Returns as soon as the run is started; poll /scraper/runs/{run_id}
+    for progress. The webhook still handles the dataset on success.
+    """
+    if not run_tracker:
         raise HTTPException(status_code=503, detail="Apify client not configured")
 
     try:
         logger.info(f"Manually triggering actor {actor_id}")
 
-        run = apify_client.actor(actor_id).call()
+        run = await apify.start_actor(actor_id)
+        run_tracker.track(run)
 
         return {
             "run_id": run.get("id"),
             "status": run.get("status"),
             "started_at": run.get("startedAt"),
-            "actor_id": actor_id
+            "actor_id": actor_id,
+            "status_url": f"/scraper/runs/{run.get('id')}"
         }
     except Exception as e:
         logger.error(f"Error triggering actor {actor_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/jobs/recent")
-async def recent_jobs(limit: int = 50):
-    """Get recently scraped jobs from Neon"""
+@app.get("/scraper/runs/{run_id}")
+async def run_status(run_id: str):
+    """Latest known status of an actor run"""
+    if not run_tracker:
+        raise HTTPException(status_code=503, detail="Apify client not configured")
+
     try:
-        jobs = await get_recent_jobs(limit)
-        return {
-            "count": len(jobs),
-            "jobs": jobs
-        }
+        summary = await run_tracker.get(run_id)
     except Exception as e:
-        logger.error(f"Error fetching recent jobs: {e}")
+        logger.error(f"Error fetching run {run_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+
+    return summary
+
+
+@app.get("/queue/stats")
+async def queue_stats():
+    """Counts of webhook work items by status"""
+    if not queue:
+        raise HTTPException(status_code=503, detail="Work queue not configured")
+
+    return await queue.stats()
+
+
+@app.get("/jobs/recent")
+async def recent_jobs(request: Request, limit: int = 50, cursor: Optional[str] = None):
+    """
+    Get recently scraped jobs from Neon, newest first
+
+    Pass the returned next_cursor to fetch the following page. Pages are
+    cached briefly and carry an ETag; a matching If-None-Match returns 304.
+    """
+    limit = max(1, min(limit, 200))
+    key = (limit, cursor)
+
+    cached = recent_jobs_cache.get(key)
+    if cached is None:
+        try:
+            jobs, next_cursor = await get_recent_jobs(limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error fetching recent jobs: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        body = json.dumps(jsonable_encoder({
+            "count": len(jobs),
+            "jobs": jobs,
+            "next_cursor": next_cursor
+        })).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        cached = (etag, body)
+        recent_jobs_cache.set(key, cached)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={int(RECENT_JOBS_CACHE_TTL)}"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 if __name__ == "__main__":
     import uvicorn
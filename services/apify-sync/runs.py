@@ -0,0 +1,110 @@
+"""
+Cached status tracking for Apify actor runs
+
+Runs started through /scraper/trigger are registered here and polled in the
+background until they reach a terminal status, so /scraper/runs/{run_id}
+answers from memory and status checks never hold a request open for the
+length of a scrape.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from apify_async import AsyncApify
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
+
+
+def run_summary(run: Dict[str, Any]) -> Dict[str, Any]:
+    stats = run.get("stats") or {}
+    return {
+        "run_id": run.get("id"),
+        "actor_id": run.get("actId"),
+        "status": run.get("status"),
+        "status_message": run.get("statusMessage"),
+        "started_at": run.get("startedAt"),
+        "finished_at": run.get("finishedAt"),
+        "duration_secs": stats.get("runTimeSecs"),
+        "dataset_id": run.get("defaultDatasetId"),
+        "is_finished": run.get("status") in TERMINAL_STATUSES,
+    }
+
+
+class RunTracker:
+    """
+    Polls active runs on an interval and keeps the latest status of each
+
+    Args:
+        apify: Async Apify access layer
+        poll_interval: Seconds between polls of unfinished runs
+        max_runs: Finished runs beyond this count are forgotten, oldest first
+    """
+
+    def __init__(self, apify: AsyncApify, poll_interval: float = 10.0, max_runs: int = 500):
+        self.apify = apify
+        self.poll_interval = poll_interval
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._checked_at: Dict[str, float] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def track(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        summary = run_summary(run)
+        run_id = summary["run_id"]
+        self._runs[run_id] = summary
+        self._runs.move_to_end(run_id)
+        self._checked_at[run_id] = time.monotonic()
+
+        while len(self._runs) > self.max_runs:
+            oldest = next((rid for rid, r in self._runs.items() if r["is_finished"]), None)
+            if oldest is None:
+                break
+            del self._runs[oldest]
+            self._checked_at.pop(oldest, None)
+
+        return summary
+
+    async def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Cached status; unknown runs are fetched once and then tracked"""
+        summary = self._runs.get(run_id)
+        if summary is None:
+            run = await self.apify.get_run(run_id)
+            if run is None:
+                return None
+            summary = self.track(run)
+
+        age = time.monotonic() - self._checked_at.get(run_id, 0.0)
+        return {**summary, "checked_seconds_ago": round(age, 1)}
+
+    async def _poll_once(self):
+        active = [run_id for run_id, r in self._runs.items() if not r["is_finished"]]
+        if not active:
+            return
+
+        results = await asyncio.gather(
+            *(self.apify.get_run(run_id) for run_id in active),
+            return_exceptions=True
+        )
+        for run_id, run in zip(active, results):
+            if isinstance(run, Exception):
+                logger.warning(f"Polling run {run_id} failed: {run}")
+            elif run:
+                self.track(run)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._poll_once()
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
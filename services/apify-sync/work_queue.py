@@ -0,0 +1,267 @@
+"""
+Durable Postgres-backed work queue for Apify webhook processing
+
+Work items live in apify_webhook_queue (migrations/008). Workers claim rows
+with FOR UPDATE SKIP LOCKED and hold a lease that is renewed while the
+dataset is processed. A crashed or redeployed worker simply stops renewing,
+so its row becomes claimable again once the lease expires and processing
+resumes from the last checkpointed dataset offset.
+"""
+import asyncio
+import logging
+import random
+import socket
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# handler(job, checkpoint) processes a job; checkpoint(offset) records progress
+Handler = Callable[["QueueJob", Callable[[int], Awaitable[None]]], Awaitable[None]]
+
+
+class LeaseLost(Exception):
+    """Raised when a worker no longer owns the job it is processing"""
+
+
+@dataclass
+class QueueJob:
+    id: int
+    actor_name: str
+    dataset_id: str
+    run_id: Optional[str]
+    attempts: int
+    max_attempts: int
+    items_processed: int
+
+
+class WebhookQueue:
+    """
+    Leased queue with retries, exponential backoff and a dead-letter state
+
+    Args:
+        pool: asyncpg connection pool
+        lease_seconds: Visibility timeout for a claimed job
+        max_attempts: Attempts before a job is moved to 'dead'
+        backoff_base: Delay in seconds before the first retry, doubled per attempt
+        backoff_max: Upper bound on the retry delay
+        poll_interval: Idle sleep between claim attempts when the queue is empty
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        lease_seconds: int = 600,
+        max_attempts: int = 5,
+        backoff_base: float = 30.0,
+        backoff_max: float = 3600.0,
+        poll_interval: float = 5.0,
+    ):
+        self.pool = pool
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+
+    async def enqueue(
+        self,
+        actor_name: str,
+        dataset_id: str,
+        run_id: Optional[str],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> int:
+        """
+        Persist a new work item
+
+        Idle local workers are woken straight away, unless the insert runs on
+        a caller's connection: then call wake() once that transaction commits.
+        """
+        query = """
+            INSERT INTO apify_webhook_queue (actor_name, dataset_id, run_id, max_attempts)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id
+        """
+        if conn is not None:
+            return await conn.fetchval(query, actor_name, dataset_id, run_id, self.max_attempts)
+
+        job_id = await self.pool.fetchval(query, actor_name, dataset_id, run_id, self.max_attempts)
+        self.wake()
+        return job_id
+
+    def wake(self):
+        """Wake idle workers in this process to claim new work"""
+        self._wakeup.set()
+
+    async def claim(self, worker_id: str) -> Optional[QueueJob]:
+        """Lease the oldest available job, including running jobs whose lease expired"""
+        row = await self.pool.fetchrow("""
+            UPDATE apify_webhook_queue q SET
+                status = 'running',
+                worker_id = $1,
+                attempts = q.attempts + 1,
+                lease_expires_at = NOW() + make_interval(secs => $2),
+                updated_at = NOW()
+            WHERE q.id = (
+                SELECT id FROM apify_webhook_queue
+                WHERE (status = 'queued' AND available_at <= NOW())
+                   OR (status = 'running' AND lease_expires_at < NOW())
+                ORDER BY available_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, actor_name, dataset_id, run_id, attempts, max_attempts, items_processed
+        """, worker_id, float(self.lease_seconds))
+
+        return QueueJob(**dict(row)) if row else None
+
+    async def heartbeat(self, job_id: int, worker_id: str, items_processed: Optional[int] = None):
+        """Extend the lease, optionally recording a new checkpoint"""
+        updated = await self.pool.fetchval("""
+            UPDATE apify_webhook_queue SET
+                lease_expires_at = NOW() + make_interval(secs => $3),
+                items_processed = COALESCE($4, items_processed),
+                updated_at = NOW()
+            WHERE id = $1 AND worker_id = $2 AND status = 'running'
+            RETURNING id
+        """, job_id, worker_id, float(self.lease_seconds), items_processed)
+
+        if updated is None:
+            raise LeaseLost(f"Job {job_id} is no longer leased by {worker_id}")
+
+    async def complete(self, job_id: int, worker_id: str):
+        await self.pool.execute("""
+            UPDATE apify_webhook_queue SET
+                status = 'done',
+                lease_expires_at = NULL,
+                last_error = NULL,
+                completed_at = NOW(),
+                updated_at = NOW()
+            WHERE id = $1 AND worker_id = $2
+        """, job_id, worker_id)
+
+    async def fail(self, job: QueueJob, worker_id: str, error: str) -> str:
+        """Schedule a retry with backoff, or dead-letter the job once attempts run out"""
+        status = "dead" if job.attempts >= job.max_attempts else "queued"
+        delay = self.retry_delay(job.attempts)
+
+        await self.pool.execute("""
+            UPDATE apify_webhook_queue SET
+                status = $3,
+                worker_id = NULL,
+                lease_expires_at = NULL,
+                available_at = NOW() + make_interval(secs => $4),
+                last_error = $5,
+                updated_at = NOW()
+            WHERE id = $1 AND worker_id = $2
+        """, job.id, worker_id, status, delay, error[:2000])
+
+        return status
+
+    async def release(self, job_id: int, worker_id: str):
+        """Hand a job back untouched (used on shutdown) without spending an attempt"""
+        await self.pool.execute("""
+            UPDATE apify_webhook_queue SET
+                status = 'queued',
+                worker_id = NULL,
+                lease_expires_at = NULL,
+                attempts = GREATEST(attempts - 1, 0),
+                available_at = NOW(),
+                updated_at = NOW()
+            WHERE id = $1 AND worker_id = $2 AND status = 'running'
+        """, job_id, worker_id)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** max(attempts - 1, 0)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    async def stats(self) -> Dict[str, int]:
+        rows = await self.pool.fetch(
+            "SELECT status, COUNT(*) AS count FROM apify_webhook_queue GROUP BY status"
+        )
+        return {row["status"]: row["count"] for row in rows}
+
+    async def _process(self, job: QueueJob, worker_id: str, handler: Handler):
+        async def checkpoint(items_processed: int):
+            await self.heartbeat(job.id, worker_id, items_processed)
+
+        async def renew_lease():
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                await self.heartbeat(job.id, worker_id)
+
+        renewer = asyncio.create_task(renew_lease())
+        work = asyncio.create_task(handler(job, checkpoint))
+        try:
+            done, _ = await asyncio.wait({work, renewer}, return_when=asyncio.FIRST_COMPLETED)
+            if renewer in done:
+                # Lease renewal only finishes by failing: stop working on a job we no longer own
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+                renewer.result()
+            work.result()
+        finally:
+            renewer.cancel()
+            work.cancel()
+
+    async def run_worker(self, worker_id: str, handler: Handler):
+        """Claim and process jobs until cancelled"""
+        logger.info(f"Queue worker {worker_id} started")
+
+        while True:
+            try:
+                job = await self.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job.attempts > job.max_attempts:
+                # Lease expired on the final attempt (worker crashed mid-run)
+                await self.fail(job, worker_id, "Lease expired on final attempt")
+                logger.error(f"Job {job.id} dead-lettered after {job.max_attempts} attempts")
+                continue
+
+            logger.info(
+                f"Worker {worker_id} claimed job {job.id} (dataset {job.dataset_id}, "
+                f"attempt {job.attempts}/{job.max_attempts}, resume at {job.items_processed})"
+            )
+
+            try:
+                await self._process(job, worker_id, handler)
+                await self.complete(job.id, worker_id)
+                logger.info(f"Job {job.id} complete")
+            except asyncio.CancelledError:
+                await asyncio.shield(self.release(job.id, worker_id))
+                raise
+            except LeaseLost as e:
+                logger.warning(str(e))
+            except Exception as e:
+                status = await self.fail(job, worker_id, str(e))
+                logger.error(f"Job {job.id} failed ({status}): {e}", exc_info=True)
+
+    def start(self, handler: Handler, workers: int):
+        """Spawn a pool of workers in the current event loop"""
+        prefix = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        for i in range(workers):
+            task = asyncio.create_task(self.run_worker(f"{prefix}-{i}", handler))
+            self._workers.append(task)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()